@@ -45,13 +45,36 @@ class Nodzgraph(nodegraph.Nodegraph):
 
         # add node gategories
         self.append_available_node_categories()
+        self.apply_default_attribute()
 
-        # setting the default attribute
-        self.configuration.default_slot = True
+    def apply_default_attribute(self):
+        """ sets the default attribute every Maya node gets
+
+        Returns:
+
+        """
+        self.configuration.default_socket = True
         self.configuration.default_plug = True
         self.configuration.default_attribute_name = "message"
         self.configuration.default_attribute_data_type = "message"
 
+    def apply_configuration(self, configuration):
+        """ extends the original method
+
+        A new configuration replaces the Maya specific settings, so we apply them again
+
+        Args:
+            configuration: Configuration instance
+
+        Returns: set of changed keys
+
+        """
+        changed = super(Nodzgraph, self).apply_configuration(configuration)
+        self.apply_default_attribute()
+        if "available_node_types" in changed:
+            self.append_available_node_categories()
+        return changed
+
     def open(self):
         """ opens the Nodegraph with dockable configuration settings
 
@@ -109,7 +132,7 @@ class Nodzgraph(nodegraph.Nodegraph):
         Returns:
 
         """
-        available_node_types = self.graph.creation_field.available_items
+        available_node_types = list(self.graph.creation_field.available_items)
         for types in self.configuration.maya.available_node_categories:
             node_types = pmc.listNodeTypes(types)
             for node_type in node_types:
@@ -253,7 +276,7 @@ class Nodzgraph(nodegraph.Nodegraph):
 
     @SuppressEvents("host_node_deleted")
     def on_nodes_deleted(self, nodeitems_list):
-        """ slot override
+        """ slot extension
 
         Args:
             nodeitems_list:
@@ -266,6 +289,7 @@ class Nodzgraph(nodegraph.Nodegraph):
                 pmc.delete(node.name)
             except RuntimeWarning:
                 LOG.warning("Not able to delete host node '{0}'".format(node.name), exc_info=True)
+        super(Nodzgraph, self).on_nodes_deleted(nodeitems_list)
 
     def on_nodes_selected(self, nodes_list):
         selection = [_.name for _ in nodes_list if not _.node_type in self.RESERVED_NODETYPES]
@@ -0,0 +1,476 @@
+import logging
+import os
+import re
+import struct
+import threading
+import zlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+from coconodz.model import GraphModel
+from coconodz.serialization import (_write_varint,
+                                    load_graph,
+                                    write_graph
+                                    )
+
+
+LOG = logging.getLogger(name="CocoNodz.journal")
+
+_POSITION = struct.Struct("<dd")
+_CHECKSUM = struct.Struct("<I")
+
+# record operations
+_NODE_CREATED = 1
+_NODE_RENAMED = 2
+_NODE_DELETED = 3
+_ATTRIBUTE_ADDED = 4
+_CONNECTED = 5
+_DISCONNECTED = 6
+_NODE_MOVED = 7
+_CLEARED = 8
+
+_FILE_PATTERN = re.compile(r"^(snapshot|journal)\.(\d+)\.(cnz|log)$")
+_LOCK_FILENAME = "journal.lock"
+_CLEAN_FILENAME = "clean"
+
+
+class JournalLocked(Exception):
+    """ raised when the journal directory is already used by another graph
+
+    """
+
+
+def _write_string(buffer, value):
+    encoded = value.encode("utf-8")
+    _write_varint(buffer, len(encoded))
+    buffer.extend(encoded)
+
+
+class _RecordReader(object):
+    """ decodes the fields of a single journal record
+
+    """
+
+    def __init__(self, data, position=0):
+        self._data = data
+        self.position = position
+
+    def read_byte(self):
+        value = self._data[self.position]
+        self.position += 1
+        return value
+
+    def read_varint(self):
+        result = 0
+        shift = 0
+        while True:
+            byte = self.read_byte()
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def read_string(self):
+        size = self.read_varint()
+        value = bytes(self._data[self.position:self.position + size]).decode("utf-8")
+        self.position += size
+        return value
+
+    def read_position(self):
+        value = _POSITION.unpack(bytes(self._data[self.position:self.position + _POSITION.size]))
+        self.position += _POSITION.size
+        return value
+
+
+class GraphJournal(object):
+    """ append-only journal of graph edits with incremental snapshots
+
+    Every edit is appended as a small checksummed record to journal.<generation>.log and flushed right away,
+    so a crash loses at most the record that was being written. Compacting folds the edits into
+    snapshot.<generation>.cnz in a background thread and starts the next generation. Recovering loads the
+    latest complete snapshot and replays all journals of that and later generations on top of it.
+    A clean close removes all files and leaves a marker behind, so only crashed sessions offer recovery data.
+    The directory is locked while the journal is open, the OS releases the lock if the process dies.
+    """
+
+    def __init__(self, directory, lock=True):
+        """
+
+        Args:
+            directory: path of the directory the journal files are written to
+            lock: locks the directory and raises JournalLocked if another journal uses it already,
+                  an unlocked journal should only be used for reading the recovery data
+
+        """
+        self._directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._lock = None
+        if lock:
+            self._acquire_lock()
+        self._dirty = not os.path.exists(self._get_clean_path())
+        self._stream = None
+        self._buffer = bytearray()
+        self._record_count = 0
+        self._compaction = None
+        generations = [_[1] for _ in self._get_files()]
+        self._generation = max(generations) if generations else 0
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @property
+    def record_count(self):
+        """ holds the number of records written since the last compaction
+
+        Returns: int
+
+        """
+        return self._record_count
+
+    @property
+    def has_recovery_data(self):
+        """ holds if a previous session left a snapshot or journal records behind
+
+        Returns: bool
+
+        """
+        if not self._dirty:
+            return False
+        for kind, generation, path in self._get_files():
+            if kind == "snapshot" or os.path.getsize(path):
+                return True
+        return False
+
+    def _get_files(self):
+        files = []
+        for filename in os.listdir(self._directory):
+            match = _FILE_PATTERN.match(filename)
+            if match:
+                files.append((match.group(1), int(match.group(2)), os.path.join(self._directory, filename)))
+        return files
+
+    def _get_clean_path(self):
+        return os.path.join(self._directory, _CLEAN_FILENAME)
+
+    def _acquire_lock(self):
+        stream = open(os.path.join(self._directory, _LOCK_FILENAME), "a+")
+        try:
+            if fcntl:
+                fcntl.flock(stream.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                stream.seek(0)
+                msvcrt.locking(stream.fileno(), msvcrt.LK_NBLCK, 1)
+        except (IOError, OSError):
+            stream.close()
+            raise JournalLocked("Journal directory '{0}' is used by another graph.".format(self._directory))
+        self._lock = stream
+
+    def _release_lock(self):
+        if self._lock is None:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self._lock.fileno(), fcntl.LOCK_UN)
+            else:
+                self._lock.seek(0)
+                msvcrt.locking(self._lock.fileno(), msvcrt.LK_UNLCK, 1)
+        except (IOError, OSError):
+            LOG.warning("Not able to unlock journal directory '{0}'".format(self._directory))
+        self._lock.close()
+        self._lock = None
+
+    def _mark_dirty(self):
+        # the marker goes away with the first edit, a crash from now on leaves recovery data behind
+        if self._dirty:
+            return
+        try:
+            os.remove(self._get_clean_path())
+        except OSError:
+            pass
+        self._dirty = True
+
+    def _get_path(self, kind, generation):
+        return os.path.join(self._directory, "{0}.{1}.{2}".format(kind, generation,
+                                                                   "cnz" if kind == "snapshot" else "log"))
+
+    def _begin(self, operation):
+        self._buffer = bytearray()
+        self._buffer.append(operation)
+        return self._buffer
+
+    def _append(self, flush=True):
+        self._mark_dirty()
+        if self._stream is None:
+            self._stream = open(self._get_path("journal", self._generation), "ab")
+        record = bytearray()
+        _write_varint(record, len(self._buffer))
+        record.extend(self._buffer)
+        record.extend(_CHECKSUM.pack(zlib.crc32(bytes(self._buffer)) & 0xFFFFFFFF))
+        self._stream.write(bytes(record))
+        if flush:
+            self._stream.flush()
+        self._record_count += 1
+
+    def node_created(self, name, node_type, position=None, flush=True):
+        buffer = self._begin(_NODE_CREATED)
+        _write_string(buffer, name)
+        _write_string(buffer, node_type)
+        buffer.append(0 if position is None else 1)
+        if position is not None:
+            buffer.extend(_POSITION.pack(*position))
+        self._append(flush)
+
+    def node_renamed(self, old_name, new_name):
+        buffer = self._begin(_NODE_RENAMED)
+        _write_string(buffer, old_name)
+        _write_string(buffer, new_name)
+        self._append()
+
+    def node_deleted(self, name):
+        buffer = self._begin(_NODE_DELETED)
+        _write_string(buffer, name)
+        self._append()
+
+    def attribute_added(self, node_name, attribute_name, plug=True, socket=True, data_type="", flush=True):
+        buffer = self._begin(_ATTRIBUTE_ADDED)
+        _write_string(buffer, node_name)
+        _write_string(buffer, attribute_name)
+        _write_string(buffer, data_type or "")
+        buffer.append((1 if plug else 0) | (2 if socket else 0))
+        self._append(flush)
+
+    def connected(self, plug_node, plug_attr, socket_node, socket_attr, flush=True):
+        buffer = self._begin(_CONNECTED)
+        for value in (plug_node, plug_attr, socket_node, socket_attr):
+            _write_string(buffer, value)
+        self._append(flush)
+
+    def disconnected(self, plug_node, plug_attr, socket_node, socket_attr):
+        buffer = self._begin(_DISCONNECTED)
+        for value in (plug_node, plug_attr, socket_node, socket_attr):
+            _write_string(buffer, value)
+        self._append()
+
+    def nodes_moved(self, positions):
+        """ appends a move record per node
+
+        Args:
+            positions: dict holding (x, y) tuples by node name
+
+        Returns:
+
+        """
+        for name, position in positions.items():
+            buffer = self._begin(_NODE_MOVED)
+            _write_string(buffer, name)
+            buffer.extend(_POSITION.pack(*position))
+            self._append(flush=False)
+        if self._stream:
+            self._stream.flush()
+
+    def cleared(self):
+        self._begin(_CLEARED)
+        self._append()
+
+    def write_model(self, model):
+        """ appends records for all nodes, attributes and connections of the given model
+
+        Args:
+            model: GraphModel instance
+
+        Returns:
+
+        """
+        for node in model:
+            self.node_created(node.name, node.node_type, node.position, flush=False)
+            for attribute in node.attributes.values():
+                self.attribute_added(node.name, attribute.name, attribute.plug, attribute.socket, attribute.data_type,
+                                     flush=False)
+        for edge in model.edges:
+            self.connected(*edge, flush=False)
+        if self._stream:
+            self._stream.flush()
+
+    def compact(self, model, backdrops=(), wait=False):
+        """ folds all journal records into a new snapshot of the given model
+
+        The model gets copied right away, so it can be edited while the snapshot is written
+        in the background. Edits from now on are recorded in the next generation.
+        Args:
+            model: GraphModel instance holding the current state
+            backdrops: list of BackdropData instances
+            wait: if True the method returns after the snapshot was written
+
+        Returns:
+
+        """
+        self.wait()
+        self._mark_dirty()
+        if self._stream:
+            self._stream.close()
+            self._stream = None
+        self._generation += 1
+        self._record_count = 0
+
+        snapshot = model.subgraph(model.nodes)
+        self._compaction = threading.Thread(target=self._write_snapshot,
+                                            args=(snapshot, list(backdrops), self._generation))
+        self._compaction.daemon = True
+        self._compaction.start()
+        if wait:
+            self.wait()
+
+    def _write_snapshot(self, model, backdrops, generation):
+        path = self._get_path("snapshot", generation)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as stream:
+                write_graph(stream, model, backdrops)
+                stream.flush()
+                os.fsync(stream.fileno())
+            # the snapshot only counts once it is complete
+            os.rename(tmp_path, path)
+        except (IOError, OSError):
+            LOG.warning("Not able to write journal snapshot '{0}'".format(path), exc_info=True)
+            return
+
+        for kind, file_generation, file_path in self._get_files():
+            if file_generation < generation:
+                try:
+                    os.remove(file_path)
+                except OSError:
+                    LOG.warning("Not able to remove outdated journal file '{0}'".format(file_path))
+
+    def wait(self):
+        """ waits until a running compaction finished
+
+        Returns:
+
+        """
+        if self._compaction is not None:
+            self._compaction.join()
+            self._compaction = None
+
+    def recover(self):
+        """ restores the state from the latest snapshot and all later journal records
+
+        Returns: GraphModel instance and list of BackdropData instances
+
+        """
+        self.wait()
+        if self._stream:
+            self._stream.flush()
+
+        files = self._get_files()
+        snapshots = sorted(_[1] for _ in files if _[0] == "snapshot")
+        model, backdrops = GraphModel(), []
+        first_generation = 0
+        if snapshots:
+            first_generation = snapshots[-1]
+            model, backdrops = load_graph(self._get_path("snapshot", first_generation))
+
+        for generation in sorted(_[1] for _ in files if _[0] == "journal" and _[1] >= first_generation):
+            self._replay(self._get_path("journal", generation), model)
+        return model, backdrops
+
+    def _replay(self, path, model):
+        with open(path, "rb") as stream:
+            data = bytearray(stream.read())
+
+        position = 0
+        while position < len(data):
+            reader = _RecordReader(data, position)
+            try:
+                size = reader.read_varint()
+                start = reader.position
+                payload = data[start:start + size]
+                checksum = bytes(data[start + size:start + size + _CHECKSUM.size])
+            except IndexError:
+                payload, checksum = None, b""
+            if len(checksum) != _CHECKSUM.size or \
+                    _CHECKSUM.unpack(checksum)[0] != zlib.crc32(bytes(payload)) & 0xFFFFFFFF:
+                # the record was interrupted by a crash, everything before is valid
+                LOG.warning("Journal '{0}' ends with an incomplete record.".format(path))
+                return
+            position = start + size + _CHECKSUM.size
+            self._apply(_RecordReader(payload), model)
+
+    @staticmethod
+    def _apply(reader, model):
+        operation = reader.read_byte()
+        if operation == _NODE_CREATED:
+            name = reader.read_string()
+            node_type = reader.read_string()
+            position = reader.read_position() if reader.read_byte() else None
+            model.add_node(name, node_type, position)
+        elif operation == _NODE_RENAMED:
+            old_name = reader.read_string()
+            new_name = reader.read_string()
+            if new_name not in model:
+                model.rename_node(old_name, new_name)
+        elif operation == _NODE_DELETED:
+            model.remove_node(reader.read_string())
+        elif operation == _ATTRIBUTE_ADDED:
+            node_name = reader.read_string()
+            attribute_name = reader.read_string()
+            data_type = reader.read_string()
+            flags = reader.read_byte()
+            model.add_attribute(node_name, attribute_name, bool(flags & 1), bool(flags & 2), data_type)
+        elif operation in (_CONNECTED, _DISCONNECTED):
+            edge = [reader.read_string() for _ in range(4)]
+            if operation == _DISCONNECTED:
+                model.disconnect(*edge)
+            else:
+                model.connect(*edge)
+        elif operation == _NODE_MOVED:
+            name = reader.read_string()
+            model.set_position(name, *reader.read_position())
+        elif operation == _CLEARED:
+            model.clear()
+        else:
+            raise ValueError("Unknown journal operation {0}.".format(operation))
+
+    def discard(self):
+        """ removes all snapshots and journal records, e.g. after the graph was saved
+
+        Returns:
+
+        """
+        self.wait()
+        if self._stream:
+            self._stream.close()
+            self._stream = None
+        for kind, generation, path in self._get_files():
+            try:
+                os.remove(path)
+            except OSError:
+                LOG.warning("Not able to remove journal file '{0}'".format(path))
+        self._record_count = 0
+
+    def close(self, clean=False):
+        """ closes the journal and unlocks the directory
+
+        Args:
+            clean: if True the journal files get removed and the session is marked as cleanly shut down
+
+        Returns:
+
+        """
+        self.wait()
+        if self._stream:
+            self._stream.close()
+            self._stream = None
+        if clean:
+            self.discard()
+            try:
+                open(self._get_clean_path(), "w").close()
+                self._dirty = False
+            except (IOError, OSError):
+                LOG.warning("Not able to mark journal directory '{0}' as clean".format(self._directory))
+        self._release_lock()
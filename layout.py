@@ -0,0 +1,875 @@
+import collections
+import json
+import logging
+import math
+import os
+import random
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+LOG = logging.getLogger(name="CocoNodz.layout")
+
+
+class LayoutCancelled(Exception):
+    """ raised when a layout computation was cancelled
+
+    """
+
+
+class LayoutSnapshot(object):
+    """ plain description of the nodes and edges a layout will work on
+
+    A snapshot holds no references to any QGraphicsItems, so layouts can be computed
+    and tested without a scene.
+    Edges are stored as (upstream node, downstream node) pairs, the upstream node being
+    the one that owns the plug.
+    """
+    __slots__ = ("node_names", "sizes", "positions", "edges")
+
+    def __init__(self, node_names, sizes=None, positions=None, edges=()):
+        self.node_names = tuple(node_names)
+        # name: (width, height)
+        self.sizes = dict(sizes or {})
+        # name: (x, y)
+        self.positions = dict(positions or {})
+        self.edges = tuple(edges)
+
+    def get_size(self, node_name, default=(200, 25)):
+        return self.sizes.get(node_name, default)
+
+    def adjacency(self):
+        """ builds the adjacency lists of all snapshot nodes
+
+        Edges referring to nodes outside of the snapshot and self loops will be skipped
+
+        Returns: tuple of upstream and downstream dicts, both holding node name lists by node name
+
+        """
+        upstream = dict((_, []) for _ in self.node_names)
+        downstream = dict((_, []) for _ in self.node_names)
+        for source, destination in self.edges:
+            if source == destination or source not in upstream or destination not in upstream:
+                continue
+            downstream[source].append(destination)
+            upstream[destination].append(source)
+        return upstream, downstream
+
+    @classmethod
+    def from_model(cls, model, node_names=None, sizes=None):
+        """ creates a snapshot from a GraphModel
+
+        Args:
+            model: GraphModel instance
+            node_names: expects a list of node names otherwise it will consider all model nodes
+            sizes: dict holding (width, height) tuples by node name
+
+        Returns: LayoutSnapshot instance
+
+        """
+        if node_names is None:
+            node_names = model.node_names
+        names = set(node_names)
+        positions = {}
+        edges = set()
+        for name in node_names:
+            node = model.get_node(name)
+            if not node:
+                continue
+            if node.position:
+                positions[name] = node.position
+            for edge in node.edges:
+                if edge[0] in names and edge[2] in names:
+                    edges.add((edge[0], edge[2]))
+        return cls(node_names, sizes, positions, sorted(edges))
+
+
+def _break_cycles(node_names, downstream):
+    """ finds the edges that close cycles, using an iterative depth first search
+
+    Args:
+        node_names: node names
+        downstream: downstream adjacency dict
+
+    Returns: set of (upstream node, downstream node) edges that have to be reversed
+
+    """
+    visiting, done = set(), set()
+    reversed_edges = set()
+    for root in node_names:
+        if root in done:
+            continue
+        visiting.add(root)
+        stack = [(root, iter(downstream[root]))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if child in visiting:
+                    reversed_edges.add((node, child))
+                elif child not in done:
+                    visiting.add(child)
+                    stack.append((child, iter(downstream[child])))
+                    break
+            else:
+                stack.pop()
+                visiting.discard(node)
+                done.add(node)
+    return reversed_edges
+
+
+def assign_ranks(node_names, upstream, downstream):
+    """ assigns every node the length of the longest path to a node without downstream connections
+
+    Cycles will be broken by ignoring the edges closing them. Runs in O(V+E).
+
+    Args:
+        node_names: node names
+        upstream: upstream adjacency dict
+        downstream: downstream adjacency dict
+
+    Returns: dict holding the rank by node name, nodes without downstream connections are ranked 0
+
+    """
+    ignored = _break_cycles(node_names, downstream)
+    if ignored:
+        LOG.info("Ignoring {0} connection(s) that close cycles.".format(len(ignored)))
+
+    pending = {}
+    for name in node_names:
+        pending[name] = sum(1 for _ in downstream[name] if (name, _) not in ignored)
+
+    ranks = {}
+    queue = [_ for _ in node_names if not pending[_]]
+    for name in queue:
+        ranks[name] = 0
+    index = 0
+    while index < len(queue):
+        name = queue[index]
+        index += 1
+        for parent in upstream[name]:
+            if (parent, name) in ignored:
+                continue
+            ranks[parent] = max(ranks.get(parent, 0), ranks[name] + 1)
+            pending[parent] -= 1
+            if not pending[parent]:
+                queue.append(parent)
+    return ranks
+
+
+def order_layers(ranks, upstream, downstream, sweeps=4):
+    """ orders the nodes of all layers to reduce connection crossings
+
+    Starts from a depth first order and applies barycentric sweeps alternating
+    from the downstream and the upstream side.
+
+    Args:
+        ranks: dict holding the rank by node name
+        upstream: upstream adjacency dict
+        downstream: downstream adjacency dict
+        sweeps: number of barycentric sweeps
+
+    Returns: list of node name lists, one per rank
+
+    """
+    layers = [[] for _ in range(max(ranks.values()) + 1 if ranks else 0)]
+
+    # initial order, walking upstream from the sinks keeps connected nodes together
+    seen = set()
+    for root in sorted(_ for _ in ranks if ranks[_] == 0):
+        stack = [root]
+        while stack:
+            name = stack.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+            layers[ranks[name]].append(name)
+            stack.extend(reversed(upstream[name]))
+
+    position = {}
+    for layer in layers:
+        for index, name in enumerate(layer):
+            position[name] = index
+
+    def _sweep(layer_indices, neighbours):
+        for layer_index in layer_indices:
+            layer = layers[layer_index]
+            barycenters = {}
+            for name in layer:
+                indices = [position[_] for _ in neighbours[name] if _ in position]
+                barycenters[name] = float(sum(indices)) / len(indices) if indices else position[name]
+            layer.sort(key=lambda _: barycenters[_])
+            for index, name in enumerate(layer):
+                position[name] = index
+
+    for sweep in range(sweeps):
+        if sweep % 2:
+            _sweep(range(len(layers) - 2, -1, -1), upstream)
+        else:
+            _sweep(range(1, len(layers)), downstream)
+    return layers
+
+
+def _check_cancelled(cancelled):
+    if cancelled and cancelled():
+        raise LayoutCancelled()
+
+
+def layered_layout(snapshot, margin=100, sweeps=4, origin=None, progress=None, cancelled=None):
+    """ computes a layered layout, downstream nodes are placed right of their upstream nodes
+
+    Args:
+        snapshot: LayoutSnapshot instance
+        margin: space between layers and nodes
+        sweeps: number of barycentric crossing reduction sweeps
+        origin: x, y tuple of the top left layout corner, defaults to the top left corner
+        of the current snapshot positions
+        progress: callable that receives the progress as float between 0 and 1
+        cancelled: callable that returns True if the computation should stop,
+        it will raise LayoutCancelled in that case
+
+    Returns: dict holding (x, y) tuples by node name
+
+    """
+    if not snapshot.node_names:
+        return {}
+
+    upstream, downstream = snapshot.adjacency()
+    ranks = assign_ranks(snapshot.node_names, upstream, downstream)
+    _check_cancelled(cancelled)
+    if progress:
+        progress(0.25)
+
+    layers = order_layers(ranks, upstream, downstream, sweeps)
+    _check_cancelled(cancelled)
+    if progress:
+        progress(0.5)
+
+    if origin is None:
+        if snapshot.positions:
+            origin = (min(_[0] for _ in snapshot.positions.values()),
+                      min(_[1] for _ in snapshot.positions.values()))
+        else:
+            origin = (0, 0)
+
+    # layers left to right, each layer is as wide as its widest node
+    column_x = {}
+    x = origin[0]
+    for rank in range(len(layers) - 1, -1, -1):
+        column_x[rank] = x
+        x += max(snapshot.get_size(_)[0] for _ in layers[rank]) + margin
+
+    # align nodes with their downstream nodes as far as the order of the layer allows it
+    positions = {}
+    for rank, layer in enumerate(layers):
+        _check_cancelled(cancelled)
+        if progress:
+            progress(0.5 + 0.5 * rank / len(layers))
+        bottom = None
+        for name in layer:
+            height = snapshot.get_size(name)[1]
+            targets = [positions[_][1] for _ in downstream[name] if _ in positions]
+            y = float(sum(targets)) / len(targets) if targets else 0
+            if bottom is not None:
+                y = max(y, bottom)
+            positions[name] = (column_x[rank], y)
+            bottom = y + height + margin
+
+    offset_y = origin[1] - min(_[1] for _ in positions.values())
+    for name, (x, y) in positions.items():
+        positions[name] = (x, y + offset_y)
+    if progress:
+        progress(1.0)
+    return positions
+
+
+def incremental_layout(snapshot, node_names, margin=100, is_free=None, max_steps=100):
+    """ places the given nodes next to their already placed neighbours
+
+    All other snapshot nodes keep their positions, so the snapshot only has to hold the
+    nodes to place and their neighbours. The costs scale with the size of that neighbourhood.
+    Nodes to place that are not connected to any placed node are laid out in layers at their
+    current position, moved down until they don't overlap anything.
+
+    Args:
+        snapshot: LayoutSnapshot instance
+        node_names: names of the nodes to place
+        margin: space between nodes
+        is_free: callable that gets x, y, width, height and returns False if the area is occupied
+        by nodes outside of the snapshot
+        max_steps: maximum number of attempts to move a node out of occupied areas
+
+    Returns: dict holding (x, y) tuples of the placed nodes by node name
+
+    """
+    upstream, downstream = snapshot.adjacency()
+    to_place = set(_ for _ in node_names if _ in upstream)
+    fixed = dict((name, position) for name, position in snapshot.positions.items() if name not in to_place)
+    placed = {}
+    occupied = [(x, y) + tuple(snapshot.get_size(name)) for name, (x, y) in fixed.items()]
+
+    def _position(name):
+        return placed.get(name, fixed.get(name))
+
+    def _overlaps(x, y, width, height):
+        for other_x, other_y, other_width, other_height in occupied:
+            if (x < other_x + other_width + margin and other_x < x + width + margin and
+                    y < other_y + other_height + margin and other_y < y + height + margin):
+                return True
+        return is_free is not None and not is_free(x, y, width, height)
+
+    # breadth first from the placed nodes, so new nodes can attach to other new nodes
+    queue = [_ for _ in node_names if _ in to_place and
+             any(_position(n) is not None for n in upstream[_] + downstream[_])]
+    queued = set(queue)
+    index = 0
+    while index < len(queue):
+        name = queue[index]
+        index += 1
+        width, height = snapshot.get_size(name)
+
+        targets = [(n, _position(n)) for n in downstream[name] if _position(n) is not None]
+        sources = [(n, _position(n)) for n in upstream[name] if _position(n) is not None]
+        if targets:
+            x = min(_[1][0] for _ in targets) - width - margin
+        else:
+            x = max(_[1][0] + snapshot.get_size(_[0])[0] for _ in sources) + margin
+        neighbours = targets + sources
+        y = float(sum(_[1][1] for _ in neighbours)) / len(neighbours)
+
+        step = 0
+        while step < max_steps and _overlaps(x, y, width, height):
+            y += height + margin
+            step += 1
+
+        placed[name] = (x, y)
+        occupied.append((x, y, width, height))
+
+        for neighbour in upstream[name] + downstream[name]:
+            if neighbour in to_place and neighbour not in queued:
+                queued.add(neighbour)
+                queue.append(neighbour)
+
+    # islands that are not connected to any placed node
+    remaining = [_ for _ in node_names if _ in to_place and _ not in placed]
+    if remaining:
+        island_names = set(remaining)
+        island = LayoutSnapshot(remaining,
+                                sizes=snapshot.sizes,
+                                positions=dict((_, snapshot.positions[_]) for _ in remaining
+                                               if _ in snapshot.positions),
+                                edges=[_ for _ in snapshot.edges if _[0] in island_names and _[1] in island_names])
+        island_positions = layered_layout(island, margin=margin)
+
+        # move the whole island down until it doesn't overlap anything
+        island_height = max(y + snapshot.get_size(name)[1] for name, (x, y) in island_positions.items()) - \
+            min(_[1] for _ in island_positions.values())
+        offset = 0
+        step = 0
+        while step < max_steps and any(_overlaps(x, y + offset, *snapshot.get_size(name))
+                                       for name, (x, y) in island_positions.items()):
+            offset += island_height + margin
+            step += 1
+        for name, (x, y) in island_positions.items():
+            placed[name] = (x, y + offset)
+    return placed
+
+
+def _repulse_python(centers, displacement, cell_size, strength):
+    cells = {}
+    for index, (x, y) in enumerate(centers):
+        cells.setdefault((int(math.floor(x / cell_size)), int(math.floor(y / cell_size))), []).append(index)
+
+    max_distance = cell_size * cell_size
+    for (cell_x, cell_y), members in cells.items():
+        neighbours = [_ for offset_x in (-1, 0, 1) for offset_y in (-1, 0, 1)
+                      for _ in cells.get((cell_x + offset_x, cell_y + offset_y), ())]
+        for index in members:
+            x, y = centers[index]
+            for other in neighbours:
+                delta_x = x - centers[other][0]
+                delta_y = y - centers[other][1]
+                distance = delta_x * delta_x + delta_y * delta_y
+                if 0 < distance < max_distance:
+                    displacement[index][0] += delta_x * strength / distance
+                    displacement[index][1] += delta_y * strength / distance
+
+
+def _attract_python(centers, displacement, edges, distance):
+    for source, destination in edges:
+        delta_x = centers[source][0] - centers[destination][0]
+        delta_y = centers[source][1] - centers[destination][1]
+        factor = math.sqrt(delta_x * delta_x + delta_y * delta_y) / distance
+        displacement[source][0] -= delta_x * factor
+        displacement[source][1] -= delta_y * factor
+        displacement[destination][0] += delta_x * factor
+        displacement[destination][1] += delta_y * factor
+
+
+def _move_python(centers, displacement, temperature):
+    for index, (x, y) in enumerate(displacement):
+        length = math.sqrt(x * x + y * y)
+        if length:
+            scale = min(length, temperature) / length
+            centers[index] = (centers[index][0] + x * scale, centers[index][1] + y * scale)
+
+
+def _accumulate_numpy(displacement, indices, force):
+    # bincount is a lot faster than numpy.add.at for scattered sums
+    length = len(displacement)
+    displacement[:, 0] += numpy.bincount(indices, weights=force[:, 0], minlength=length)
+    displacement[:, 1] += numpy.bincount(indices, weights=force[:, 1], minlength=length)
+
+
+def _repulse_numpy(centers, displacement, cell_size, strength):
+    # sort the nodes by grid cell and collect the member pairs of all neighbouring cells at once
+    cells = numpy.floor(centers / cell_size).astype(numpy.int64)
+    cells -= cells.min(axis=0) - 1
+    stride = int(cells[:, 1].max()) + 2
+    keys = cells[:, 0] * stride + cells[:, 1]
+    order = numpy.argsort(keys, kind="mergesort")
+    cell_keys, starts, counts = numpy.unique(keys[order], return_index=True, return_counts=True)
+
+    # every pair of neighbouring cells is visited once, the force is applied to both sides
+    first, second = [], []
+    for offset_x, offset_y in ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1)):
+        neighbour_keys = cell_keys + offset_x * stride + offset_y
+        found = numpy.minimum(numpy.searchsorted(cell_keys, neighbour_keys), len(cell_keys) - 1)
+        valid = cell_keys[found] == neighbour_keys
+        own_starts, own_counts = starts[valid], counts[valid]
+        other_starts, other_counts = starts[found[valid]], counts[found[valid]]
+        pair_counts = own_counts * other_counts
+        if not pair_counts.sum():
+            continue
+        pair = numpy.repeat(numpy.arange(len(pair_counts)), pair_counts)
+        local = numpy.arange(pair_counts.sum()) - numpy.repeat(numpy.cumsum(pair_counts) - pair_counts,
+                                                               pair_counts)
+        own_local = local // other_counts[pair]
+        other_local = local % other_counts[pair]
+        if not offset_x and not offset_y:
+            # pairs within the same cell
+            keep = own_local < other_local
+            pair, own_local, other_local = pair[keep], own_local[keep], other_local[keep]
+        first.append(order[own_starts[pair] + own_local])
+        second.append(order[other_starts[pair] + other_local])
+
+    first = numpy.concatenate(first)
+    second = numpy.concatenate(second)
+    delta = centers[first] - centers[second]
+    distance = (delta * delta).sum(axis=1)
+    valid = (distance > 0) & (distance < cell_size * cell_size)
+    force = delta[valid] * (strength / distance[valid])[:, None]
+    _accumulate_numpy(displacement, first[valid], force)
+    _accumulate_numpy(displacement, second[valid], -force)
+
+
+def _attract_numpy(centers, displacement, sources, destinations, distance):
+    delta = centers[sources] - centers[destinations]
+    force = delta * (numpy.sqrt((delta * delta).sum(axis=1)) / distance)[:, None]
+    _accumulate_numpy(displacement, sources, -force)
+    _accumulate_numpy(displacement, destinations, force)
+
+
+def _move_numpy(centers, displacement, temperature):
+    length = numpy.sqrt((displacement * displacement).sum(axis=1))
+    scale = numpy.where(length > 0, numpy.minimum(length, temperature) / numpy.maximum(length, 1e-9), 0.0)
+    centers += displacement * scale[:, None]
+
+
+def force_directed_layout(snapshot, margin=100, iterations=50, origin=None, use_numpy=None,
+                          progress=None, cancelled=None, seed=0):
+    """ computes a force directed layout, meant for very large networks
+
+    Connected nodes attract each other while all nodes repulse each other. Repulsion only considers
+    nodes in neighbouring cells of a uniform grid, which keeps every iteration close to linear.
+    Nodes start from their current snapshot positions. Uses vectorized steps if numpy is available
+    and falls back to plain python otherwise.
+
+    Args:
+        snapshot: LayoutSnapshot instance
+        margin: space between nodes, defines the preferred connection length together with the node sizes
+        iterations: number of simulation steps
+        origin: x, y tuple of the top left layout corner, defaults to the top left corner
+        of the current snapshot positions
+        use_numpy: if False the python implementation will be used, defaults to numpy if available
+        progress: callable that receives the progress as float between 0 and 1
+        cancelled: callable that returns True if the computation should stop,
+        it will raise LayoutCancelled in that case
+        seed: random seed used to place nodes without position
+
+    Returns: dict holding (x, y) tuples by node name
+
+    """
+    names = snapshot.node_names
+    if not names:
+        return {}
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    elif use_numpy and numpy is None:
+        raise ImportError("numpy is not available.")
+
+    sizes = [snapshot.get_size(_) for _ in names]
+    distance = margin + float(sum(max(_) for _ in sizes)) / len(sizes)
+    strength = distance * distance
+    cell_size = 2 * distance
+    indices = dict((name, index) for index, name in enumerate(names))
+    edges = [(indices[source], indices[destination]) for source, destination in snapshot.edges
+             if source in indices and destination in indices and source != destination]
+
+    # seed from the current centers, slightly jittered so overlapping nodes can separate
+    rand = random.Random(seed)
+    extent = distance * math.sqrt(len(names))
+    centers = []
+    for name, (width, height) in zip(names, sizes):
+        position = snapshot.positions.get(name)
+        if position:
+            centers.append((position[0] + width * 0.5 + rand.uniform(-1, 1),
+                            position[1] + height * 0.5 + rand.uniform(-1, 1)))
+        else:
+            centers.append((rand.uniform(0, extent), rand.uniform(0, extent)))
+
+    if origin is None:
+        if snapshot.positions:
+            origin = (min(_[0] for _ in snapshot.positions.values()),
+                      min(_[1] for _ in snapshot.positions.values()))
+        else:
+            origin = (0, 0)
+
+    if use_numpy:
+        centers = numpy.array(centers, dtype=float)
+        sources = numpy.array([_[0] for _ in edges], dtype=int)
+        destinations = numpy.array([_[1] for _ in edges], dtype=int)
+
+    start_temperature = extent * 0.1
+    for iteration in range(iterations):
+        _check_cancelled(cancelled)
+        temperature = start_temperature * (1.0 - float(iteration) / iterations)
+        if use_numpy:
+            displacement = numpy.zeros_like(centers)
+            _repulse_numpy(centers, displacement, cell_size, strength)
+            if edges:
+                _attract_numpy(centers, displacement, sources, destinations, distance)
+            _move_numpy(centers, displacement, temperature)
+        else:
+            displacement = [[0.0, 0.0] for _ in names]
+            _repulse_python(centers, displacement, cell_size, strength)
+            _attract_python(centers, displacement, edges, distance)
+            _move_python(centers, displacement, temperature)
+        if progress:
+            progress(float(iteration + 1) / iterations)
+
+    if use_numpy:
+        centers = centers.tolist()
+    corners = [(x - width * 0.5, y - height * 0.5) for (x, y), (width, height) in zip(centers, sizes)]
+    offset_x = origin[0] - min(_[0] for _ in corners)
+    offset_y = origin[1] - min(_[1] for _ in corners)
+    return dict((name, (x + offset_x, y + offset_y)) for name, (x, y) in zip(names, corners))
+
+
+class OccupancyGrid(object):
+    """ spatial hash of occupied rectangles that finds free space near an anchor
+
+    Free positions are searched on rings of grid steps around the anchor. Every anchor keeps
+    a cursor on the last occupied candidate, so consecutive searches around the same anchor
+    continue where the previous one stopped and take about constant time per rectangle.
+    """
+
+    def __init__(self, step_x, step_y, margin=0):
+        self._step_x = float(step_x)
+        self._step_y = float(step_y)
+        self._margin = margin
+        self._cells = {}
+        self._cursors = {}
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def _cell_range(self, x, y, width, height):
+        return (range(int(math.floor(x / self._step_x)), int(math.floor((x + width) / self._step_x)) + 1),
+                range(int(math.floor(y / self._step_y)), int(math.floor((y + height) / self._step_y)) + 1))
+
+    def add(self, x, y, width, height):
+        """ marks a rectangle as occupied
+
+        Args:
+            x: left
+            y: top
+            width: width
+            height: height
+
+        Returns:
+
+        """
+        rect = (x, y, width, height)
+        self._count += 1
+        columns, rows = self._cell_range(x, y, width, height)
+        for column in columns:
+            for row in rows:
+                self._cells.setdefault((column, row), []).append(rect)
+
+    def is_free(self, x, y, width, height):
+        """ checks if a rectangle keeps the margin to all occupied rectangles
+
+        Args:
+            x: left
+            y: top
+            width: width
+            height: height
+
+        Returns: bool
+
+        """
+        margin = self._margin
+        columns, rows = self._cell_range(x - margin, y - margin, width + 2 * margin, height + 2 * margin)
+        for column in columns:
+            for row in rows:
+                for other_x, other_y, other_width, other_height in self._cells.get((column, row), ()):
+                    if (x < other_x + other_width + margin and other_x < x + width + margin and
+                            y < other_y + other_height + margin and other_y < y + height + margin):
+                        return False
+        return True
+
+    def _ring(self, radius):
+        if not radius:
+            return [(0, 0)]
+        # top and bottom row first, so nodes rather stack than spread sideways
+        candidates = [(_, -radius) for _ in range(-radius, radius + 1)]
+        candidates += [(radius, _) for _ in range(-radius + 1, radius)]
+        candidates += [(_, radius) for _ in range(radius, -radius - 1, -1)]
+        candidates += [(-radius, _) for _ in range(radius - 1, -radius, -1)]
+        return candidates
+
+    def find_free(self, x, y, width, height, is_free=None, max_radius=1000):
+        """ finds the closest free position to the anchor and marks it as occupied
+
+        Args:
+            x: anchor left
+            y: anchor top
+            width: width
+            height: height
+            is_free: optional callable that gets x, y, width, height and returns False if the area is occupied
+            by something the grid doesn't know about
+            max_radius: maximum number of rings to search
+
+        Returns: x, y tuple of the top left corner, the anchor if no free position was found
+
+        """
+        anchor = (x, y)
+        radius, index = self._cursors.get(anchor, (0, 0))
+        while radius <= max_radius:
+            candidates = self._ring(radius)
+            while index < len(candidates):
+                column, row = candidates[index]
+                candidate_x = x + column * self._step_x
+                candidate_y = y + row * self._step_y
+                if (self.is_free(candidate_x, candidate_y, width, height) and
+                        (is_free is None or is_free(candidate_x, candidate_y, width, height))):
+                    self._cursors[anchor] = (radius, index)
+                    self.add(candidate_x, candidate_y, width, height)
+                    return candidate_x, candidate_y
+                index += 1
+            radius += 1
+            index = 0
+
+        LOG.info("No free position found around {0}.".format(anchor))
+        self.add(x, y, width, height)
+        return anchor
+
+
+class _Skyline(object):
+    """ segment tree over compressed x coordinates holding the lowest occupied y per x range
+
+    Values only grow, so it works without lazy propagation. Updates and queries take O(log n).
+    """
+
+    def __init__(self, size):
+        self._size = max(size, 1)
+        # highest value applied to the whole segment
+        self._full = [float("-inf")] * (4 * self._size)
+        # highest value applied to any part of the segment
+        self._partial = [float("-inf")] * (4 * self._size)
+
+    def raise_to(self, start, end, value, node=1, low=0, high=None):
+        if high is None:
+            high = self._size
+        if end <= low or high <= start:
+            return
+        self._partial[node] = max(self._partial[node], value)
+        if start <= low and high <= end:
+            self._full[node] = max(self._full[node], value)
+            return
+        middle = (low + high) // 2
+        self.raise_to(start, end, value, 2 * node, low, middle)
+        self.raise_to(start, end, value, 2 * node + 1, middle, high)
+
+    def highest(self, start, end, node=1, low=0, high=None):
+        if high is None:
+            high = self._size
+        if end <= low or high <= start:
+            return float("-inf")
+        if start <= low and high <= end:
+            return self._partial[node]
+        middle = (low + high) // 2
+        return max(self._full[node],
+                   self.highest(start, end, 2 * node, low, middle),
+                   self.highest(start, end, 2 * node + 1, middle, high))
+
+
+def remove_overlaps(snapshot, margin=0):
+    """ moves nodes down until they keep the margin to all nodes above them
+
+    Sweeps the nodes from top to bottom while a segment tree keeps track of the lowest occupied
+    position per horizontal range. Runs in O(n log n) and nodes that don't overlap won't be moved.
+
+    Args:
+        snapshot: LayoutSnapshot instance, only nodes with a position will be considered
+        margin: space that will be kept between nodes
+
+    Returns: dict holding (x, y) tuples of all moved nodes by node name
+
+    """
+    names = [_ for _ in snapshot.node_names if _ in snapshot.positions]
+    if not names:
+        return {}
+
+    # half open horizontal ranges, extended by the margin so close neighbours count as overlapping
+    ranges = {}
+    for name in names:
+        x = snapshot.positions[name][0]
+        ranges[name] = (x, x + snapshot.get_size(name)[0] + margin)
+    coordinates = sorted(set(_ for bounds in ranges.values() for _ in bounds))
+    indices = dict((value, index) for index, value in enumerate(coordinates))
+
+    skyline = _Skyline(len(coordinates))
+    moved = {}
+    for name in sorted(names, key=lambda _: (snapshot.positions[_][1], snapshot.positions[_][0])):
+        x, y = snapshot.positions[name]
+        start, end = indices[ranges[name][0]], indices[ranges[name][1]]
+        top = skyline.highest(start, end)
+        if top > y:
+            y = top
+            moved[name] = (x, y)
+        skyline.raise_to(start, end, y + snapshot.get_size(name)[1] + margin)
+    return moved
+
+
+def move_to_origin(positions, origin):
+    """ moves positions so their top left corner lies at the origin
+
+    Args:
+        positions: dict holding (x, y) tuples by node name
+        origin: x, y tuple
+
+    Returns: dict holding (x, y) tuples by node name
+
+    """
+    if not positions:
+        return {}
+    offset_x = origin[0] - min(_[0] for _ in positions.values())
+    offset_y = origin[1] - min(_[1] for _ in positions.values())
+    return dict((name, (x + offset_x, y + offset_y)) for name, (x, y) in positions.items())
+
+
+class LayoutCache(object):
+    """ least recently used cache of computed node positions
+
+    Entries are keyed by strings like a topology fingerprint and can optionally be persisted as
+    json files to a cache directory, so layouts survive sessions.
+    """
+
+    def __init__(self, max_size=64, cache_dir=None):
+        self._max_size = max_size
+        self._cache_dir = cache_dir
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries or (self._cache_dir is not None and os.path.isfile(self._get_path(key)))
+
+    @property
+    def cache_dir(self):
+        return self._cache_dir
+
+    def _get_path(self, key):
+        return os.path.join(self._cache_dir, "{0}.json".format(key))
+
+    def get(self, key):
+        """ gets the cached positions and marks them as recently used
+
+        Args:
+            key: cache key
+
+        Returns: dict holding (x, y) tuples by node name or None if nothing was cached
+
+        """
+        positions = self._entries.pop(key, None)
+        if positions is None:
+            positions = self._read(key)
+            if positions is None:
+                return None
+        self._entries[key] = positions
+        self._evict()
+        return dict(positions)
+
+    def put(self, key, positions):
+        """ caches positions and evicts the least recently used entries above the size limit
+
+        Args:
+            key: cache key
+            positions: dict holding (x, y) tuples by node name
+
+        Returns:
+
+        """
+        self._entries.pop(key, None)
+        self._entries[key] = dict(positions)
+        self._evict()
+        self._write(key, positions)
+
+    def clear(self):
+        self._entries.clear()
+
+    def _evict(self):
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def _read(self, key):
+        if self._cache_dir is None:
+            return None
+        path = self._get_path(key)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, "r") as cache_file:
+                data = json.load(cache_file)
+        except (IOError, OSError, ValueError):
+            LOG.warning("Not able to read layout cache file {0}".format(path), exc_info=True)
+            return None
+        # mark as recently used for the directory pruning
+        os.utime(path, None)
+        return dict((name, tuple(position)) for name, position in data.items())
+
+    def _write(self, key, positions):
+        if self._cache_dir is None:
+            return
+        try:
+            if not os.path.isdir(self._cache_dir):
+                os.makedirs(self._cache_dir)
+            with open(self._get_path(key), "w") as cache_file:
+                json.dump(dict((name, list(position)) for name, position in positions.items()), cache_file)
+            self._prune_dir()
+        except (IOError, OSError):
+            LOG.warning("Not able to write layout cache to {0}".format(self._cache_dir), exc_info=True)
+
+    def _prune_dir(self):
+        paths = [os.path.join(self._cache_dir, _) for _ in os.listdir(self._cache_dir) if _.endswith(".json")]
+        if len(paths) <= self._max_size:
+            return
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:len(paths) - self._max_size]:
+            os.remove(path)
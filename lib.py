@@ -1,9 +1,12 @@
+import copy
 from functools import partial
 import json
 import logging
 import os
 import pprint
 import sys
+import re
+import threading
 
 from coconodz import (Qt,
                       application
@@ -12,6 +15,8 @@ from coconodz import (Qt,
 
 LOG = logging.getLogger(name="CocoNodz.nodegraph")
 
+_CONFIGURATION_KEY = re.compile(r"^[A-Za-z][A-Za-z0-9_]*$")
+
 
 class SafeOpen(object):
     """ safer handler to open files
@@ -41,6 +46,8 @@ class BaseWindow(Qt.QtWidgets.QMainWindow):
     TITLE = "CocoNodz Nodegraph"
     PALETTE_PATH = os.path.join(os.path.dirname(__file__), "palette.config")
 
+    signal_closed = Qt.QtCore.Signal()
+
     def __init__(self, parent):
         super(BaseWindow, self).__init__(parent)
 
@@ -51,6 +58,18 @@ class BaseWindow(Qt.QtWidgets.QMainWindow):
 
         self._setup_ui()
 
+    def closeEvent(self, event):
+        """ emits signal_closed when the window gets closed
+
+        Args:
+            event: QCloseEvent
+
+        Returns:
+
+        """
+        super(BaseWindow, self).closeEvent(event)
+        self.signal_closed.emit()
+
     @property
     def central_widget(self):
         """ gets the set central widget
@@ -664,6 +683,7 @@ class Backdrop(Qt.QtWidgets.QGraphicsRectItem):
             bounds: tuple including x,y of the topleft corner width and height
             color: tuple including RGBA as integers from 0-255
             border_color: tuple including RGBA as integers from 0-255
+            styles: StyleCache instance the backdrop takes its brushes, pens and fonts from
         """
         super(Backdrop, self).__init__()
 
@@ -695,24 +715,16 @@ class Backdrop(Qt.QtWidgets.QGraphicsRectItem):
         self.setFlag(Qt.QtWidgets.QGraphicsItem.ItemIsSelectable)
         self.setFlag(Qt.QtWidgets.QGraphicsItem.ItemIsFocusable, True)
 
-        # style
-        self._bg_color = Qt.QtGui.QColor(*self._color)
-        self._bg_border_color = Qt.QtGui.QColor(*self._border_color)
-
-        self._bg_brush = Qt.QtGui.QBrush(self._bg_color, Qt.QtCore.Qt.SolidPattern)
-        self._bg_pen = Qt.QtGui.QPen(Qt.QtCore.Qt.SolidLine)
-        self._bg_pen.setJoinStyle(Qt.QtCore.Qt.RoundJoin)
-        self._bg_pen.setWidth(1)
-        self._bg_pen.setColor(self._bg_border_color)
-
+        # style, the brushes, pens and fonts are shared and get replaced instead of changed
+        self._styles = kwargs.get("styles") or StyleCache()
+        self._bg_brush = self._styles.brush(self._color)
+        self._bg_pen = self._styles.pen(self._border_color, 2, Qt.QtCore.Qt.RoundJoin)
         self._bg_pen_selected = self._bg_pen
-        self._bg_pen_selected.setWidth(2)
 
-        self._handle_brush = Qt.QtGui.QBrush(self._bg_color, Qt.QtCore.Qt.BDiagPattern)
-        self._title_font = Qt.QtGui.QFont(self._font, self.title_font_size)
-        self._title_font.setBold(True)
+        self._handle_brush = self._styles.brush(self._color, Qt.QtCore.Qt.BDiagPattern)
+        self._title_font = self._styles.font(self._font, self.title_font_size, bold=True)
 
-        self._description_font = Qt.QtGui.QFont(self._font, self.description_font_size)
+        self._description_font = self._styles.font(self._font, self.description_font_size)
 
         self.background = None
         self.title_bar = None
@@ -750,7 +762,7 @@ class Backdrop(Qt.QtWidgets.QGraphicsRectItem):
         assert isinstance(size, int)
 
         self._title_font_size = size
-        self._title_font.setPointSize(size)
+        self._title_font = self._styles.font(self._font, size, bold=True)
         self.title.setFont(self._title_font)
         self.adjust_to_minimum_height()
 
@@ -763,7 +775,7 @@ class Backdrop(Qt.QtWidgets.QGraphicsRectItem):
         assert isinstance(size, int)
 
         self._description_font_size = size
-        self._description_font.setPointSize(size)
+        self._description_font = self._styles.font(self._font, size)
         self.description.setFont(self._description_font)
         self._adjust_description(self.description_text)
 
@@ -775,11 +787,12 @@ class Backdrop(Qt.QtWidgets.QGraphicsRectItem):
     def color(self, color):
         assert isinstance(color, Qt.QtGui.QColor)
 
-        self._bg_brush.setColor(color)
-        self._handle_brush.setColor(color)
+        self._color = [color.red(), color.green(), color.blue(), color.alpha()]
+        self._bg_brush = self._styles.brush(self._color)
+        self._handle_brush = self._styles.brush(self._color, Qt.QtCore.Qt.BDiagPattern)
         self.setBrush(self._bg_brush)
         self.title_bar.setBrush(self._bg_brush)
-        self._color = [color.red(), color.green(), color.blue(), color.alpha()]
+        self.handle.setBrush(self._handle_brush)
 
     @property
     def border_color(self):
@@ -789,11 +802,16 @@ class Backdrop(Qt.QtWidgets.QGraphicsRectItem):
     def border_color(self, color):
         assert isinstance(color, Qt.QtGui.QColor)
 
-        self._bg_pen.setColor(color)
+        self._border_color = [color.red(), color.green(), color.blue(), color.alpha()]
+        self._bg_pen = self._styles.pen(self._border_color, 2, Qt.QtCore.Qt.RoundJoin)
+        self._bg_pen_selected = self._bg_pen
         self.setPen(self._bg_pen)
         self.handle.setPen(self._bg_pen)
         self.title_bar.setPen(self._bg_pen)
-        self._border_color = [color.red(), color.green(), color.blue(), color.alpha()]
+
+    @property
+    def font(self):
+        return self._font
 
     @property
     def minimum_height(self):
@@ -885,15 +903,14 @@ class Backdrop(Qt.QtWidgets.QGraphicsRectItem):
         Returns:
 
         """
-        for item in self.scene().items():
-            item.setSelected(False)
+        self.scene().clearSelection()
         if self._selection:
             for node in self._selection:
                 node.setSelected(True)
             self._selection = None
 
     def _store_selection(self):
-        self._selection = [item for item in self.scene().items() if item.isSelected()]
+        self._selection = self.scene().selectedItems()
 
     def _remove(self):
         """ _remove() gets called via Nodz, so we have to implement it here
@@ -1086,6 +1103,8 @@ class ConfiguationMixin(object):
     BASE_CONFIG_NAME = "nodegraph.config"
     BASE_CONFIG_PATH = os.path.join(os.path.dirname(__file__), BASE_CONFIG_NAME)
 
+    __styles = None
+
     def __init__(self, *args, **kwargs):
         super(ConfiguationMixin, self).__init__(*args, **kwargs)
 
@@ -1117,7 +1136,7 @@ class ConfiguationMixin(object):
     def configuration(self):
         """ holds the configuration
 
-        Returns: DictDotLookup
+        Returns: Configuration
 
         """
         return self.__data
@@ -1132,8 +1151,21 @@ class ConfiguationMixin(object):
         Returns:
 
         """
-        assert isinstance(value, DictDotLookup), "Expected type DictDotLookup. Got {0}".format(type(value))
+        assert isinstance(value, Configuration), "Expected type Configuration. Got {0}".format(type(value))
         self.__data = value
+        # styles built from the previous configuration are outdated
+        self.styles.configuration = value
+
+    @property
+    def styles(self):
+        """ holds the shared styles built from the configuration
+
+        Returns: StyleCache
+
+        """
+        if self.__styles is None:
+            self.__styles = StyleCache(self.__data)
+        return self.__styles
 
     @property
     def configuration_data(self):
@@ -1154,8 +1186,8 @@ class ConfiguationMixin(object):
 
         """
         LOG.warning("Loading base configuration from {0}".format(configuration_file))
-        data = read_json(configuration_file)
-        self.configuration = DictDotLookup(data)
+        # the cached configuration is shared, so every instance works on its own copy
+        self.configuration = CONFIGURATION_CACHE.get(configuration_file).copy()
 
     def initialize_configuration(self, *args):
         """ loads the predefined default configuration file and converts it to our proper configuration object
@@ -1181,39 +1213,349 @@ class ConfiguationMixin(object):
         return filepath
 
 
-class DictDotLookup(object):
-    """ Creates objects that behave much like a dictionaries, but allow nested
-    key access using object dot lookups.
+class Configuration(object):
+    """ configuration compiled from dict/json data that allows nested key access using object dot lookups
 
+    Every set of keys compiles to its own class with fixed slots and the data gets validated once while compiling.
+    Changing a value writes through to the serialized data, node and data type presets are precomputed
+    so looking them up is a single dict hit.
     """
-    def __init__(self, d):
-        self.__original_data = d
-        for k in d:
-            if isinstance(d[k], dict):
-                self.__dict__[k] = DictDotLookup(d[k])
-            elif isinstance(d[k], (list, tuple)):
-                l = []
-                for v in d[k]:
-                    if isinstance(v, dict):
-                        l.append(DictDotLookup(v))
-                    else:
-                        l.append(v)
-                self.__dict__[k] = l
-            else:
-                self.__dict__[k] = d[k]
+    __slots__ = ("_data", "_frozen", "_node_presets", "_datatype_presets")
+
+    # compiled classes by their sorted keys
+    _compiled = {}
+
+    def __init__(self, data):
+        object.__setattr__(self, "_data", data)
+        object.__setattr__(self, "_frozen", False)
+        object.__setattr__(self, "_node_presets", {})
+        object.__setattr__(self, "_datatype_presets", {})
+        for key, value in data.items():
+            self._set_value(key, value)
+
+    @classmethod
+    def compile(cls, data):
+        """ validates the data and creates the configuration object
+
+        Args:
+            data: dict
+
+        Returns: Configuration instance
+
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Expected configuration object. Got {0}".format(type(data).__name__))
+        keys = tuple(sorted(str(_) for _ in data))
+        for key in keys:
+            if not _CONFIGURATION_KEY.match(key) or hasattr(Configuration, key):
+                raise ValueError("'{0}' is not a valid configuration key.".format(key))
+            if key.startswith("datatype_") and not isinstance(data[key], dict):
+                raise ValueError("Data type preset '{0}' has to be an object.".format(key))
+
+        compiled = cls._compiled.get(keys)
+        if compiled is None:
+            compiled = type(cls.__name__, (cls,), {"__slots__": keys})
+            cls._compiled[keys] = compiled
+        return compiled(data)
+
+    def _set_value(self, key, value):
+        if isinstance(value, dict):
+            value = Configuration.compile(value)
+        elif isinstance(value, list) and any(isinstance(_, dict) for _ in value):
+            value = [Configuration.compile(_) if isinstance(_, dict) else _ for _ in value]
+        # lists without nested objects are shared with the serialized data
+        object.__setattr__(self, key, value)
+
+        if key.startswith("node_"):
+            self._node_presets.pop(key[5:], None)
+            if isinstance(value, Configuration):
+                self._node_presets[key[5:]] = key
+        elif key.startswith("datatype_"):
+            self._datatype_presets[key[9:]] = key
 
     def __getitem__(self, name):
-        if name in self.__dict__:
-            return self.__dict__[name]
+        if name in self._data:
+            return getattr(self, name)
+
+    def __contains__(self, name):
+        return name in self._data
 
     def __iter__(self):
-        return iter(self.__dict__.keys())
+        return iter(self._data.keys())
 
     def __repr__(self):
-        return pprint.pformat(self.__dict__)
+        return pprint.pformat(self._data)
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError("Configuration is read only, change a copy of it instead.")
+        if name not in self._data:
+            raise AttributeError("'{0}' is not a key of the configuration.".format(name))
+        if name.startswith("datatype_") and not isinstance(value, (dict, Configuration)):
+            raise ValueError("Data type preset '{0}' has to be an object.".format(name))
+        if isinstance(value, Configuration):
+            value = value.get_original()
+        elif isinstance(value, list):
+            value = [_.get_original() if isinstance(_, Configuration) else _ for _ in value]
+        self._data[name] = value
+        self._set_value(name, value)
+
+    @property
+    def is_frozen(self):
+        return self._frozen
+
+    @property
+    def node_presets(self):
+        """ holds the configured node presets
+
+        Returns: dict holding the preset name by node type
+
+        """
+        return self._node_presets
+
+    @property
+    def datatype_presets(self):
+        """ holds the configured attribute presets
+
+        Returns: dict holding the preset name by data type
+
+        """
+        return self._datatype_presets
 
     def get_original(self):
-        return self.__original_data
+        return self._data
+
+    def freeze(self):
+        """ makes the configuration and all nested configurations read only
+
+        Returns: Configuration instance
+
+        """
+        if self._frozen:
+            return self
+        for key in self._data:
+            value = getattr(self, key)
+            if isinstance(value, Configuration):
+                value.freeze()
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, Configuration):
+                        item.freeze()
+        object.__setattr__(self, "_frozen", True)
+        return self
+
+    def copy(self):
+        """ creates a changeable copy
+
+        The serialized data gets copied deeply, so neither nested configurations nor lists are shared with the copy
+
+        Returns: Configuration instance
+
+        """
+        # the class is compiled for the keys already, so only nested objects get compiled again
+        return self.__class__(copy.deepcopy(self._data))
+
+
+class ConfigurationCache(object):
+    """ process wide cache of parsed configuration files
+
+    Entries are keyed by path, modification time and size, so a changed file will be parsed again.
+    The cached data is shared and must not be changed.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _get_entry(self, filepath):
+        path = os.path.abspath(filepath)
+        stat = os.stat(path)
+        key = (stat.st_mtime, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry[0] == key:
+                return entry
+        # parse outside the lock, concurrent misses on the same file just parse twice
+        data = read_json(path)
+        # the configuration gets compiled on first request, plain json files like palettes never need it
+        entry = [key, data, None]
+        with self._lock:
+            self._entries[path] = entry
+        return entry
+
+    def get_data(self, filepath):
+        """ gets the parsed json data of a file
+
+        Args:
+            filepath: filepath
+
+        Returns: dict
+
+        """
+        return self._get_entry(filepath)[1]
+
+    def get(self, filepath):
+        """ gets the read only configuration of a file
+
+        Args:
+            filepath: filepath
+
+        Returns: frozen Configuration instance
+
+        """
+        entry = self._get_entry(filepath)
+        if entry[2] is None:
+            if entry[1] is None:
+                raise ValueError("Configuration file {0} is not valid json.".format(filepath))
+            entry[2] = Configuration.compile(entry[1]).freeze()
+        return entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+CONFIGURATION_CACHE = ConfigurationCache()
+
+
+class StyleCache(object):
+    """ flyweight registry of the colors, pens, brushes and fonts that items share
+
+    Every style gets built once per value or preset and all items reference the same instance,
+    so shared styles must never be changed in place. Changing the configuration invalidates the whole cache.
+    """
+
+    def __init__(self, configuration=None):
+        self._configuration = configuration
+        self._styles = {}
+
+    def __len__(self):
+        return len(self._styles)
+
+    @property
+    def configuration(self):
+        return self._configuration
+
+    @configuration.setter
+    def configuration(self, value):
+        self._configuration = value
+        self.clear()
+
+    def clear(self):
+        self._styles.clear()
+
+    def color(self, rgba):
+        """ gets the shared color
+
+        Args:
+            rgba: list or tuple including RGBA as integers from 0-255
+
+        Returns: QColor instance
+
+        """
+        key = ("color", tuple(rgba))
+        color = self._styles.get(key)
+        if color is None:
+            color = self._styles[key] = Qt.QtGui.QColor(*rgba)
+        return color
+
+    def brush(self, rgba, pattern=Qt.QtCore.Qt.SolidPattern):
+        """ gets the shared brush
+
+        Args:
+            rgba: list or tuple including RGBA as integers from 0-255
+            pattern: Qt.BrushStyle
+
+        Returns: QBrush instance
+
+        """
+        key = ("brush", tuple(rgba), pattern)
+        brush = self._styles.get(key)
+        if brush is None:
+            brush = self._styles[key] = Qt.QtGui.QBrush(self.color(rgba), pattern)
+        return brush
+
+    def pen(self, rgba, width=1, join_style=None):
+        """ gets the shared solid line pen
+
+        Args:
+            rgba: list or tuple including RGBA as integers from 0-255
+            width: pen width
+            join_style: Qt.PenJoinStyle, keeps the Qt default if None
+
+        Returns: QPen instance
+
+        """
+        key = ("pen", tuple(rgba), width, join_style)
+        pen = self._styles.get(key)
+        if pen is None:
+            pen = Qt.QtGui.QPen(self.color(rgba))
+            pen.setStyle(Qt.QtCore.Qt.SolidLine)
+            pen.setWidth(width)
+            if join_style is not None:
+                pen.setJoinStyle(join_style)
+            self._styles[key] = pen
+        return pen
+
+    def font(self, family, size, bold=False):
+        """ gets the shared font
+
+        Args:
+            family: font family name
+            size: point size
+            bold: if True the font will be bold
+
+        Returns: QFont instance
+
+        """
+        key = ("font", family, size, bold)
+        font = self._styles.get(key)
+        if font is None:
+            font = Qt.QtGui.QFont(family, size)
+            font.setBold(bold)
+            self._styles[key] = font
+        return font
+
+    def connection_pen(self, data_type=None):
+        """ gets the pen connections of the given data type are drawn with
+
+        Args:
+            data_type: data type string, if it has no configured preset the connection_color is used
+
+        Returns: QPen instance
+
+        """
+        key = ("connection", data_type)
+        pen = self._styles.get(key)
+        if pen is None:
+            preset = self._configuration.datatype_presets.get(data_type) if data_type else None
+            color = self._configuration[preset].plug if preset else self._configuration.connection_color
+            pen = self._styles[key] = self.pen(color, self._configuration.connection_width)
+        return pen
+
+    def connection_highlight_pen(self):
+        """ gets the pen hovered and selected connections are drawn with
+
+        Returns: QPen instance
+
+        """
+        return self.pen(self._configuration.connection_highlight_color, 2)
+
+    def connection_title_font(self):
+        """ gets the font of connection titles
+
+        Returns: QFont instance
+
+        """
+        return self.font(self._configuration.attr_font, self._configuration.attr_font_size)
+
+    def connection_title_color(self):
+        """ gets the text color of connection titles
+
+        Returns: QColor instance
+
+        """
+        return self.color(self._configuration.connection_text_color)
 
 
 def write_json(filepath, data):
@@ -1275,7 +1617,7 @@ def set_application_palette(palette_filepath, application):
     """
     if application:
         try:
-            palette_dict = read_json(palette_filepath)
+            palette_dict = CONFIGURATION_CACHE.get_data(palette_filepath)
         except:
             LOG.error("Palette file '{}' not readable".format(palette_filepath))
 
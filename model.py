@@ -0,0 +1,488 @@
+import hashlib
+import logging
+
+
+LOG = logging.getLogger(name="CocoNodz.model")
+
+
+class AttributeData(object):
+    """ lightweight description of a node attribute
+
+    """
+    __slots__ = ("name", "data_type", "plug", "socket")
+
+    def __init__(self, name, data_type="", plug=True, socket=True):
+        self.name = name
+        self.data_type = data_type
+        self.plug = plug
+        self.socket = socket
+
+    @property
+    def type(self):
+        """ holds the attribute type as used in attribute dictionaries
+
+        Returns: "slot", "plug" or "socket"
+
+        """
+        if self.plug and self.socket:
+            return "slot"
+        elif self.plug:
+            return "plug"
+        return "socket"
+
+
+class NodeData(object):
+    """ lightweight description of a node, its attributes and edges
+
+    """
+    __slots__ = ("name", "node_type", "position", "attributes", "edges")
+
+    def __init__(self, name, node_type="default", position=None):
+        self.name = name
+        self.node_type = node_type
+        # x, y tuple or None if the node was never placed
+        self.position = position
+        self.attributes = {}
+        # edge keys of all connections the node takes part in
+        self.edges = set()
+
+
+class GraphModel(object):
+    """ Qt independent graph model
+
+    Holds nodes, attributes and connections as plain python data, so networks can be queried,
+    compared and serialized without creating any QGraphicsItems.
+    Connections are stored as edge keys (plug node, plug attribute, socket node, socket attribute).
+    """
+
+    def __init__(self):
+        self._nodes = {}
+        self._edges = set()
+        # increases with every topology change
+        self._revision = 0
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, node_name):
+        return node_name in self._nodes
+
+    def __iter__(self):
+        return iter(self._nodes.values())
+
+    @property
+    def nodes(self):
+        """ holds all nodes by name
+
+        Returns: dict
+
+        """
+        return self._nodes
+
+    @property
+    def revision(self):
+        """ holds a counter that increases whenever nodes or connections were added, removed or renamed
+
+        Returns: int
+
+        """
+        return self._revision
+
+    @property
+    def node_names(self):
+        return list(self._nodes.keys())
+
+    @property
+    def edges(self):
+        """ holds all edge keys
+
+        Returns: set of (plug node, plug attribute, socket node, socket attribute) tuples
+
+        """
+        return self._edges
+
+    def get_node(self, node_name):
+        return self._nodes.get(node_name)
+
+    def add_node(self, name, node_type="default", position=None):
+        """ adds a node or updates the node type and position of an existing one
+
+        Args:
+            name: node name
+            node_type: node type
+            position: x, y tuple
+
+        Returns: NodeData instance
+
+        """
+        node = self._nodes.get(name)
+        if node:
+            node.node_type = node_type
+            if position is not None:
+                node.position = position
+        else:
+            node = NodeData(name, node_type, position)
+            self._nodes[name] = node
+            self._revision += 1
+        return node
+
+    def remove_node(self, name):
+        """ removes a node including all its connections
+
+        Args:
+            name: node name
+
+        Returns:
+
+        """
+        node = self._nodes.pop(name, None)
+        if node:
+            for edge in list(node.edges):
+                self._remove_edge(edge)
+            self._revision += 1
+
+    def rename_node(self, old_name, new_name):
+        """ renames a node and updates all its edges
+
+        Args:
+            old_name: current node name
+            new_name: new node name
+
+        Returns:
+
+        """
+        if old_name == new_name or old_name not in self._nodes:
+            return
+        assert new_name not in self._nodes, "Node '{0}' already exists.".format(new_name)
+
+        node = self._nodes.pop(old_name)
+        node.name = new_name
+        self._revision += 1
+        self._nodes[new_name] = node
+
+        edges = list(node.edges)
+        node.edges.clear()
+        for edge in edges:
+            self._remove_edge(edge)
+            plug_node, plug_attr, socket_node, socket_attr = edge
+            self._add_edge((new_name if plug_node == old_name else plug_node,
+                            plug_attr,
+                            new_name if socket_node == old_name else socket_node,
+                            socket_attr))
+
+    def set_position(self, name, x, y):
+        node = self._nodes.get(name)
+        if node:
+            node.position = (x, y)
+
+    def add_attribute(self, node_name, attribute_name, plug=True, socket=True, data_type=""):
+        """ adds an attribute or extends the plug/socket states of an existing one
+
+        Args:
+            node_name: node name
+            attribute_name: attribute name
+            plug: if True the attribute will be a plug
+            socket: if True the attribute will be a socket
+            data_type: attribute data type
+
+        Returns: AttributeData instance or None if the node doesn't exist
+
+        """
+        node = self._nodes.get(node_name)
+        if not node:
+            LOG.info("Node '{0}' doesn't exist in model.".format(node_name))
+            return
+
+        attribute = node.attributes.get(attribute_name)
+        if attribute:
+            attribute.plug = attribute.plug or plug
+            attribute.socket = attribute.socket or socket
+            if data_type:
+                attribute.data_type = data_type
+        else:
+            attribute = AttributeData(attribute_name, data_type, plug, socket)
+            node.attributes[attribute_name] = attribute
+        return attribute
+
+    def get_attribute(self, node_name, attribute_name):
+        node = self._nodes.get(node_name)
+        if node:
+            return node.attributes.get(attribute_name)
+
+    def connect(self, plug_node, plug_attr, socket_node, socket_attr):
+        """ connects a plug to a socket
+
+        Args:
+            plug_node: source node name
+            plug_attr: plug name
+            socket_node: destination node name
+            socket_attr: socket name
+
+        Returns: True if the connection exists afterwards
+
+        """
+        if plug_node not in self._nodes or socket_node not in self._nodes:
+            LOG.info("Not able to connect {0}.{1} to {2}.{3}".format(plug_node, plug_attr, socket_node, socket_attr))
+            return False
+        self._add_edge((plug_node, plug_attr, socket_node, socket_attr))
+        return True
+
+    def disconnect(self, plug_node, plug_attr, socket_node, socket_attr):
+        self._remove_edge((plug_node, plug_attr, socket_node, socket_attr))
+
+    def is_connected(self, plug_node, plug_attr, socket_node, socket_attr):
+        return (plug_node, plug_attr, socket_node, socket_attr) in self._edges
+
+    def _add_edge(self, edge):
+        if edge not in self._edges:
+            self._revision += 1
+        self._edges.add(edge)
+        self._nodes[edge[0]].edges.add(edge)
+        self._nodes[edge[2]].edges.add(edge)
+
+    def _remove_edge(self, edge):
+        if edge in self._edges:
+            self._revision += 1
+        self._edges.discard(edge)
+        for node_name in (edge[0], edge[2]):
+            node = self._nodes.get(node_name)
+            if node:
+                node.edges.discard(edge)
+
+    def get_upstream_nodes(self, node_name):
+        """ gets the names of all nodes that are directly connected to the sockets of the node
+
+        Args:
+            node_name: node name
+
+        Returns: set of node names
+
+        """
+        node = self._nodes.get(node_name)
+        if not node:
+            return set()
+        return set(edge[0] for edge in node.edges if edge[2] == node_name)
+
+    def get_downstream_nodes(self, node_name):
+        """ gets the names of all nodes that are directly connected to the plugs of the node
+
+        Args:
+            node_name: node name
+
+        Returns: set of node names
+
+        """
+        node = self._nodes.get(node_name)
+        if not node:
+            return set()
+        return set(edge[2] for edge in node.edges if edge[0] == node_name)
+
+    def get_networks(self):
+        """ splits the model into networks
+
+        Every node without downstream connections, e.g. a shadingEngine, defines a network holding the node
+        and all nodes upstream of it. Nodes can be part of multiple networks. Nodes that don't reach such an end
+        node are grouped by connectivity.
+
+        Returns: dict holding the network name as key and a set of node names as value
+
+        """
+        networks = {}
+        covered = set()
+        for name in sorted(self._nodes):
+            if self.get_downstream_nodes(name):
+                continue
+            network = set([name])
+            pending = [name]
+            while pending:
+                for upstream in self.get_upstream_nodes(pending.pop()):
+                    if upstream not in network:
+                        network.add(upstream)
+                        pending.append(upstream)
+            networks[name] = network
+            covered.update(network)
+
+        for name in sorted(self._nodes):
+            if name in covered:
+                continue
+            network = set([name])
+            pending = [name]
+            while pending:
+                current = pending.pop()
+                for neighbour in self.get_upstream_nodes(current) | self.get_downstream_nodes(current):
+                    if neighbour not in network:
+                        network.add(neighbour)
+                        pending.append(neighbour)
+            networks[name] = network
+            covered.update(network)
+        return networks
+
+    def evaluate(self):
+        """ headless counterpart to Nodz.evaluateGraph
+
+        Returns: list of ("node.plug", "node.socket") tuples
+
+        """
+        return [("{0}.{1}".format(edge[0], edge[1]), "{0}.{1}".format(edge[2], edge[3])) for edge in self._edges]
+
+    def subgraph(self, node_names):
+        """ creates a new model that holds the specified nodes and all connections between them
+
+        Args:
+            node_names: list of node names
+
+        Returns: GraphModel instance
+
+        """
+        model = GraphModel()
+        for name in node_names:
+            node = self._nodes.get(name)
+            if node:
+                new_node = model.add_node(node.name, node.node_type, node.position)
+                for attribute in node.attributes.values():
+                    new_node.attributes[attribute.name] = AttributeData(attribute.name,
+                                                                        attribute.data_type,
+                                                                        attribute.plug,
+                                                                        attribute.socket)
+        for name in model.nodes:
+            for edge in self._nodes[name].edges:
+                if edge[0] in model and edge[2] in model:
+                    model._add_edge(edge)
+        return model
+
+    def diff(self, other):
+        """ compares the model with another one
+
+        Args:
+            other: GraphModel instance
+
+        Returns: dict holding "added_nodes", "removed_nodes", "added_edges" and "removed_edges"
+        relative from this model to the other one
+
+        """
+        own_nodes = set(self._nodes)
+        other_nodes = set(other.nodes)
+        return {"added_nodes": other_nodes - own_nodes,
+                "removed_nodes": own_nodes - other_nodes,
+                "added_edges": other.edges - self._edges,
+                "removed_edges": self._edges - other.edges
+                }
+
+    def topology_fingerprint(self, node_names=None):
+        """ creates a stable hash of node names, node types and connections
+
+        Args:
+            node_names: expects a list of node names otherwise it will consider all nodes
+
+        Returns: hex digest string
+
+        """
+        if node_names is None:
+            node_names = self._nodes.keys()
+        names = sorted(_ for _ in node_names if _ in self._nodes)
+        included = set(names)
+
+        fingerprint = hashlib.sha1()
+        edges = set()
+        for name in names:
+            node = self._nodes[name]
+            fingerprint.update("{0}:{1}\n".format(name, node.node_type).encode("utf-8"))
+            edges.update(_ for _ in node.edges if _[0] in included and _[2] in included)
+        for edge in sorted(edges):
+            fingerprint.update("{0}.{1}>{2}.{3}\n".format(*edge).encode("utf-8"))
+        return fingerprint.hexdigest()
+
+    def clear(self):
+        self._nodes.clear()
+        self._edges.clear()
+        self._revision += 1
+
+    def as_dict(self):
+        """ converts the model into json serializable data
+
+        Returns: dict
+
+        """
+        nodes = {}
+        attributes = {}
+        for node in self._nodes.values():
+            nodes[node.name] = {"node_type": node.node_type,
+                                "position": list(node.position) if node.position else None}
+            for attribute in node.attributes.values():
+                attributes["{0}.{1}".format(node.name, attribute.name)] = {"node_type": node.node_type,
+                                                                            "type": attribute.type,
+                                                                            "data_type": attribute.data_type}
+        return {"nodes": nodes,
+                "attributes": attributes,
+                "connections": [list(_) for _ in self.evaluate()]
+                }
+
+    @classmethod
+    def from_dict(cls, data):
+        """ creates a model from data created by as_dict
+
+        Args:
+            data: dict
+
+        Returns: GraphModel instance
+
+        """
+        model = cls()
+        for name, node_data in data.get("nodes", {}).items():
+            position = node_data.get("position")
+            model.add_node(name, node_data["node_type"], tuple(position) if position else None)
+        model._add_attributes(data.get("attributes", {}))
+        model._add_connections(data.get("connections", []))
+        return model
+
+    @classmethod
+    def from_display_data(cls, nodes_dict, attributes_dict={}, connections_dict={}, displayed=None):
+        """ creates a model from the data passed to Nodegraph.display_host_nodes
+
+        Args:
+            nodes_dict: dictionary that includes the node as key and the node type as value
+            attributes_dict: dictionary that holds the attribute as key and a type and data_type description
+            connections_dict: dictionary that includes a pair of attributes
+            displayed: GraphModel instance of the already displayed nodes, attributes and connections
+                       to those nodes are kept as well
+
+        Returns: GraphModel instance
+
+        """
+        model = cls()
+        if displayed is not None:
+            names = set(_.split(".", 1)[0] for _ in attributes_dict)
+            for plug_name, socket_name in connections_dict.items():
+                names.add(plug_name.split(".", 1)[0])
+                names.add(socket_name.split(".", 1)[0])
+            for name in names.difference(nodes_dict):
+                node = displayed.get_node(name)
+                if node:
+                    model.add_node(name, node.node_type, node.position)
+                    for attribute in node.attributes.values():
+                        model.add_attribute(name, attribute.name, attribute.plug, attribute.socket,
+                                            attribute.data_type)
+        for name, node_type in nodes_dict.items():
+            model.add_node(name, node_type)
+        model._add_attributes(attributes_dict)
+        model._add_connections(connections_dict.items())
+        return model
+
+    def _add_attributes(self, attributes_dict):
+        for name, attribute_data in attributes_dict.items():
+            node_name, attribute_name = name.split(".", 1)
+            attribute_type = attribute_data["type"]
+            self.add_attribute(node_name,
+                               attribute_name,
+                               plug=attribute_type in ("plug", "slot"),
+                               socket=attribute_type in ("socket", "slot"),
+                               data_type=attribute_data["data_type"])
+
+    def _add_connections(self, connections):
+        for plug_name, socket_name in connections:
+            plug_node, plug_attr = plug_name.split(".", 1)
+            socket_node, socket_attr = socket_name.split(".", 1)
+            plug = self.get_attribute(plug_node, plug_attr)
+            socket = self.get_attribute(socket_node, socket_attr)
+            if plug and plug.plug and socket and socket.socket:
+                self.connect(plug_node, plug_attr, socket_node, socket_attr)
@@ -1,4 +1,9 @@
+import copy
+import functools
+import hashlib
+import heapq
 import logging
+import os
 
 from coconodz import Qt
 
@@ -12,7 +17,26 @@ from coconodz.lib import (BaseWindow,
                           RenameField,
                           AttributeContext,
                           Backdrop,
-                          ConfiguationMixin)
+                          ConfiguationMixin,
+                          CONFIGURATION_CACHE,
+                          write_json)
+from coconodz.layout import (LayoutCache,
+                             LayoutCancelled,
+                             LayoutSnapshot,
+                             OccupancyGrid,
+                             force_directed_layout,
+                             incremental_layout,
+                             layered_layout,
+                             move_to_origin,
+                             remove_overlaps
+                             )
+from coconodz.journal import GraphJournal, JournalLocked
+from coconodz.model import GraphModel
+from coconodz.serialization import (BackdropData,
+                                    SerializationCancelled,
+                                    load_graph,
+                                    save_graph
+                                    )
 
 from coconodz import Manager as EventsManager
 from coconodz import SuppressEvents
@@ -22,6 +46,18 @@ _COCONODZ_LOG = logging.getLogger(name="CocoNodz")
 LOG = logging.getLogger(name="CocoNodz.nodegraph")
 
 
+def level_of_detail(painter):
+    """ gets the level of detail the painter currently draws with
+
+    Args:
+        painter: QPainter instance
+
+    Returns: float, 1.0 at 100% zoom
+
+    """
+    return Qt.QtWidgets.QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+
+
 class Basegraph(object):
     """ base graph class that should defined all available properties and methods
 
@@ -35,6 +71,8 @@ class Basegraph(object):
 
         self._all_nodes = {}
         self._all_backdrops = []
+        self._selected_nodes = []
+        self._selected_backdrops = []
 
     # the current Nodz implementation stores the
     # node as tuple, which is not really clear to us
@@ -52,13 +90,15 @@ class Basegraph(object):
     def all_node_names(self):
         return self._all_nodes.keys()
 
+    # the selection gets stored whenever it changes, so reading
+    # it only costs the size of the selection and not the scene
     @property
     def selected_nodes(self):
-        return [_ for _ in self.all_nodes if _.isSelected()]
+        return list(self._selected_nodes)
 
     @property
     def selected_node_names(self):
-        return [_.name for _ in self.selected_nodes if _.isSelected()]
+        return [_.name for _ in self._selected_nodes]
 
     @property
     def all_backdrops(self):
@@ -70,7 +110,7 @@ class Basegraph(object):
 
     @property
     def selected_backdrops(self):
-        return [_ for _ in self.all_backdrops if _.isSelected()]
+        return list(self._selected_backdrops)
 
     @property
     def selected_backdrop_names(self):
@@ -80,6 +120,9 @@ class Basegraph(object):
         if node_name in self.nodes_dict:
             return self.nodes_dict[node_name]
 
+    def update_selection(self, selected_items):
+        raise NotImplementedError
+
     def get_slot_by_name(self, slot_name, plug_or_socket):
         node = self.get_node_by_name(slot_name.split(".")[0])
         name = slot_name.split(".", 1)[1]
@@ -147,6 +190,9 @@ class Basegraph(object):
     def on_nodes_deleted(self, nodeitems_list):
         raise NotImplementedError
 
+    def on_nodes_moved(self, nodeitems_list):
+        raise NotImplementedError
+
     def on_about_attribute_create(self, node_name, attribute_name):
         raise NotImplementedError
 
@@ -198,7 +244,7 @@ class Basegraph(object):
     def reset_configuration(self):
         raise NotImplementedError
 
-    def apply_configuration(self):
+    def apply_configuration(self, configuration):
         raise NotImplementedError
 
     def open(self):
@@ -253,13 +299,54 @@ class ItemSignals(Qt.QtCore.QObject):
         Qt.QtCore.QObject.__init__(self)
 
 
-class BackdropItem(Backdrop):
-    """ extends the Backdrop class
+class ItemSignalsMixin(object):
+    """ routes item signals through a single ItemSignals instance
 
+    A graph owns one ItemSignals instance that gets connected once and passes
+    it to every item it creates. Items emit themselves (or their slots) as
+    argument, so the receiver knows the sender without being connected per item.
     """
 
-    signals = ItemSignals()
-    signal_context_request = signals.signal_context_request
+    def __init__(self, *args, **kwargs):
+        signals = kwargs.pop("signals", None)
+        super(ItemSignalsMixin, self).__init__(*args, **kwargs)
+        self._signals = signals or ItemSignals()
+
+    @property
+    def signals(self):
+        """ holds the ItemSignals instance the item emits through
+
+        Returns: ItemSignals instance or None if the item is detached
+
+        """
+        return self._signals
+
+    def detach_signals(self):
+        """ stops the item from emitting any further signals
+
+        Returns:
+
+        """
+        self._signals = None
+
+    def _emit(self, signal_name, *args):
+        """ emits the given signal if the item is still attached
+
+        Args:
+            signal_name: name of the ItemSignals signal
+            *args: signal arguments
+
+        Returns:
+
+        """
+        if self._signals is not None:
+            getattr(self._signals, signal_name).emit(*args)
+
+
+class BackdropItem(ItemSignalsMixin, Backdrop):
+    """ extends the Backdrop class
+
+    """
 
     def __init__(self, *args, **kwargs):
         super(BackdropItem, self).__init__(*args, **kwargs)
@@ -275,26 +362,23 @@ class BackdropItem(Backdrop):
 
         """
         if event.button() == Qt.QtCore.Qt.RightButton:
-            self.signal_context_request.emit(self)
+            self._emit("signal_context_request", self)
 
         super(BackdropItem, self).mousePressEvent(event)
 
+    def _remove(self):
+        self.detach_signals()
+        super(BackdropItem, self)._remove()
 
-class NodeItem(nodz_main.NodeItem):
+
+class NodeItem(ItemSignalsMixin, nodz_main.NodeItem):
     """ extends the nodz_main.NodeItem class
 
     Original implementation customization
     """
 
-    signals = ItemSignals()
-    signal_context_request = signals.signal_context_request
-    signal_attr_created = signals.signal_attr_created
-    signal_socket_created = signals.signal_socket_created
-    signal_plug_created = signals.signal_plug_created
-    signal_name_changed = signals.signal_name_changed
-
-    def __init__(self, name, alternate, preset, config):
-        super(NodeItem, self).__init__(name, alternate, preset, config)
+    def __init__(self, name, alternate, preset, config, signals=None):
+        super(NodeItem, self).__init__(name, alternate, preset, config, signals=signals)
 
         self._node_type = None
         self._plugs_dict = {}
@@ -304,6 +388,7 @@ class NodeItem(nodz_main.NodeItem):
         # unfortunately the original NodeItem implementation doesn't store the config
         # by default
         self._config = config
+        self._preset = preset
 
     @property
     def node_type(self):
@@ -327,6 +412,55 @@ class NodeItem(nodz_main.NodeItem):
         assert isinstance(value, basestring)
         self._node_type = value
 
+    @property
+    def preset(self):
+        """ holds the name of the node preset the node is styled with
+
+        Returns: string preset name
+
+        """
+        return self._preset
+
+    def apply_style(self, styles):
+        """ replaces the brushes, pens and fonts the original implementation creates per node by shared ones
+
+        Args:
+            styles: StyleCache instance
+
+        Returns:
+
+        """
+        configuration = styles.configuration
+        preset = configuration[self._preset]
+        self._brush = styles.brush(preset.bg)
+        self._pen = styles.pen(preset.border, configuration.node_border)
+        self._penSel = styles.pen(preset.border_sel, configuration.node_border)
+        self._textPen = styles.pen(preset.text)
+        self._nodeTextFont = styles.font(configuration.node_font, configuration.node_font_size, bold=True)
+        self._attrTextFont = styles.font(configuration.attr_font, configuration.attr_font_size)
+        self.update()
+
+    def apply_slot_style(self, styles, presets=None):
+        """ replaces the brushes and pens of the plugs and sockets by shared ones
+
+        Args:
+            styles: StyleCache instance
+            presets: names of the attribute presets whose slots get restyled, all slots if None
+
+        Returns:
+
+        """
+        configuration = styles.configuration
+        for slot in list(self.plugs.values()) + list(self.sockets.values()):
+            preset = configuration.datatype_presets.get(slot.dataType or "default", "datatype_default")
+            if presets is not None and preset not in presets:
+                continue
+            # the original implementation colors plugs and sockets alike by the plug color of the preset
+            color = configuration[preset].plug
+            slot.brush = styles.brush(color)
+            slot.pen = styles.pen(color)
+            slot.update()
+
     @property
     def connections(self):
         """ holds all the connections to the node
@@ -371,10 +505,48 @@ class NodeItem(nodz_main.NodeItem):
 
         """
         if event.button() == Qt.QtCore.Qt.RightButton:
-            self.signal_context_request.emit(self)
+            self._emit("signal_context_request", self)
 
         super(NodeItem, self).mousePressEvent(event)
 
+    def _remove(self):
+        """ extends the original method
+
+        Detaches the node from the graphs item signals before removing it
+        and removes it from the graph model afterwards
+
+        Returns:
+
+        """
+        self.detach_signals()
+        scene = self.scene()
+        super(NodeItem, self)._remove()
+        if scene:
+            scene.views()[0].model.remove_node(self.name)
+            scene.views()[0].style_index.remove_node(self)
+
+    def paint(self, painter, option, widget):
+        """ extends the original method
+
+        Below the configured node_lod_threshold the node will be drawn as plain box
+        without any text or attributes
+
+        Args:
+            painter:
+            option:
+            widget:
+
+        Returns:
+
+        """
+        if level_of_detail(painter) >= self.scene().views()[0].configuration.node_lod_threshold:
+            super(NodeItem, self).paint(painter, option, widget)
+            return
+
+        painter.setBrush(self._brush)
+        painter.setPen(self.pen)
+        painter.drawRect(0, 0, self.baseWidth, self.height)
+
     def add_attribute(self, name, add_mode=None, plug=True, socket=True, data_type=""):
         """ wrapper around the _createAttribute method that allows better customization of attribute generation
 
@@ -388,284 +560,869 @@ class NodeItem(nodz_main.NodeItem):
         Returns:
 
         """
+        self.add_attributes([{"name": name, "plug": plug, "socket": socket, "data_type": data_type}],
+                            add_mode=add_mode)
 
-        # skip process if slot already exists
-        if name in self.attrs:
-            return
+    def add_attributes(self, specs, add_mode=None):
+        """ creates multiple attributes in one pass
 
-        # closure to avoid redoing preset checking all the time
-        def _do_creation():
-            if data_type:
-                preset = "datatype_{0}".format(data_type)
-            else:
-                preset = "datatype_default"
-            if preset not in self._config:
-                LOG.info("Attribute preset for type {0} not configured.".format(data_type))
-                self._createAttribute(name, index, "datatype_default", plug, socket, data_type)
-            else:
-                self._createAttribute(name, index, preset, plug, socket, data_type)
+        Presets get resolved once per data type and the node and its connections
+        get updated once after all attributes were created
 
-            # emit specific signals
-            if plug:
-                self.plugs[name].node = self.plugs[name].parentItem()
-                self.signal_plug_created.emit(self.plugs[name])
-            if socket:
-                self.sockets[name].node = self.sockets[name].parentItem()
-                self.signal_socket_created.emit(self.sockets[name])
+        Args:
+            specs: list of dictionaries holding a "name" and optional "plug", "socket" and "data_type" keys
+            add_mode: defines where on the node the attributes will be placed, "top", "bottom", "alphabetical"
+
+        Returns:
 
+        """
         # if no add_mode is defined take the order from the config
+        graph = self.scene().views()[0]
         if not add_mode:
-            add_mode = self._config["attribute_order"]
+            add_mode = graph.configuration.attribute_order
 
         _allowed_modes = ["top", "bottom", "alphabetical"]
         assert add_mode in _allowed_modes, "Unknown mode. Choose from: " + "".join("'{0}' ".format(_) for _ in _allowed_modes)
 
-        # create attribute at expected index
+        # skip all slots that already exist
+        existing = set(self.attrs)
+        to_create = []
+        for spec in specs:
+            if spec["name"] not in existing:
+                existing.add(spec["name"])
+                to_create.append(spec)
+        if not to_create:
+            return
+
+        # the node grows, announce it once before creating the slots
+        self.prepareGeometryChange()
+
+        presets = graph.configuration.datatype_presets
+        old_attrs = list(self.attrs)
+        for spec in to_create:
+            data_type = spec.get("data_type", "")
+            preset = presets.get(data_type or "default")
+            if preset is None:
+                LOG.info("Attribute preset for type {0} not configured.".format(data_type))
+                preset = "datatype_default"
+            graph.style_index.add_node(self, preset)
+
+            # append all attributes first and bring them in order once afterwards
+            self._createAttribute(spec["name"], -1, preset,
+                                  spec.get("plug", True), spec.get("socket", True), data_type)
+
+        new_attrs = [_["name"] for _ in to_create]
         if add_mode == "top":
-            index = 0
-            _do_creation()
+            # matches creating the attributes one by one at index 0
+            self.attrs[:] = new_attrs[::-1] + old_attrs
         elif add_mode == "bottom":
-            index = -1
-            _do_creation()
+            self.attrs[:] = old_attrs + new_attrs
         elif add_mode == "alphabetical":
-            _attrs = list(self.attrs)
-            _attrs.append(name)
-            _sorted = sorted(_attrs)
-            index = _sorted.index(name)
-            _do_creation()
+            self.attrs[:] = list(heapq.merge(old_attrs, sorted(new_attrs)))
         else:
             raise NotImplementedError
 
+        # emit specific signals
+        for name in new_attrs:
+            if name in self.plugs:
+                self.plugs[name].node = self.plugs[name].parentItem()
+                self._emit("signal_plug_created", self.plugs[name])
+            if name in self.sockets:
+                self.sockets[name].node = self.sockets[name].parentItem()
+                self._emit("signal_socket_created", self.sockets[name])
+
+        self.update()
+
         # update the connections paths
-        for connection in self.connections:
-            connection.target_point = connection.target.center()
-            connection.source_point = connection.source.center()
-            connection.updatePath()
+        graph.update_connection_paths(self.slot_connections)
 
+    @property
+    def slot_connections(self):
+        """ holds all connections of the nodes plugs and sockets
 
-class ConnectionItem(nodz_main.ConnectionItem):
-    """ extends the nodz_main.ConnectionItem class
+        Returns: ConnectionItem list
+
+        """
+        connections = []
+        for slot in list(self.plugs.values()) + list(self.sockets.values()):
+            connections.extend(slot.connections)
+        return connections
+
+
+class PlugItem(nodz_main.PlugItem):
+    """ extends the nodz_main.PlugItem class
 
     Original implementation customization
     """
 
-    def __init__(self, source_point, target_point, source, target):
-        super(ConnectionItem, self).__init__(source_point, target_point, source, target)
+    def paint(self, painter, option, widget):
+        # slots are skipped entirely in the low detail representation of nodes
+        if level_of_detail(painter) >= self.scene().views()[0].configuration.node_lod_threshold:
+            super(PlugItem, self).paint(painter, option, widget)
 
-        self.setAcceptHoverEvents(True)
-        self.setFlag(Qt.QtWidgets.QGraphicsItem.ItemIsSelectable)
 
-        self.configuration = self.source.scene().views()[0].configuration
+class SocketItem(nodz_main.SocketItem):
+    """ extends the nodz_main.SocketItem class
 
-        self._selected_pen = Qt.QtGui.QPen(nodz_utils._convertDataToColor(
-                                           self.configuration.connection_highlight_color)
-                                           )
-        self._selected_pen.setWidth(2)
+    Original implementation customization
+    """
 
-        self.title = Qt.QtWidgets.QGraphicsTextItem("", parent=self)
-        self.title_font = Qt.QtGui.QFont(self.configuration.attr_font,
-                                         self.configuration.attr_font_size)
-        self.title.setFont(self.title_font)
-        self.title.setDefaultTextColor(nodz_utils._convertDataToColor(
-                                       self.configuration.connection_text_color)
-                                       )
+    def paint(self, painter, option, widget):
+        # slots are skipped entirely in the low detail representation of nodes
+        if level_of_detail(painter) >= self.scene().views()[0].configuration.node_lod_threshold:
+            super(SocketItem, self).paint(painter, option, widget)
 
-        self._moved = False
-        self._hovered = False
 
-    def updatePath(self):
-        """ overrides the original method
+class BatchUpdate(object):
+    """ suspends per item scene work while bulk editing a Nodz graph
 
-        We added support for configurable path shapes here
+    Can be nested, only the outermost context will apply the collected updates
 
-        Returns:
+    """
+    def __init__(self, nodz):
+        self.nodz = nodz
 
-        """
-        self.setPen(self._pen)
+    def __enter__(self):
+        self.nodz.begin_batch()
+        return self.nodz
 
-        path = Qt.QtGui.QPainterPath()
-        path.moveTo(self.source_point)
-        dx = (self.target_point.x() - self.source_point.x()) * 0.5
-        dy = self.target_point.y() - self.source_point.y()
-        ctrl1 = Qt.QtCore.QPointF(self.source_point.x() + dx, self.source_point.y() + dy * 0)
-        ctrl2 = Qt.QtCore.QPointF(self.source_point.x() + dx, self.source_point.y() + dy * 1)
+    def __exit__(self, *exc_info):
+        self.nodz.end_batch()
 
-        # handle interpolation mode
-        if self.configuration.connection_interpolation == "line":
-            path.lineTo(self.target_point)
-        elif self.configuration.connection_interpolation == "bezier":
-            path.cubicTo(ctrl1, ctrl2, self.target_point)
 
-        self.setPath(path)
+class ConnectionIndex(object):
+    """ graph wide lookup of ConnectionItems
 
-    def _show_connection_title(self):
-        self.title.setPlainText("{0}.{1} - {2}.{3}".format(self.source.parentItem().name,
-                                                            self.source.attribute,
-                                                            self.target.parentItem().name,
-                                                            self.target.attribute))
-        center_position = Qt.QtCore.QPointF(self.boundingRect().center().x() - (self.title.boundingRect().width() / 2),
-                                            self.boundingRect().center().y() - (self.title.boundingRect().height() / 2)
-                                            )
-        self.title.setPos(center_position)
-        self.title.setVisible(True)
+    Connections are stored by their plug and socket items and by their node and
+    attribute names, so shared connections can be found without walking the
+    connections of heavily connected slots.
+    """
 
-    def hoverEnterEvent(self, event):
-        self._show_connection_title()
-        self._hovered = True
-        super(ConnectionItem, self).hoverEnterEvent(event)
+    def __init__(self):
+        self._by_slots = {}
+        self._by_names = {}
+        self._by_node = {}
+        self._keys = {}
 
-    def hoverLeaveEvent(self, event):
-        self.title.setVisible(False)
-        self._hovered = False
-        super(ConnectionItem, self).hoverLeaveEvent(event)
+    def __len__(self):
+        return len(self._keys)
 
-    def shape(self):
-        stroker = Qt.QtGui.QPainterPathStroker()
-        stroker.setWidth(5)
-        shape = stroker.createStroke(self.path())
-        return shape
+    def __contains__(self, connection):
+        return connection in self._keys
 
-    def mousePressEvent(self, event):
-        self._moved = False
-        self.scene().clearSelection()
-        self.setSelected(True)
+    def __iter__(self):
+        return iter(list(self._keys))
 
-    def mouseReleaseEvent(self, event):
-        if self._moved:
-            item = self.scene().itemAt(self.mapToScene(event.pos()), Qt.QtGui.QTransform())
-            if not (isinstance(item, nodz_main.PlugItem) or isinstance(item, nodz_main.SocketItem)):
-                self.target.disconnect(self)
-                self.source.disconnect(self)
-                scene = self.scene()
-                scene.removeItem(self)
-                scene.update()
+    @staticmethod
+    def _get_name_key(connection):
+        return (connection.plugNode, connection.plugAttr, connection.socketNode, connection.socketAttr)
 
-    def mouseMoveEvent(self, event):
-        self._moved = True
-        super(ConnectionItem, self).mouseMoveEvent(event)
+    def add(self, connection, plug, socket):
+        """ stores the connection
 
-    def paint(self, painter, *args):
-        self.updatePath()
+        Args:
+            connection: ConnectionItem instance
+            plug: PlugItem instance
+            socket: SocketItem instance
 
-        if self._hovered or self.isSelected():
-            painter.setPen(self._selected_pen)
-        else:
-            painter.setPen(self._pen)
-        painter.drawPath(self.path())
+        Returns:
 
+        """
+        if connection in self._keys:
+            self.remove(connection)
 
-class Nodz(ConfiguationMixin, nodz_main.Nodz):
-    """ extends the nodz_main.Nodz class
+        slots_key = (plug, socket)
+        name_key = self._get_name_key(connection)
 
-    Original implementation customization
-    """
-    signal_node_created = Qt.QtCore.Signal(object)
-    signal_nodes_deleted = Qt.QtCore.Signal(object)
-    signal_selection_changed = Qt.QtCore.Signal(object)
-    signal_after_node_created = Qt.QtCore.Signal(object)
-    signal_node_name_changed = Qt.QtCore.Signal(object, str, str)
-    signal_plug_created = Qt.QtCore.Signal(object)
-    signal_socket_created = Qt.QtCore.Signal(object)
-    signal_connection_made = Qt.QtCore.Signal(object)
-    signal_disconnection_made = Qt.QtCore.Signal(object)
-    signal_about_attribute_create = Qt.QtCore.Signal(str, str)
-    signal_context_request = Qt.QtCore.Signal(object)
-    signal_creation_field_request = Qt.QtCore.Signal()
-    signal_search_field_request = Qt.QtCore.Signal()
-    signal_rename_field_request = Qt.QtCore.Signal()
-    signal_layout_request = Qt.QtCore.Signal()
-    signal_plug_connected = None
-    signal_plug_disconnected = None
-    signal_socket_connected = None
-    signal_socket_disconnected = None
+        self._by_slots[slots_key] = connection
+        self._by_names[name_key] = connection
+        self._by_node.setdefault(name_key[0], set()).add(connection)
+        self._by_node.setdefault(name_key[2], set()).add(connection)
+        self._keys[connection] = (slots_key, name_key)
 
-    def __init__(self, parent):
-        # unfortunately nodz_main.Nodz expects a default config file at the same level as the module
-        # we pass our default here
-        super(Nodz, self).__init__(parent, configPath=self.BASE_CONFIG_PATH)
-        self.initialize_configuration()
-        self.config = self.configuration_data
+    def remove(self, connection):
+        """ removes the connection if it was stored
 
-        self._rename_field = RenameField(self)
-        self._search_field = SearchField(self)
-        self._creation_field = SearchField(self)
-        self._context = GraphContext(self)
-        self._attribute_context = AttributeContext(self)
-        self._backdrop_context = BackdropContext(self)
+        Args:
+            connection: ConnectionItem instance
 
-        # patching original signals
-        self.signal_plug_connected = self.signal_PlugConnected
-        self.signal_plug_disconnected = self.signal_PlugDisconnected
-        self.signal_socket_connected = self.signal_SocketConnected
-        self.signal_socket_disconnected = self.signal_SocketDisconnected
+        Returns:
 
-        # test
-        self.selected_nodes = []
+        """
+        keys = self._keys.pop(connection, None)
+        if not keys:
+            return
 
-    @property
-    def rename_field(self):
-        return self._rename_field
+        slots_key, name_key = keys
+        if self._by_slots.get(slots_key) is connection:
+            del self._by_slots[slots_key]
+        if self._by_names.get(name_key) is connection:
+            del self._by_names[name_key]
+        for node_name in (name_key[0], name_key[2]):
+            node_connections = self._by_node.get(node_name)
+            if node_connections:
+                node_connections.discard(connection)
+                if not node_connections:
+                    del self._by_node[node_name]
+
+    def get(self, plug, socket):
+        """ gets the connection between plug and socket
 
-    @property
-    def search_field(self):
-        """ holds the search field widget
+        Args:
+            plug: PlugItem instance
+            socket: SocketItem instance
 
-        Returns: SearchField instance
+        Returns: ConnectionItem instance or None
 
         """
-        return self._search_field
+        return self._by_slots.get((plug, socket))
 
-    @property
-    def creation_field(self):
-        """ holds the creation field widgets
+    def get_by_names(self, plug_node, plug_attr, socket_node, socket_attr):
+        """ gets the connection between the named plug and socket
 
-        Returns: SearchField instance
+        Args:
+            plug_node: source node name
+            plug_attr: plug name
+            socket_node: destination node name
+            socket_attr: socket name
+
+        Returns: ConnectionItem instance or None
 
         """
+        return self._by_names.get((plug_node, plug_attr, socket_node, socket_attr))
 
-        return self._creation_field
+    def rename_node(self, old_name):
+        """ updates the name keys of all connections of a renamed node
 
-    @property
-    def context(self):
-        """ holds the creation field widgets
+        The connections have to hold the new node name already
 
-        Returns: GraphContext instance
+        Args:
+            old_name: previous node name
+
+        Returns:
 
         """
+        for connection in self._by_node.pop(old_name, ()):
+            slots_key, _ = self._keys[connection]
+            self.add(connection, *slots_key)
 
-        return self._context
+    def clear(self):
+        self._by_slots.clear()
+        self._by_names.clear()
+        self._by_node.clear()
+        self._keys.clear()
 
-    @property
-    def attribute_context(self):
-        """ holds the attribute field widgets
 
-        Returns: AttributeContext instance
+class StyleIndex(object):
+    """ graph wide lookup of items by the configuration entries they are styled with
 
-        """
+    Nodes are stored by their node preset and the presets of their attributes, connections by their
+    data type, so a changed preset only touches the items that use it.
+    """
 
-        return self._attribute_context
+    def __init__(self):
+        self._nodes = {}
+        self._node_presets = {}
+        self._connections = {}
+        self._connection_types = {}
 
     @property
-    def backdrop_context(self):
-        """ holds the backdrop context widget
+    def presets(self):
+        """ holds the names of all presets in use
 
-        Returns: AttributeContext instance
+        Returns: list of preset names
 
         """
+        return [preset for preset, nodes in self._nodes.items() if nodes]
 
-        return self._backdrop_context
-
-    def keyPressEvent(self, event):
-        """ overrides the keyPressEvent
+    def add_node(self, node, preset):
+        """ stores the node for the given preset
 
-        We are adding more key press events here
         Args:
-            event:
+            node: NodeItem instance
+            preset: name of the node or attribute preset
 
         Returns:
 
         """
-        if event.key() not in self.pressedKeys:
+        self._nodes.setdefault(preset, set()).add(node)
+        self._node_presets.setdefault(node, set()).add(preset)
+
+    def remove_node(self, node):
+        for preset in self._node_presets.pop(node, ()):
+            self._nodes[preset].discard(node)
+
+    def add_connection(self, connection, data_type):
+        """ stores the connection for the given data type
+
+        Args:
+            connection: ConnectionItem instance
+            data_type: data type string
+
+        Returns:
+
+        """
+        self.remove_connection(connection)
+        self._connections.setdefault(data_type, set()).add(connection)
+        self._connection_types[connection] = data_type
+
+    def remove_connection(self, connection):
+        data_type = self._connection_types.pop(connection, None)
+        if data_type is not None:
+            self._connections[data_type].discard(connection)
+
+    def get_nodes(self, preset=None):
+        """ gets the nodes styled with the given preset
+
+        Args:
+            preset: name of the node or attribute preset, all nodes if None
+
+        Returns: set of NodeItem instances
+
+        """
+        if preset is None:
+            return set(self._node_presets)
+        return set(self._nodes.get(preset, ()))
+
+    def get_connections(self, data_type=None):
+        """ gets the connections of the given data type
+
+        Args:
+            data_type: data type string, all connections if None
+
+        Returns: set of ConnectionItem instances
+
+        """
+        if data_type is None:
+            return set(self._connection_types)
+        return set(self._connections.get(data_type, ()))
+
+    def clear(self):
+        self._nodes.clear()
+        self._node_presets.clear()
+        self._connections.clear()
+        self._connection_types.clear()
+
+
+class ConnectionItem(nodz_main.ConnectionItem):
+    """ extends the nodz_main.ConnectionItem class
+
+    Original implementation customization
+    """
+
+    def __init__(self, source_point, target_point, source, target):
+        super(ConnectionItem, self).__init__(source_point, target_point, source, target)
+
+        self.setAcceptHoverEvents(True)
+        self.setFlag(Qt.QtWidgets.QGraphicsItem.ItemIsSelectable)
+
+        self._graph = self.source.scene().views()[0]
+
+        # pens are shared by all connections, the hover title by the whole graph
+        self._pen = self._graph.styles.connection_pen()
+        self._selected_pen = self._graph.styles.connection_highlight_pen()
+
+        self._moved = False
+        self._hovered = False
+
+        # the interpolation the current path was built with
+        self._path_interpolation = None
+
+        # hit-test shape and bounds, computed once per path or pen change
+        self._shape = None
+        self._bounding_rect = None
+
+    @property
+    def configuration(self):
+        """ holds the configuration of the graph, so reloaded configurations apply without touching connections
+
+        Returns: Configuration instance
+
+        """
+        return self._graph.configuration
+
+    def apply_style(self, styles):
+        """ takes the pens from the given styles again
+
+        Args:
+            styles: StyleCache instance
+
+        Returns:
+
+        """
+        self._pen = styles.connection_pen()
+        self._selected_pen = styles.connection_highlight_pen()
+        self._graph.apply_data_type_color_to_connection(self)
+        self.setPen(self._pen)
+        self.update()
+
+    # setting an end point marks the path as dirty, so
+    # updatePath only rebuilds paths that really changed
+    @property
+    def source_point(self):
+        return self._source_point
+
+    @source_point.setter
+    def source_point(self, point):
+        if getattr(self, "_source_point", None) is None or self._source_point != point:
+            self._path_dirty = True
+        self._source_point = point
+
+    @property
+    def target_point(self):
+        return self._target_point
+
+    @target_point.setter
+    def target_point(self, point):
+        if getattr(self, "_target_point", None) is None or self._target_point != point:
+            self._path_dirty = True
+        self._target_point = point
+
+    def invalidate_path(self):
+        """ forces the next updatePath call to rebuild the path
+
+        Returns:
+
+        """
+        self._path_dirty = True
+
+    def updatePath(self):
+        """ overrides the original method
+
+        We added support for configurable path shapes here. The path will only be rebuilt
+        if one of its end points or the interpolation changed since the last call
+
+        Returns:
+
+        """
+        interpolation = self.configuration.connection_interpolation
+        if not self._path_dirty and interpolation == self._path_interpolation:
+            return
+
+        self.setPen(self._pen)
+
+        path = Qt.QtGui.QPainterPath()
+        path.moveTo(self.source_point)
+        dx = (self.target_point.x() - self.source_point.x()) * 0.5
+        dy = self.target_point.y() - self.source_point.y()
+        ctrl1 = Qt.QtCore.QPointF(self.source_point.x() + dx, self.source_point.y() + dy * 0)
+        ctrl2 = Qt.QtCore.QPointF(self.source_point.x() + dx, self.source_point.y() + dy * 1)
+
+        # handle interpolation mode
+        if interpolation == "line":
+            path.lineTo(self.target_point)
+        elif interpolation == "bezier":
+            path.cubicTo(ctrl1, ctrl2, self.target_point)
+
+        self.setPath(path)
+        self._path_dirty = False
+        self._path_interpolation = interpolation
+        self._invalidate_shape()
+
+    @property
+    def title(self):
+        """ holds the text shown while the connection is hovered
+
+        Returns: string
+
+        """
+        return "{0}.{1} - {2}.{3}".format(self.source.parentItem().name,
+                                          self.source.attribute,
+                                          self.target.parentItem().name,
+                                          self.target.attribute)
+
+    def hoverEnterEvent(self, event):
+        self.scene().views()[0].show_connection_title(self)
+        self._hovered = True
+        super(ConnectionItem, self).hoverEnterEvent(event)
+
+    def hoverLeaveEvent(self, event):
+        self.scene().views()[0].hide_connection_title(self)
+        self._hovered = False
+        super(ConnectionItem, self).hoverLeaveEvent(event)
+
+    def _invalidate_shape(self):
+        """ drops the cached shape and bounds
+
+        Has to be called after the path or pen changed. Until then the cache still
+        describes the old geometry, which is what prepareGeometryChange expects.
+
+        Returns:
+
+        """
+        self._shape = None
+        self._bounding_rect = None
+
+    def setPen(self, pen):
+        super(ConnectionItem, self).setPen(pen)
+        self._invalidate_shape()
+
+    def shape(self):
+        """ overrides the original method
+
+        Returns the path stroked with the configured hit width, computed once per path change
+
+        Returns: QPainterPath
+
+        """
+        if self._shape is None:
+            stroker = Qt.QtGui.QPainterPathStroker()
+            stroker.setWidth(max(self.configuration.connection_hit_width,
+                                 self.pen().widthF(),
+                                 self._selected_pen.widthF()))
+            self._shape = stroker.createStroke(self.path())
+        return self._shape
+
+    def boundingRect(self):
+        """ overrides the original method
+
+        The bounds have to embrace the hit-test shape
+
+        Returns: QRectF
+
+        """
+        if self._bounding_rect is None:
+            self._bounding_rect = self.shape().boundingRect()
+        return self._bounding_rect
+
+    def mousePressEvent(self, event):
+        self._moved = False
+        # the title must not cover the slot the connection might get dropped on
+        self.scene().views()[0].hide_connection_title(self)
+        self.scene().clearSelection()
+        self.setSelected(True)
+
+    def mouseReleaseEvent(self, event):
+        if self._moved:
+            item = self.scene().itemAt(self.mapToScene(event.pos()), Qt.QtGui.QTransform())
+            if not (isinstance(item, nodz_main.PlugItem) or isinstance(item, nodz_main.SocketItem)):
+                self.target.disconnect(self)
+                self.source.disconnect(self)
+                scene = self.scene()
+                scene.views()[0].forget_connection(self)
+                scene.removeItem(self)
+                scene.update()
+
+    def mouseMoveEvent(self, event):
+        self._moved = True
+        super(ConnectionItem, self).mouseMoveEvent(event)
+
+    def _remove(self):
+        """ extends the original method
+
+        The connection stays indexed until all disconnection signals were handled
+
+        Returns:
+
+        """
+        scene = self.scene()
+        super(ConnectionItem, self)._remove()
+        if scene:
+            scene.views()[0].forget_connection(self)
+
+    def paint(self, painter, *args):
+        if self._hovered or self.isSelected():
+            painter.setPen(self._selected_pen)
+        else:
+            painter.setPen(self._pen)
+
+        # below the configured threshold we skip the interpolated path
+        # and draw a plain, aliased line between both end points
+        if level_of_detail(painter) < self.configuration.connection_lod_threshold:
+            painter.setRenderHint(Qt.QtGui.QPainter.Antialiasing, False)
+            painter.drawLine(self.source_point, self.target_point)
+        else:
+            painter.drawPath(self.path())
+
+
+class LayoutWorker(Qt.QtCore.QThread):
+    """ computes a layout in a background thread
+
+    The worker only reads the given LayoutSnapshot, results will be delivered to
+    the main thread through signal_computed.
+    """
+    signal_progress = Qt.QtCore.Signal(float)
+    signal_computed = Qt.QtCore.Signal(object)
+
+    def __init__(self, snapshot, layout, revision=None, is_outdated=None, parent=None):
+        super(LayoutWorker, self).__init__(parent)
+        # model revision the snapshot was taken at
+        self.revision = revision
+        # key the result will be cached with
+        self.cache_key = None
+        self._snapshot = snapshot
+        self._layout = layout
+        self._is_outdated = is_outdated
+        self._cancelled = False
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def cancel(self):
+        """ stops the computation as soon as possible, no result will be delivered
+
+        Returns:
+
+        """
+        self._cancelled = True
+
+    def _should_stop(self):
+        if not self._cancelled and self._is_outdated and self._is_outdated():
+            self._cancelled = True
+        return self._cancelled
+
+    def run(self):
+        try:
+            positions = self._layout(self._snapshot,
+                                     progress=self.signal_progress.emit,
+                                     cancelled=self._should_stop)
+        except LayoutCancelled:
+            LOG.info("Layout computation was cancelled.")
+            return
+        self.signal_computed.emit(positions)
+
+
+class FileWorker(Qt.QtCore.QThread):
+    """ runs file reading and writing in a background thread
+
+    The task gets called with progress and cancelled keyword arguments. Its result will be delivered to
+    the main thread through signal_done, so only the final scene changes happen there.
+    """
+    signal_progress = Qt.QtCore.Signal(float)
+    signal_done = Qt.QtCore.Signal(object)
+    signal_failed = Qt.QtCore.Signal(object)
+
+    def __init__(self, task, callback=None, errback=None, parent=None):
+        super(FileWorker, self).__init__(parent)
+        # called with the result or the raised exception in the main thread
+        self.callback = callback
+        self.errback = errback
+        self._task = task
+        self._cancelled = False
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def cancel(self):
+        """ stops the task as soon as possible, no result will be delivered
+
+        Returns:
+
+        """
+        self._cancelled = True
+
+    def run(self):
+        try:
+            result = self._task(progress=self.signal_progress.emit,
+                                cancelled=lambda: self._cancelled)
+        except SerializationCancelled:
+            LOG.info("File operation was cancelled.")
+            return
+        except Exception as error:
+            LOG.error("File operation failed.", exc_info=True)
+            self.signal_failed.emit(error)
+            return
+        self.signal_done.emit(result)
+
+
+class Nodz(ConfiguationMixin, nodz_main.Nodz):
+    """ extends the nodz_main.Nodz class
+
+    Original implementation customization
+    """
+    signal_node_created = Qt.QtCore.Signal(object)
+    signal_nodes_deleted = Qt.QtCore.Signal(object)
+    signal_nodes_moved = Qt.QtCore.Signal(object)
+    signal_selection_changed = Qt.QtCore.Signal(object)
+    signal_after_node_created = Qt.QtCore.Signal(object)
+    signal_node_name_changed = Qt.QtCore.Signal(object, str, str)
+    signal_plug_created = Qt.QtCore.Signal(object)
+    signal_socket_created = Qt.QtCore.Signal(object)
+    signal_connection_made = Qt.QtCore.Signal(object)
+    signal_disconnection_made = Qt.QtCore.Signal(object)
+    signal_about_attribute_create = Qt.QtCore.Signal(str, str)
+    signal_context_request = Qt.QtCore.Signal(object)
+    signal_creation_field_request = Qt.QtCore.Signal()
+    signal_search_field_request = Qt.QtCore.Signal()
+    signal_rename_field_request = Qt.QtCore.Signal()
+    signal_layout_request = Qt.QtCore.Signal()
+    signal_layout_progress = Qt.QtCore.Signal(float)
+    signal_file_progress = Qt.QtCore.Signal(float)
+    signal_file_failed = Qt.QtCore.Signal(object)
+    signal_plug_connected = None
+    signal_plug_disconnected = None
+    signal_socket_connected = None
+    signal_socket_disconnected = None
+
+    # configuration keys every node or connection is styled with
+    NODE_STYLE_KEYS = ("node_border", "node_font", "node_font_size", "attr_font", "attr_font_size")
+    CONNECTION_STYLE_KEYS = ("connection_color", "connection_width", "connection_highlight_color",
+                             "connection_inherit_datatype_color")
+
+    def __init__(self, parent):
+        # unfortunately nodz_main.Nodz expects a default config file at the same level as the module
+        # we pass our default here, loadConfig reads it through the parsed configuration cache
+        super(Nodz, self).__init__(parent, configPath=self.BASE_CONFIG_PATH)
+        self.initialize_configuration()
+        self.config = self.configuration_data
+
+        self._rename_field = RenameField(self)
+        self._search_field = SearchField(self)
+        self._creation_field = SearchField(self)
+        self._context = GraphContext(self)
+        self._attribute_context = AttributeContext(self)
+        self._backdrop_context = BackdropContext(self)
+
+        # patching original signals
+        self.signal_plug_connected = self.signal_PlugConnected
+        self.signal_plug_disconnected = self.signal_PlugDisconnected
+        self.signal_socket_connected = self.signal_SocketConnected
+        self.signal_socket_disconnected = self.signal_SocketDisconnected
+
+        # all items of this graph emit through a single ItemSignals instance
+        self._item_signals = None
+        self._setup_item_signals()
+
+        self._connections_index = ConnectionIndex()
+        self._style_index = StyleIndex()
+
+        # bulk edits will collect connections and update them at once
+        self._batch_depth = 0
+        self._batch_index_method = None
+        self._batch_selection = []
+        self._dirty_connections = set()
+
+        # the Qt independent model the scene items are kept in sync with
+        self._model = GraphModel()
+        self._layout_worker = None
+        self._layout_cache = None
+        self._file_workers = []
+
+        # a single title item shared by all connections, created on first hover
+        self._connection_title = None
+        self._connection_title_owner = None
+        self.signal_PlugConnected.connect(self._on_slots_connected)
+        self.signal_SocketConnected.connect(self._on_slots_connected)
+        self.signal_PlugDisconnected.connect(self._on_slots_disconnected)
+        self.signal_SocketDisconnected.connect(self._on_slots_disconnected)
+
+        # test
+        self.selected_nodes = []
+
+    def loadConfig(self, filePath):
+        """ overrides the original config loading to read through the parsed configuration cache
+
+        Args:
+            filePath: path of the configuration file
+
+        Returns:
+
+        """
+        # nodz changes its config, so it must not get the cached data itself
+        self.config = copy.deepcopy(CONFIGURATION_CACHE.get_data(filePath))
+
+    @property
+    def item_signals(self):
+        """ holds the ItemSignals instance shared by all items of this graph
+
+        Returns: ItemSignals instance
+
+        """
+        return self._item_signals
+
+    @property
+    def model(self):
+        """ holds the Qt independent model of the graph
+
+        Returns: GraphModel instance
+
+        """
+        return self._model
+
+    @property
+    def connections_index(self):
+        """ holds the lookup of all connections in this graph
+
+        Returns: ConnectionIndex instance
+
+        """
+        return self._connections_index
+
+    @property
+    def style_index(self):
+        """ holds the lookup of nodes by preset and connections by data type
+
+        Returns: StyleIndex instance
+
+        """
+        return self._style_index
+
+    @property
+    def rename_field(self):
+        return self._rename_field
+
+    @property
+    def search_field(self):
+        """ holds the search field widget
+
+        Returns: SearchField instance
+
+        """
+        return self._search_field
+
+    @property
+    def creation_field(self):
+        """ holds the creation field widgets
+
+        Returns: SearchField instance
+
+        """
+
+        return self._creation_field
+
+    @property
+    def context(self):
+        """ holds the creation field widgets
+
+        Returns: GraphContext instance
+
+        """
+
+        return self._context
+
+    @property
+    def attribute_context(self):
+        """ holds the attribute field widgets
+
+        Returns: AttributeContext instance
+
+        """
+
+        return self._attribute_context
+
+    @property
+    def backdrop_context(self):
+        """ holds the backdrop context widget
+
+        Returns: AttributeContext instance
+
+        """
+
+        return self._backdrop_context
+
+    def keyPressEvent(self, event):
+        """ overrides the keyPressEvent
+
+        We are adding more key press events here
+        Args:
+            event:
+
+        Returns:
+
+        """
+        if event.key() not in self.pressedKeys:
             self.pressedKeys.append(event.key())
         if event.key() == Qt.QtCore.Qt.Key_Delete:
             self._deleteSelectedNodes()
@@ -704,15 +1461,27 @@ class Nodz(ConfiguationMixin, nodz_main.Nodz):
                 self.signal_context_request.emit(self.scene().itemAt(self.mapToScene(event.pos()), Qt.QtGui.QTransform()))
         super(Nodz, self).mousePressEvent(event)
 
-    def _deleteSelectedNodes(self):
-        """ overrides original method
+    def mouseReleaseEvent(self, event):
+        """ extends the mouseReleaseEvent
+
+        Positions of nodes that were moved get written to the model and a nodes_moved signal will be emitted
+        Args:
+            event:
 
-        Let us emit a signal on nodes deletion
         Returns:
 
         """
-        self.signal_nodes_deleted.emit([_ for _ in self.scene().selectedItems() if isinstance(_, NodeItem)])
-        super(Nodz, self)._deleteSelectedNodes()
+        super(Nodz, self).mouseReleaseEvent(event)
+
+        moved = []
+        for item in self.scene().selectedItems():
+            if isinstance(item, NodeItem):
+                node_data = self.model.get_node(item.name)
+                if node_data and node_data.position != (item.x(), item.y()):
+                    moved.append(item)
+        if moved:
+            self.sync_model_positions([_.name for _ in moved])
+            self.signal_nodes_moved.emit(moved)
 
     def _deleteSelectedNodes(self):
         """ overrides original method
@@ -721,11 +1490,13 @@ class Nodz(ConfiguationMixin, nodz_main.Nodz):
         Returns:
 
         """
+        # the nodes have to be collected before they get removed from the scene
+        nodes = [_ for _ in self.scene().selectedItems() if isinstance(_, NodeItem)]
         for node in self.scene().selectedItems():
             node._remove()
 
         # Emit signal.
-        self.signal_nodes_deleted.emit([_ for _ in self.scene().selectedItems() if isinstance(_, NodeItem)])
+        self.signal_nodes_deleted.emit(nodes)
 
     def retrieve_creation_position(self):
         """ retrieves the position where something should be created
@@ -743,12 +1514,87 @@ class Nodz(ConfiguationMixin, nodz_main.Nodz):
 
         return position
 
+    def is_area_free(self, x, y, width, height, ignored=()):
+        """ checks if no node overlaps the given area by querying the scene index
+
+        Args:
+            x: left
+            y: top
+            width: width
+            height: height
+            ignored: NodeItems that will be ignored
+
+        Returns: bool
+
+        """
+        for item in self.scene().items(Qt.QtCore.QRectF(x, y, width, height)):
+            if isinstance(item, NodeItem) and item not in ignored:
+                return False
+        return True
+
+    def estimate_node_size(self, attribute_count=0):
+        """ estimates the size of a node before it was created
+
+        Args:
+            attribute_count: number of attributes the node will get
+
+        Returns: width, height tuple
+
+        """
+        return (self.configuration.node_width,
+                self.configuration.node_height + attribute_count * self.configuration.node_attr_height)
+
+    def occupancy_grid(self):
+        """ creates an OccupancyGrid that holds all nodes of the scene
+
+        Meant for placing many nodes at once, the grid won't follow any later node changes
+
+        Returns: OccupancyGrid instance
+
+        """
+        margin = self.configuration.node_placement_margin
+        grid = OccupancyGrid(self.configuration.node_width + margin,
+                             self.configuration.node_height + margin,
+                             margin)
+        for node in self.scene().nodes.values():
+            grid.add(node.x(), node.y(), node.baseWidth, node.height)
+        return grid
+
+    def find_free_position(self, anchor=None, attribute_count=0, grid=None):
+        """ finds the creation position closest to the anchor where a new node won't overlap other nodes
+
+        Args:
+            anchor: QPointF, defaults to the configured creation position
+            attribute_count: number of attributes the node will get
+            grid: OccupancyGrid instance for placing many nodes at once, the free space will be found
+            by querying the scene index otherwise
+
+        Returns: QPointF node center as expected by createNode
+
+        """
+        if anchor is None:
+            anchor = self.retrieve_creation_position() or self.mapToScene(self.viewport().rect().center())
+
+        width, height = self.estimate_node_size(attribute_count)
+        # createNode centers the node around the position based on its initial height
+        center_x = width * 0.5
+        center_y = self.configuration.node_height * 0.5
+
+        is_free = None
+        if grid is None:
+            margin = self.configuration.node_placement_margin
+            grid = OccupancyGrid(width + margin, self.configuration.node_height + margin)
+            is_free = lambda x, y, w, h: self.is_area_free(x - margin, y - margin, w + 2 * margin, h + 2 * margin)
+
+        x, y = grid.find_free(anchor.x() - center_x, anchor.y() - center_y, width, height, is_free=is_free)
+        return Qt.QtCore.QPointF(x + center_x, y + center_y)
+
     def create_node(self, name, position=None, alternate=False, node_type="default"):
         """ wrapper around Nodz.createNode() to extend behavior
 
         Args:
             name: node name
-            position: if unset it will calculate the position based on the configuration
+            position: if unset it will find a free position close to the configured placement
             alternate: The attribute color alternate state, if True, every 2 attribute the color will be slightly darker
             node_type: node type
 
@@ -759,16 +1605,17 @@ class Nodz(ConfiguationMixin, nodz_main.Nodz):
             self.create_backdrop()
         else:
             if not position:
-                position = self.retrieve_creation_position()
+                position = self.find_free_position()
 
-            _ = "node_{0}".format(node_type)
-            if hasattr(self.configuration, _):
+            preset = self.configuration.node_presets.get(node_type)
+            if preset:
                 # and create node with included preset
-                node = self.createNode(name, _, position=position, alternate=alternate)
+                node = self.createNode(name, preset, position=position, alternate=alternate)
             else:
                 LOG.info("Node preset for type {0} not configured.".format(node_type))
                 node = self.createNode(name, position=position, alternate=alternate)
             node.node_type = node_type
+            self.model.add_node(node.name, node_type, (node.x(), node.y()))
 
             self.signal_node_created.emit(node)
             return node
@@ -786,10 +1633,9 @@ class Nodz(ConfiguationMixin, nodz_main.Nodz):
 
         """
         nodeItem = NodeItem(name=name, alternate=alternate, preset=preset,
-                            config=self.configuration_data)
-        nodeItem.signal_context_request.connect(self.on_context_request)
-        nodeItem.signal_plug_created.connect(self.on_plug_created)
-        nodeItem.signal_socket_created.connect(self.on_socket_created)
+                            config=self.configuration_data, signals=self.item_signals)
+        nodeItem.apply_style(self.styles)
+        self.style_index.add_node(nodeItem, preset)
 
         # Store node in scene.
         self.scene().nodes[name] = nodeItem
@@ -810,6 +1656,220 @@ class Nodz(ConfiguationMixin, nodz_main.Nodz):
     def delete_node(self, name):
         raise NotImplementedError
 
+    @property
+    def is_batching(self):
+        """ holds if the graph is bulk edited at the moment
+
+        Returns: bool
+
+        """
+        return self._batch_depth > 0
+
+    def begin_batch(self):
+        """ suspends scene indexing, viewport updates, connection path updates and scene signals
+
+        Use Nodegraph.batch() or BatchUpdate instead of calling this directly
+
+        Returns:
+
+        """
+        self._batch_depth += 1
+        if self._batch_depth > 1:
+            return
+
+        scene = self.scene()
+        self._batch_index_method = scene.itemIndexMethod()
+        self._batch_selection = scene.selectedItems()
+        scene.setItemIndexMethod(Qt.QtWidgets.QGraphicsScene.NoIndex)
+        scene.blockSignals(True)
+        self.setUpdatesEnabled(False)
+
+    def end_batch(self):
+        """ updates all collected connections once, rebuilds the scene index and repaints
+
+        Returns:
+
+        """
+        self._batch_depth -= 1
+        if self._batch_depth > 0:
+            return
+
+        dirty_connections = self._dirty_connections
+        self._dirty_connections = set()
+        self.update_connection_paths(dirty_connections)
+
+        scene = self.scene()
+        # re-enabling the index method rebuilds the index once for all items
+        scene.setItemIndexMethod(self._batch_index_method)
+        scene.blockSignals(False)
+        # selection changes weren't announced while batching
+        if scene.selectedItems() != self._batch_selection:
+            scene.selectionChanged.emit()
+        self._batch_selection = []
+        self.setUpdatesEnabled(True)
+        self.viewport().update()
+
+    def update_connection_paths(self, connections):
+        """ updates the end points and paths of the given connections
+
+        While batching the connections will be updated once the batch ends
+
+        Args:
+            connections: list of ConnectionItem instances
+
+        Returns:
+
+        """
+        if self.is_batching:
+            self._dirty_connections.update(connections)
+            return
+
+        for connection in connections:
+            connection.target_point = connection.target.center()
+            connection.source_point = connection.source.center()
+            connection.updatePath()
+
+    def forget_connection(self, connection):
+        """ removes a deleted connection from the index and pending updates
+
+        Args:
+            connection: ConnectionItem instance
+
+        Returns:
+
+        """
+        self.connections_index.remove(connection)
+        self.style_index.remove_connection(connection)
+        self._dirty_connections.discard(connection)
+        self.hide_connection_title(connection)
+
+    @property
+    def connection_title(self):
+        """ holds the text item that shows the title of the hovered connection
+
+        Returns: QGraphicsTextItem instance or None if no connection was hovered yet
+
+        """
+        return self._connection_title
+
+    def show_connection_title(self, connection):
+        """ fills the shared title item with the connection's title and centers it on the connection
+
+        Args:
+            connection: ConnectionItem instance
+
+        Returns:
+
+        """
+        if self._connection_title is None:
+            self._connection_title = Qt.QtWidgets.QGraphicsTextItem()
+            self._connection_title.setAcceptedMouseButtons(Qt.QtCore.Qt.NoButton)
+            self._connection_title.setAcceptHoverEvents(False)
+            self._connection_title.setZValue(1000)
+            self.scene().addItem(self._connection_title)
+
+        title = self._connection_title
+        # the styles are cached, so this only costs a lookup
+        title.setFont(self.styles.connection_title_font())
+        title.setDefaultTextColor(self.styles.connection_title_color())
+        title.setPlainText(connection.title)
+        center = connection.mapToScene(connection.boundingRect().center())
+        title.setPos(center.x() - title.boundingRect().width() / 2,
+                     center.y() - title.boundingRect().height() / 2)
+        title.setVisible(True)
+        self._connection_title_owner = connection
+
+    def hide_connection_title(self, connection=None):
+        """ hides the shared title item
+
+        Args:
+            connection: if given the title is only hidden if it belongs to this connection
+
+        Returns:
+
+        """
+        if self._connection_title is None:
+            return
+        if connection is not None and connection is not self._connection_title_owner:
+            return
+        self._connection_title.setVisible(False)
+        self._connection_title_owner = None
+
+    def clearGraph(self):
+        """ extends the clearGraph method
+
+        All items of the cleared scene keep referencing the old ItemSignals instance,
+        so we silence it and route new items through a fresh one
+
+        Returns:
+
+        """
+        self.cancel_layout()
+        self._setup_item_signals()
+        self.connections_index.clear()
+        self.style_index.clear()
+        self.model.clear()
+        self._dirty_connections.clear()
+        super(Nodz, self).clearGraph()
+        # clearing the scene deleted the title item as well
+        self._connection_title = None
+        self._connection_title_owner = None
+
+    def _setup_item_signals(self):
+        """ creates the ItemSignals instance for this graph and connects it once
+
+        Returns:
+
+        """
+        if self._item_signals is not None:
+            self._item_signals.blockSignals(True)
+
+        self._item_signals = ItemSignals()
+        self._item_signals.signal_context_request.connect(self._route_context_request)
+        self._item_signals.signal_plug_created.connect(self._route_plug_created)
+        self._item_signals.signal_socket_created.connect(self._route_socket_created)
+
+    # the routing methods look up the slots on call time, because the Nodegraph
+    # class patches them after the graph was initialized
+    def _route_context_request(self, item):
+        self.on_context_request(item)
+
+    def _route_plug_created(self, plug_item):
+        self.model.add_attribute(plug_item.parentItem().name, plug_item.attribute,
+                                 plug=True, socket=False, data_type=plug_item.dataType)
+        self.on_plug_created(plug_item)
+
+    def _route_socket_created(self, socket_item):
+        self.model.add_attribute(socket_item.parentItem().name, socket_item.attribute,
+                                 plug=False, socket=True, data_type=socket_item.dataType)
+        self.on_socket_created(socket_item)
+
+    # connections drawn in the view don't pass createConnection,
+    # so the model listens to the original connection signals
+    def _on_slots_connected(self, plug_node, plug_attr, socket_node, socket_attr):
+        if plug_node and plug_attr and socket_node and socket_attr:
+            self.model.connect(plug_node, plug_attr, socket_node, socket_attr)
+
+    def _on_slots_disconnected(self, plug_node, plug_attr, socket_node, socket_attr):
+        self.model.disconnect(plug_node, plug_attr, socket_node, socket_attr)
+
+    def sync_model_positions(self, node_names=None):
+        """ writes the current node item positions to the model
+
+        Positions are not tracked on every move, call this before reading them from the model
+
+        Args:
+            node_names: expects a list of node names otherwise it will consider all available nodes
+
+        Returns:
+
+        """
+        nodes = self.scene().nodes
+        for node_name in (node_names if node_names is not None else nodes.keys()):
+            node = nodes.get(node_name)
+            if node:
+                self.model.set_position(node_name, node.x(), node.y())
+
     def rename_node(self, node, new_name):
         """ gives specified node a new name
 
@@ -823,6 +1883,8 @@ class Nodz(ConfiguationMixin, nodz_main.Nodz):
         old_name = node.name
         if old_name != new_name:
             self.editNode(node, new_name)
+            self.connections_index.rename_node(old_name)
+            self.model.rename_node(old_name, new_name)
             self.signal_node_name_changed.emit(node, old_name, new_name)
 
     def create_backdrop(self):
@@ -837,15 +1899,67 @@ class Nodz(ConfiguationMixin, nodz_main.Nodz):
         Returns:
 
         """
+        slot = connection.plugItem or connection.socketItem
+        self.style_index.add_connection(connection, slot.dataType)
+
         # set color based on data_type
         if self.configuration.connection_inherit_datatype_color:
-            if connection.plugItem:
-                expected_config = "datatype_{0}".format(connection.plugItem.dataType)
-            else:
-                expected_config = "datatype_{0}".format(connection.socketItem.dataType)
-            if hasattr(self.configuration, expected_config):
-                color = nodz_utils._convertDataToColor(self.configuration_data[expected_config]["plug"])
-                connection._pen = color
+            connection._pen = self.styles.connection_pen(slot.dataType)
+
+    def apply_configuration(self, configuration):
+        """ replaces the configuration and restyles only the items affected by changed keys
+
+        Nodes and their slots get restyled by the presets they use, connections by their data type, a changed
+        datatype_color preset only touches nodes with color attributes and connections of type color.
+        Args:
+            configuration: Configuration instance
+
+        Returns: set of changed keys
+
+        """
+        new_data = configuration.get_original()
+        missing = [_ for _ in self.style_index.presets if _ not in new_data]
+        if missing:
+            raise ValueError("Configuration misses the presets {0} that are in use.".format(", ".join(sorted(missing))))
+
+        old_data = self.configuration_data
+        changed = set(_ for _ in set(old_data) | set(new_data) if old_data.get(_) != new_data.get(_))
+        self.configuration = configuration
+        # the original items read their presets through the config of their view, so other graphs stay untouched
+        self.config = new_data
+        if not changed:
+            return changed
+
+        if changed.intersection(self.NODE_STYLE_KEYS):
+            nodes = self.style_index.get_nodes()
+        else:
+            nodes = set()
+            for key in changed:
+                nodes.update(self.style_index.get_nodes(key))
+
+        if changed.intersection(self.CONNECTION_STYLE_KEYS):
+            connections = self.style_index.get_connections()
+        else:
+            connections = set()
+            for key in changed:
+                if key.startswith("datatype_"):
+                    connections.update(self.style_index.get_connections(key[9:]))
+
+        slot_presets = set(_ for _ in changed if _.startswith("datatype_"))
+        for node in nodes:
+            node.apply_style(self.styles)
+            if slot_presets:
+                node.apply_slot_style(self.styles, slot_presets)
+        for connection in connections:
+            connection.apply_style(self.styles)
+        if "connection_interpolation" in changed:
+            self.update_connection_paths(self.style_index.get_connections())
+        self.hide_connection_title()
+        LOG.info("Restyled {0} nodes and {1} connections.".format(len(nodes), len(connections)))
+
+        # everything else is only drawn, e.g. the grid
+        self.viewport().update()
+        return changed
 
     def connect_attributes(self, plug, socket):
         """ creates a new ConnectionItem instance that connects plug and socket
@@ -881,157 +1995,386 @@ class Nodz(ConfiguationMixin, nodz_main.Nodz):
         connection.socketAttr = socket.attribute
         connection.socketItem = socket
 
+        # index before connecting, the connection signals will look it up
+        self.connections_index.add(connection, plug, socket)
+
         plug.connect(socket, connection)
         socket.connect(plug, connection)
 
         # let us apply the corresponding data type color
         self.apply_data_type_color_to_connection(connection)
 
-        self.scene().addItem(connection)
+        self.scene().addItem(connection)
+
+        self.update_connection_paths([connection])
+
+        return connection
+
+    def get_shared_connection(self, plug, socket):
+        """ finds the shared connection item
+
+        Args:
+            plug: PlugItem instance
+            socket: SocketItem instance
+
+        Returns: ConnectionItem instance
+
+        """
+        connection = self.connections_index.get(plug, socket)
+        if connection:
+            return connection
+
+        # connections drawn in the view don't pass createConnection
+        # we index them on their first lookup
+        socket_connections = set(socket.connections)
+        shared_connections = [_ for _ in plug.connections if _ in socket_connections]
+        if shared_connections:
+            if len(shared_connections) != 1:
+                LOG.error("Multiple shared connections on plug '{0}' and socket '{1}'".format(plug, socket))
+            else:
+                self.connections_index.add(shared_connections[0], plug, socket)
+                return shared_connections[0]
+
+    def get_shared_connection_by_names(self, plug_node, plug_attr, socket_node, socket_attr):
+        """ finds the shared connection item by node and attribute names
+
+        Args:
+            plug_node: source node name
+            plug_attr: plug name
+            socket_node: destination node name
+            socket_attr: socket name
+
+        Returns: ConnectionItem instance
+
+        """
+        connection = self.connections_index.get_by_names(plug_node, plug_attr, socket_node, socket_attr)
+        if connection:
+            return connection
+
+        nodes = self.scene().nodes
+        if plug_node in nodes and socket_node in nodes:
+            plug = nodes[plug_node].plugs.get(plug_attr)
+            socket = nodes[socket_node].sockets.get(socket_attr)
+            if plug and socket:
+                return self.get_shared_connection(plug, socket)
+
+    def disconnect_attributes(self, plug, socket):
+        """ removes a shared connection
+
+        Args:
+            plug: PlugItem instance
+            socket: SocketItem instance
+
+        Returns:
+
+        """
+        connection = self.get_shared_connection(plug, socket)
+        if connection:
+            connection._remove()
+
+    def on_context_request(self, node_item):
+        """ placeholder method, has to be overriden in Nodegraph class
+
+        Args:
+            node_item:
+
+        Returns:
+
+        """
+        pass
+
+    def on_plug_created(self, plug_item):
+        pass
+
+    def on_socket_created(self, socket_item):
+        pass
+
+    def on_selected(self, node):
+        pass
+
+    def layout_snapshot(self, node_names=None):
+        """ captures the nodes, their sizes, positions and connections for layout computations
+
+        Args:
+            node_names: expects a list of node names otherwise it will consider all available nodes
+
+        Returns: LayoutSnapshot instance
+
+        """
+        nodes = self.scene().nodes
+        if not node_names:
+            node_names = nodes.keys()
+        node_names = [_ for _ in node_names if _ in nodes]
+        sizes = {}
+        positions = {}
+        for node_name in node_names:
+            node = nodes[node_name]
+            sizes[node_name] = (node.baseWidth, node.height)
+            positions[node_name] = (node.x(), node.y())
+
+        snapshot = LayoutSnapshot.from_model(self.model, node_names, sizes)
+        snapshot.positions = positions
+        return snapshot
+
+    def apply_layout(self, positions):
+        """ moves nodes to the given positions in a single batched update
+
+        Args:
+            positions: dict holding (x, y) tuples by node name
+
+        Returns:
+
+        """
+        nodes = self.scene().nodes
+        moved = []
+        connections = set()
+        with BatchUpdate(self):
+            for node_name, (x, y) in positions.items():
+                node = nodes.get(node_name)
+                if node:
+                    node.setPos(x, y)
+                    connections.update(node.slot_connections)
+                    moved.append(node)
+            self.update_connection_paths(connections)
+
+            # update scene rect if needed
+            bounds = self.scene().itemsBoundingRect()
+            scene_rect = self.scene().sceneRect()
+            if not scene_rect.contains(bounds):
+                self.scene().setSceneRect(scene_rect.united(bounds))
+
+        self.sync_model_positions(list(positions.keys()))
+        if moved:
+            self.signal_nodes_moved.emit(moved)
+
+    def get_layout_function(self):
+        """ gets the layout function defined by the layout_algorithm configuration
+
+        Returns: callable that expects a LayoutSnapshot and returns positions by node name
+
+        """
+        algorithm = self.configuration.layout_algorithm
+        if algorithm == "force_directed":
+            return functools.partial(force_directed_layout,
+                                     margin=self.configuration.layout_margin_size,
+                                     iterations=self.configuration.layout_force_iterations)
+        elif algorithm != "layered":
+            LOG.warning("Unsupported layout_algorithm '{0}', using 'layered'.".format(algorithm))
+        return functools.partial(layered_layout,
+                                 margin=self.configuration.layout_margin_size,
+                                 sweeps=self.configuration.layout_crossing_sweeps)
+
+    def layout_nodes(self, node_names=None):
+        """ rearranges node positions
+
+        Uses the configured layout_algorithm. The layered layout places upstream nodes
+        left of the nodes they are connected to.
 
-        connection.updatePath()
+        Args:
+            node_names: expects a list of node names otherwise it will consider all available nodes
 
-        return connection
+        Returns:
 
-    def get_shared_connection(self, plug, socket):
-        """ finds the shared connection item
+        """
+        snapshot = self.layout_snapshot(node_names)
+        layout = self.get_layout_function()
+        cache_key = self._get_layout_cache_key(snapshot, layout)
+        positions = self._get_cached_layout(snapshot, cache_key)
+        if positions is None:
+            positions = layout(snapshot)
+            self.layout_cache.put(cache_key, move_to_origin(positions, (0, 0)))
+        self.apply_layout(positions)
 
-        Args:
-            plug: PlugItem instance
-            socket: SocketItem instance
+    @property
+    def layout_cache(self):
+        """ holds the cache of computed layouts by topology
 
-        Returns: ConnectionItem instance
+        Returns: LayoutCache instance
 
         """
-        all_connections = plug.connections + socket.connections
-        shared_connections = list(set(all_connections))
-        if shared_connections:
-            if len(shared_connections) != 1:
-                LOG.error("Multiple shared connections on plug '{0}' and socket '{1}'".format(plug, socket))
-            else:
-                return shared_connections[0]
+        if self._layout_cache is None:
+            cache_dir = self.configuration.layout_cache_dir
+            self._layout_cache = LayoutCache(max_size=self.configuration.layout_cache_size,
+                                             cache_dir=os.path.expanduser(os.path.expandvars(cache_dir))
+                                             if cache_dir else None)
+        return self._layout_cache
 
-    def disconnect_attributes(self, plug, socket):
-        """ removes a shared connection
+    def _get_layout_cache_key(self, snapshot, layout):
+        settings = "{0}{1}".format(layout.func.__name__, sorted(layout.keywords.items()))
+        return hashlib.sha1((self.model.topology_fingerprint(snapshot.node_names) +
+                             settings).encode("utf-8")).hexdigest()
+
+    def _get_cached_layout(self, snapshot, cache_key):
+        positions = self.layout_cache.get(cache_key)
+        if positions is None or set(positions) != set(snapshot.node_names):
+            return None
+        origin = (0, 0)
+        if snapshot.positions:
+            origin = (min(_[0] for _ in snapshot.positions.values()),
+                      min(_[1] for _ in snapshot.positions.values()))
+        return move_to_origin(positions, origin)
+
+    def layout_new_nodes(self, node_names):
+        """ places the given nodes next to their connected nodes while all other nodes keep their positions
+
+        Only the given nodes and their direct neighbours will be considered, so the costs
+        scale with the number of new nodes and not with the size of the graph. Nodes that form
+        a network on their own get its cached layout if there is one.
 
         Args:
-            plug: PlugItem instance
-            socket: SocketItem instance
+            node_names: names of the nodes to place
 
         Returns:
 
         """
-        connection = self.get_shared_connection(plug, socket)
-        if connection:
-            connection._remove()
+        nodes = self.scene().nodes
+        node_names = [_ for _ in node_names if _ in nodes]
+        if not node_names:
+            return
 
-    def on_context_request(self, node_item):
-        """ placeholder method, has to be overriden in Nodegraph class
+        involved = set(node_names)
+        for node_name in node_names:
+            involved.update(self.model.get_upstream_nodes(node_name))
+            involved.update(self.model.get_downstream_nodes(node_name))
+
+        if involved == set(node_names):
+            # a network on its own that was laid out before gets its cached layout back
+            snapshot = self.layout_snapshot(node_names)
+            positions = self._get_cached_layout(snapshot,
+                                                self._get_layout_cache_key(snapshot, self.get_layout_function()))
+            if positions is not None:
+                self.apply_layout(positions)
+                return
+
+        snapshot = self.layout_snapshot(list(involved))
+
+        ignored = set(nodes[_] for _ in node_names)
+        self.apply_layout(incremental_layout(snapshot,
+                                             node_names,
+                                             margin=self.configuration.layout_margin_size,
+                                             is_free=lambda *rect: self.is_area_free(*rect, ignored=ignored)))
+
+    def layout_nodes_async(self, node_names=None):
+        """ rearranges node positions like layout_nodes but computes the layout in a background thread
+
+        A running layout computation will be cancelled. So will this one if nodes or connections
+        change before the result arrives. The result is applied in a single batched update.
 
         Args:
-            node_item:
+            node_names: expects a list of node names otherwise it will consider all available nodes
+
+        Returns: LayoutWorker instance or None if a cached layout was applied right away
+
+        """
+        self.cancel_layout()
+
+        snapshot = self.layout_snapshot(node_names)
+        layout = self.get_layout_function()
+        cache_key = self._get_layout_cache_key(snapshot, layout)
+        positions = self._get_cached_layout(snapshot, cache_key)
+        if positions is not None:
+            self.apply_layout(positions)
+            return None
+
+        revision = self.model.revision
+        worker = LayoutWorker(snapshot,
+                              layout,
+                              revision=revision,
+                              is_outdated=lambda: self.model.revision != revision,
+                              parent=self)
+        worker.cache_key = cache_key
+        # both are received in the main thread
+        worker.signal_progress.connect(self.signal_layout_progress.emit)
+        worker.signal_computed.connect(self._on_layout_computed)
+        worker.finished.connect(self._on_layout_worker_finished)
+        self._layout_worker = worker
+        worker.start()
+        return worker
+
+    def cancel_layout(self):
+        """ cancels the running background layout computation if there is one
 
         Returns:
 
         """
-        pass
+        if self._layout_worker:
+            self._layout_worker.cancel()
+            self._layout_worker = None
+            self.signal_layout_progress.emit(1.0)
 
-    def on_plug_created(self, plug_item):
-        pass
+    def _on_layout_computed(self, positions):
+        worker = self.sender()
+        if worker is self._layout_worker:
+            self._layout_worker = None
+        if worker.cancelled or worker.revision != self.model.revision:
+            LOG.info("Discarding outdated layout result.")
+            self.signal_layout_progress.emit(1.0)
+            return
+        self.layout_cache.put(worker.cache_key, move_to_origin(positions, (0, 0)))
+        self.apply_layout(positions)
 
-    def on_socket_created(self, socket_item):
-        pass
+    def _on_layout_worker_finished(self):
+        worker = self.sender()
+        # outdated computations stop without a result, so their progress ends here
+        if worker.cancelled and self._layout_worker in (None, worker):
+            self._layout_worker = None
+            self.signal_layout_progress.emit(1.0)
+        worker.deleteLater()
 
-    def on_selected(self, node):
-        pass
+    def run_file_task(self, task, callback=None, errback=None):
+        """ runs a file reading or writing task in a background thread
 
-    def layout_nodes(self, node_names=None):
-        """ rearranges node positions
+        Failed tasks are reported through signal_file_failed
+        Args:
+            task: callable that expects progress and cancelled keyword arguments
+            callback: callable that gets the result of the task passed in the main thread
+            errback: callable that gets the exception of a failed task passed in the main thread
 
-        Notes:
-            Adopted from implementation of user https://github.com/glm-ypinczon
+        Returns: FileWorker instance
 
-        Args:
-            node_names: expects a list of node names otherwise it will consider all available nodes
+        """
+        worker = FileWorker(task, callback=callback, errback=errback, parent=self)
+        # all signals are received in the main thread
+        worker.signal_progress.connect(self.signal_file_progress.emit)
+        worker.signal_done.connect(self._on_file_task_done)
+        worker.signal_failed.connect(self._on_file_task_failed)
+        worker.finished.connect(self._on_file_worker_finished)
+        self._file_workers.append(worker)
+        worker.start()
+        return worker
+
+    def cancel_file_tasks(self):
+        """ cancels all running file tasks
 
         Returns:
 
         """
-        node_width = 300  # default value, will be replaced by node.baseWidth + margin when iterating on the first node
-        margin = self.configuration.layout_margin_size
-        scene_nodes = self.scene().nodes.keys()
-        if not node_names:
-            node_names = scene_nodes
-        root_nodes = []
-        already_placed_nodes = []
+        for worker in self._file_workers:
+            worker.cancel()
 
-        # root nodes (without connection on the plug)
-        for node_name in node_names:
-            node = self.scene().nodes[node_name]
-            if node is not None:
-                node_width = node.baseWidth + margin
-                is_root = True
-                for plug in node.plugs.values():
-                    is_root &= (len(plug.connections) == 0)
-                if is_root:
-                    root_nodes.append(node)
-
-        max_graph_width = 0
-        root_graphs = []
-        for root_node in root_nodes:
-            root_graph = list()
-            root_graph.append([root_node])
-
-            current_graph_level = 0
-            do_next_graph_level = True
-            while do_next_graph_level:
-                do_next_graph_level = False
-                for _node in range(len(root_graph[current_graph_level])):
-                    node = root_graph[current_graph_level][_node]
-                    for attr in node.attrs:
-                        if attr in node.sockets:
-                            socket = node.sockets[attr]
-                            for connection in socket.connections:
-                                if len(root_graph) <= current_graph_level + 1:
-                                    root_graph.append(list())
-                                root_graph[current_graph_level + 1].append(connection.plugItem.parentItem())
-                                do_next_graph_level = True
-                current_graph_level += 1
-
-            graph_width = len(root_graph) * (node_width + margin)
-            max_graph_width = max(graph_width, max_graph_width)
-            root_graphs.append(root_graph)
-
-        # update scne rect if needed
-        if max_graph_width > self.scene().width():
-            scene_rect = self.scene().sceneRect()
-            scene_rect.setWidth(max_graph_width)
-            self.scene().setSceneRect(scene_rect)
-
-        base_ypos = margin
-        for root_graph in root_graphs:
-            # set positions...
-            # middle of the view
-            current_xpos = max(0, 0.5 * (self.scene().width() - max_graph_width)) + max_graph_width - node_width
-            next_base_ypos = base_ypos
-            for nodes_at_level in root_graph:
-                current_ypos = base_ypos
-                for node in nodes_at_level:
-                    if len(node.plugs) > 0:
-                        if len(node.plugs.values()[0].connections) > 0:
-                            parent_pos = node.plugs.values()[0].connections[0].socketItem.parentItem().pos()
-                            current_xpos = parent_pos.x() - node_width
-                    if (node not in already_placed_nodes) and (node.name in node_names):
-                        already_placed_nodes.append(node)
-                        node_pos = Qt.QtCore.QPointF(current_xpos, current_ypos)
-                        node.setPos(node_pos)
-
-                    current_ypos += node.height + margin
-                    next_base_ypos = max(next_base_ypos, current_ypos)
-                current_xpos -= node_width
-            base_ypos = next_base_ypos
-
-        self.scene().updateScene()
+    def _on_file_task_done(self, result):
+        worker = self.sender()
+        self.signal_file_progress.emit(1.0)
+        if worker.cancelled:
+            return
+        if worker.callback:
+            worker.callback(result)
+
+    def _on_file_task_failed(self, error):
+        worker = self.sender()
+        self.signal_file_progress.emit(1.0)
+        if worker.errback:
+            worker.errback(error)
+        self.signal_file_failed.emit(error)
+
+    def _on_file_worker_finished(self):
+        worker = self.sender()
+        # cancelled tasks stop without a result, so their progress ends here
+        if worker.cancelled:
+            self.signal_file_progress.emit(1.0)
+        if worker in self._file_workers:
+            self._file_workers.remove(worker)
+        worker.deleteLater()
 
     def get_node_by_name(self, node_name):
         """ placeholder method, has to be overriden in Nodegraph class
@@ -1082,9 +2425,7 @@ class Nodegraph(Basegraph):
         self.window.central_layout.addWidget(self.graph)
 
         # appending reserved nodetypes
-        for node_type in self.RESERVED_NODETYPES:
-            self.configuration.available_node_types.append(node_type)
-        self.creation_field.available_items = self.configuration.available_node_types
+        self._update_available_node_types()
 
         # patching
         self.graph.on_context_request = self.on_context_request
@@ -1094,8 +2435,38 @@ class Nodegraph(Basegraph):
         self.graph.delete_node = self._delete_node
         self.graph.get_node_by_name = self.get_node_by_name
         nodz_main.connection_holder = ConnectionItem
+        nodz_main.PlugItem = PlugItem
+        nodz_main.SocketItem = SocketItem
+
+        # keep track of the selection independently of any events
+        self.graph.scene().selectionChanged.connect(self._on_scene_selection_changed)
+
+        # report background layout progress
+        self.graph.signal_layout_progress.connect(self._on_layout_progress)
+        self.graph.signal_file_progress.connect(self._on_file_progress)
+        self.graph.signal_file_failed.connect(self._on_file_failed)
+
+        # journal edits and fold them into snapshots periodically
+        self._journal = None
+        self._journal_suspended = False
+        self._journal_timer = Qt.QtCore.QTimer(self.window)
+        self._journal_timer.timeout.connect(self.compact_journal)
+        self.window.signal_closed.connect(self.close_journal)
+        if Qt.QtWidgets.QApplication.instance():
+            Qt.QtWidgets.QApplication.instance().aboutToQuit.connect(self.close_journal)
+
+        # reload the configuration file when it changes, editors often write
+        # a file in several steps, so we wait until they are done
+        self._configuration_watcher = Qt.QtCore.QFileSystemWatcher(self.window)
+        self._configuration_watcher.fileChanged.connect(self._on_configuration_file_changed)
+        self._configuration_reload_timer = Qt.QtCore.QTimer(self.window)
+        self._configuration_reload_timer.setSingleShot(True)
+        self._configuration_reload_timer.setInterval(250)
+        self._configuration_reload_timer.timeout.connect(self.reload_configuration)
 
         self.register_events()
+        self.setup_journal()
+        self.watch_configuration(self.graph.configuration_file)
 
     @property
     def window(self):
@@ -1118,6 +2489,7 @@ class Nodegraph(Basegraph):
         """
         self._window = window
         self.window.central_layout.addWidget(self.graph)
+        self.window.signal_closed.connect(self.close_journal)
 
     @property
     def graph(self):
@@ -1137,6 +2509,15 @@ class Nodegraph(Basegraph):
         """
         return self.graph.configuration
 
+    @property
+    def model(self):
+        """ holds the Qt independent model of the graph
+
+        Returns: GraphModel instance
+
+        """
+        return self.graph.model
+
     @property
     def events(self):
         """ holds the events
@@ -1206,6 +2587,9 @@ class Nodegraph(Basegraph):
         Returns:
 
         """
+        # the journal got closed with the window, so we start a new session
+        if self._journal is None:
+            self.setup_journal()
         self.window.show(*args, **kwargs)
 
     def save_configuration(self, filepath):
@@ -1220,17 +2604,121 @@ class Nodegraph(Basegraph):
         LOG.info("Saving configuration to {0}".format(filepath))
         return self.graph.save_configuration(filepath)
 
+    def save_configuration_async(self, filepath):
+        """ saves the current configuration in json schema in a background thread
+
+        Args:
+            filepath: path to file
+
+        Returns: FileWorker instance
+
+        """
+        _dir = os.path.dirname(filepath)
+        assert os.path.exists(_dir), "Directory {0} doesn't exist.".format(_dir)
+        LOG.info("Saving configuration to {0}".format(filepath))
+        data = copy.deepcopy(self.graph.configuration_data)
+
+        def task(progress, cancelled):
+            write_json(filepath, data)
+            return filepath
+
+        return self.graph.run_file_task(task)
+
+    def load_configuration_async(self, configuration_file):
+        """ loads a configuration file in a background thread
+
+        Parsing happens in the background, the configuration gets replaced in the main thread.
+        Args:
+            configuration_file: filepath
+
+        Returns: FileWorker instance
+
+        """
+        def task(progress, cancelled):
+            return CONFIGURATION_CACHE.get(configuration_file)
+
+        def apply_configuration(configuration):
+            self.apply_configuration(configuration.copy())
+            self.watch_configuration(configuration_file)
+
+        return self.graph.run_file_task(task, callback=apply_configuration)
+
     def load_configuration(self, configuration_file):
+        """ loads a configuration file and restyles all items affected by the changes
+
+        Args:
+            configuration_file: filepath
+
+        Returns: set of changed keys
+
         """
+        LOG.info("Loading configuration from {0}".format(configuration_file))
+        changed = self.apply_configuration(CONFIGURATION_CACHE.get(configuration_file).copy())
+        self.watch_configuration(configuration_file)
+        return changed
+
+    def apply_configuration(self, configuration):
+        """ replaces the configuration and restyles all items affected by the changes
+
+        Args:
+            configuration: Configuration instance
+
+        Returns: set of changed keys
+
+        """
+        changed = self.graph.apply_configuration(configuration)
+        if "available_node_types" in changed:
+            self._update_available_node_types()
+        return changed
+
+    def _update_available_node_types(self):
+        # the creation field gets its own list, so the reserved node types never end up in the saved configuration
+        available_node_types = list(self.configuration.available_node_types)
+        for node_type in self.RESERVED_NODETYPES:
+            if node_type not in available_node_types:
+                available_node_types.append(node_type)
+        self.creation_field.available_items = available_node_types
+
+    def watch_configuration(self, configuration_file):
+        """ reloads the configuration whenever the given file changes
+
+        Only one file is watched at a time, watching is disabled by the configuration_live_reload configuration
 
         Args:
-            configuration_file:
+            configuration_file: filepath
 
         Returns:
 
         """
-        self.graph.load_configuration(configuration_file)
-        # @todo update functionality
+        watched = self._configuration_watcher.files()
+        if watched:
+            self._configuration_watcher.removePaths(watched)
+        self._configuration_reload_timer.stop()
+        self._watched_configuration_file = os.path.abspath(configuration_file)
+        if self.configuration["configuration_live_reload"]:
+            self._configuration_watcher.addPath(self._watched_configuration_file)
+
+    def _on_configuration_file_changed(self, path):
+        self._configuration_reload_timer.start()
+
+    def reload_configuration(self):
+        """ loads the watched configuration file again
+
+        A file that can't be read or isn't valid keeps the current configuration
+
+        Returns: set of changed keys
+
+        """
+        configuration_file = self._watched_configuration_file
+        # editors that replace files drop them from the watcher
+        if os.path.exists(configuration_file) and configuration_file not in self._configuration_watcher.files():
+            self._configuration_watcher.addPath(configuration_file)
+        try:
+            return self.load_configuration(configuration_file)
+        except (IOError, OSError, ValueError):
+            LOG.error("Not able to reload configuration '{0}'. Keeping the current one.".format(configuration_file),
+                      exc_info=True)
+            return set()
 
     def clear(self):
         """ removes all nodes and connections from graph
@@ -1239,12 +2727,267 @@ class Nodegraph(Basegraph):
         Returns:
 
         """
-        self.graph.clearGraph()
-        # clean nodes_dict
-        self._all_nodes = {}
+        with self.batch():
+            self.graph.clearGraph()
+            # clean nodes_dict
+            self._all_nodes = {}
+            self.update_selection([])
+        if self.active_journal:
+            self.active_journal.cleared()
+
+    def batch(self):
+        """ context manager for bulk edits
+
+        Suspends scene indexing, viewport updates, connection path updates and scene signals
+        until the outermost context exits, e.g.:
+
+            with nodegraph.batch():
+                nodegraph.display_host_nodes(nodes_dict)
+
+        Returns: BatchUpdate instance
+
+        """
+        return BatchUpdate(self.graph)
 
     def save_graph(self, filepath):
-        self.graph.saveGraph(filepath)
+        self.save_active_graph(filepath)
+
+    def save_active_graph(self, filepath, compress=True, indexed=False):
+        """ saves all nodes, attributes, connections and backdrops to a graph file
+
+        The file is written as a stream of records, see coconodz.serialization
+        Args:
+            filepath: path of the graph file
+            compress: if True the records will be zlib compressed
+            indexed: if True every network gets its own chunk, so networks can be loaded separately
+
+        Returns:
+
+        """
+        self.graph.sync_model_positions()
+        save_graph(filepath, self.model, self.get_backdrop_data(), compress=compress, indexed=indexed)
+        self.discard_journal()
+
+    def save_active_graph_async(self, filepath, compress=True, indexed=False):
+        """ saves the graph like save_active_graph but serializes and writes it in a background thread
+
+        The graph gets copied right away, so it can be edited while the file is written.
+        Progress is reported through the graphs signal_file_progress.
+        Args:
+            filepath: path of the graph file
+            compress: if True the records will be zlib compressed
+            indexed: if True every network gets its own chunk, so networks can be loaded separately
+
+        Returns: FileWorker instance
+
+        """
+        self.graph.sync_model_positions()
+        model = self.model.subgraph(self.model.nodes)
+        backdrops = self.get_backdrop_data()
+
+        def task(progress, cancelled):
+            save_graph(filepath, model, backdrops, compress=compress, indexed=indexed,
+                       progress=progress, cancelled=cancelled)
+            return filepath
+
+        return self.graph.run_file_task(task, callback=lambda result: self.discard_journal())
+
+    def load_into_graph(self, filepath, networks=None):
+        """ loads a graph file into the current graph
+
+        Nodes, attributes and connections get created by the bulk display path, so no creation signals are emitted.
+        Args:
+            filepath: path of the graph file
+            networks: list of network names, e.g. shadingEngines, otherwise the whole graph will be loaded
+
+        Returns:
+
+        """
+        self._display_loaded_graph(load_graph(filepath, networks))
+
+    def load_into_graph_async(self, filepath, networks=None):
+        """ loads a graph file like load_into_graph but reads and decodes it in a background thread
+
+        Only displaying the loaded nodes happens in the main thread.
+        Progress is reported through the graphs signal_file_progress.
+        Args:
+            filepath: path of the graph file
+            networks: list of network names, e.g. shadingEngines, otherwise the whole graph will be loaded
+
+        Returns: FileWorker instance
+
+        """
+        def task(progress, cancelled):
+            return load_graph(filepath, networks, progress=progress, cancelled=cancelled)
+
+        return self.graph.run_file_task(task, callback=self._display_loaded_graph)
+
+    def _display_loaded_graph(self, loaded):
+        model, backdrops = loaded
+        self.display_model(model)
+        for backdrop_data in backdrops:
+            self.create_backdrop_from_data(backdrop_data)
+
+    def get_backdrop_data(self):
+        """ describes all backdrops of the scene
+
+        Returns: list of BackdropData instances
+
+        """
+        backdrop_data = []
+        for item in self.graph.scene().items():
+            if isinstance(item, BackdropItem):
+                rect = item.mapRectToScene(item.rect())
+                backdrop_data.append(BackdropData(item.name,
+                                                  bounds=(rect.x(), rect.y(), rect.width(), rect.height()),
+                                                  color=item.color,
+                                                  border_color=item.border_color,
+                                                  description=item.description_text,
+                                                  font=item.font,
+                                                  title_font_size=item.title_font_size,
+                                                  description_font_size=item.description_font_size
+                                                  ))
+        return backdrop_data
+
+    def create_backdrop_from_data(self, backdrop_data):
+        """ creates a backdrop from the given description
+
+        Args:
+            backdrop_data: BackdropData instance
+
+        Returns: BackdropItem instance
+
+        """
+        backdrop = BackdropItem(backdrop_data.name,
+                                bounds=backdrop_data.bounds,
+                                color=backdrop_data.color,
+                                border_color=backdrop_data.border_color,
+                                description=backdrop_data.description,
+                                font=backdrop_data.font,
+                                title_font_size=backdrop_data.title_font_size,
+                                description_font_size=backdrop_data.description_font_size,
+                                styles=self.graph.styles,
+                                signals=self.graph.item_signals
+                                )
+        self.graph.scene().addItem(backdrop)
+        return backdrop
+
+    @property
+    def journal(self):
+        """ holds the journal edits are recorded to
+
+        Returns: GraphJournal instance or None if journaling is disabled
+
+        """
+        return self._journal
+
+    @property
+    def active_journal(self):
+        """ holds the journal if edits should be recorded right now
+
+        Returns: GraphJournal instance or None
+
+        """
+        if not self._journal_suspended:
+            return self._journal
+
+    def setup_journal(self):
+        """ sets up journaling as defined by the journal_dir configuration
+
+        If a previous session didn't shut down cleanly, the user gets asked to recover its edits into the graph.
+        The journal directory can only be used by one graph at a time.
+        Returns:
+
+        """
+        self.close_journal()
+
+        journal_dir = os.path.expandvars(os.path.expanduser(self.configuration.journal_dir))
+        if not journal_dir:
+            return
+        try:
+            self._journal = GraphJournal(journal_dir)
+        except JournalLocked:
+            LOG.warning("Journal directory '{0}' is used by another graph, journaling is disabled.".format(journal_dir))
+            return
+        if self._journal.has_recovery_data:
+            if self.confirm_recovery():
+                self.recover_graph()
+            else:
+                self._journal.discard()
+        if len(self.model):
+            # the journal only holds edits from now on, so it needs the current graph as base
+            self.graph.sync_model_positions()
+            self._journal.compact(self.model, self.get_backdrop_data())
+        self._journal_timer.start(self.configuration.journal_compaction_interval * 1000)
+
+    def close_journal(self):
+        """ closes the journal and marks the session as cleanly shut down, so no recovery will be offered
+
+        Returns:
+
+        """
+        self._journal_timer.stop()
+        if self._journal:
+            self._journal.close(clean=True)
+            self._journal = None
+
+    def discard_journal(self):
+        """ removes all journaled edits, e.g. after the graph was saved
+
+        The current graph becomes the new snapshot, so edits journaled from now on have a base to be replayed on
+        Returns:
+
+        """
+        if not self._journal:
+            return
+        self._journal.discard()
+        if len(self.model):
+            self.graph.sync_model_positions()
+            self._journal.compact(self.model, self.get_backdrop_data())
+
+    def confirm_recovery(self):
+        """ asks the user if the edits of a session that didn't shut down cleanly should be recovered
+
+        Returns: bool
+
+        """
+        buttons = Qt.QtWidgets.QMessageBox.Yes | Qt.QtWidgets.QMessageBox.No
+        answer = Qt.QtWidgets.QMessageBox.question(self.window, "Recover Graph",
+                                                   "The last session wasn't closed properly.\n"
+                                                   "Do you want to recover its graph?", buttons)
+        return answer == Qt.QtWidgets.QMessageBox.Yes
+
+    def recover_graph(self):
+        """ replaces the graph with the state recovered from the journal
+
+        Returns:
+
+        """
+        if not self._journal:
+            return
+        model, backdrops = self._journal.recover()
+        self._journal_suspended = True
+        try:
+            self.clear()
+            self.display_model(model)
+            for backdrop_data in backdrops:
+                self.create_backdrop_from_data(backdrop_data)
+        finally:
+            self._journal_suspended = False
+
+    def compact_journal(self, wait=False):
+        """ folds the journaled edits into a snapshot of the current graph
+
+        The snapshot will be written in a background thread
+        Args:
+            wait: if True the method returns after the snapshot was written
+
+        Returns:
+
+        """
+        if self._journal and self._journal.record_count:
+            self.graph.sync_model_positions()
+            self._journal.compact(self.model, self.get_backdrop_data(), wait=wait)
 
     @SuppressEvents(["after_node_created", "socket_created", "plug_created", "connection_made", "plug_connected", "socket_connected"])
     def display_host_nodes(self, nodes_dict, attributes_dict={}, connections_dict={}):
@@ -1264,12 +3007,90 @@ class Nodegraph(Basegraph):
         Returns:
 
         """
-        # @todo estimate creation position
-        for node_name, node_type in nodes_dict.iteritems():
-            self.graph.create_node(name=node_name, node_type=node_type)
+        model = GraphModel.from_display_data(nodes_dict, attributes_dict, connections_dict, displayed=self.model)
+        with self.batch():
+            new_nodes = self._display_model(model)
+        self._journal_displayed_model(model)
+        self._layout_displayed_nodes(new_nodes)
+
+    @SuppressEvents(["after_node_created", "socket_created", "plug_created", "connection_made", "plug_connected", "socket_connected"])
+    def display_model(self, model):
+        """ will add nodes their attributes and connections of the given model to nodegraph
+
+        This will not emit any creation signals and is meant to be a display and not a creation utility function
+        Args:
+            model: GraphModel instance
+
+        Returns:
+
+        """
+        with self.batch():
+            new_nodes = self._display_model(model)
+        self._journal_displayed_model(model)
+        self._layout_displayed_nodes(new_nodes)
+
+    def _display_model(self, model):
+        """ syncs the scene from the given model
+
+        Only nodes, attributes and connections that are not displayed yet will be created
+        Args:
+            model: GraphModel instance
+
+        Returns: list of names of all created nodes that still have to be placed by the incremental layout
+
+        """
+        new_nodes = []
+        grid = None
+        anchor = None
+        incremental = self.configuration.layout_incremental
+        for node_data in model:
+            node = self.get_node_by_name(node_data.name)
+            if not node:
+                if node_data.position:
+                    position = Qt.QtCore.QPointF(*node_data.position)
+                else:
+                    if anchor is None:
+                        anchor = self.graph.retrieve_creation_position()
+                    if incremental:
+                        # the incremental layout places them afterwards
+                        position = anchor
+                        new_nodes.append(node_data.name)
+                    else:
+                        # nodes without position are spread around the creation position
+                        if grid is None:
+                            grid = self.graph.occupancy_grid()
+                        position = self.graph.find_free_position(anchor, len(node_data.attributes), grid)
+                node = self.graph.create_node(name=node_data.name, position=position, node_type=node_data.node_type)
+            node.add_attributes([{"name": attribute.name,
+                                  "plug": attribute.plug,
+                                  "socket": attribute.socket,
+                                  "data_type": attribute.data_type} for attribute in node_data.attributes.values()])
+
+        for plug_node, plug_attr, socket_node, socket_attr in model.edges:
+            if not self.model.is_connected(plug_node, plug_attr, socket_node, socket_attr):
+                self.__handle_connection("{0}.{1}".format(plug_node, plug_attr),
+                                         "{0}.{1}".format(socket_node, socket_attr),
+                                         True)
+        return new_nodes
+
+    def _journal_displayed_model(self, model):
+        # the display path doesn't emit attribute and connection signals, so the displayed state is journaled at once
+        if self.active_journal:
+            self.active_journal.write_model(self.model.subgraph(model.nodes))
+
+    def _layout_displayed_nodes(self, node_names):
+        """ places newly displayed nodes next to the nodes they are connected to
+
+        Has to be called after the batch ended, the placement queries the scene index
 
-        self._create_attributes(attributes_dict)
-        self._create_connections(connections_dict)
+        Args:
+            node_names: names of the displayed nodes
+
+        Returns:
+
+        """
+        if node_names:
+            self.graph.layout_new_nodes(node_names)
 
     @SuppressEvents("node_deleted")
     def undisplay_node(self, node_name):
@@ -1287,6 +3108,21 @@ class Nodegraph(Basegraph):
     def _filter_attributes_dict(self):
         pass
 
+    def _on_scene_selection_changed(self):
+        self.update_selection(self.graph.scene().selectedItems())
+
+    def update_selection(self, selected_items):
+        """ stores the selected nodes and backdrops
+
+        Args:
+            selected_items: list of selected QGraphicsItems
+
+        Returns:
+
+        """
+        self._selected_nodes = [_ for _ in selected_items if isinstance(_, NodeItem)]
+        self._selected_backdrops = [_ for _ in selected_items if isinstance(_, BackdropItem)]
+
     def _delete_node(self, name):
         """ delete a node by given name and emit signal
 
@@ -1356,26 +3192,29 @@ class Nodegraph(Basegraph):
 
         """
 
-        def _create_node_attr(name, plug_or_socket, data_type):
-            self.__assert_attribute(name)
-            node = self.get_node_by_name(name.split(".")[0])
-            if node:
-                attribute_name = name.split(".")[1]
-                if plug_or_socket == "plug":
-                    node.add_attribute(attribute_name, plug=True, socket=False, data_type=data_type)
-                elif plug_or_socket == "socket":
-                    node.add_attribute(attribute_name, plug=False, socket=True, data_type=data_type)
-                elif plug_or_socket == "slot":
-                    node.add_attribute(attribute_name, plug=True, socket=True, data_type=data_type)
-            else:
-                LOG.info("Node '{0}' doesn't exist in graph yet.".format(name.split(".")[0]))
-
+        # collect the attributes per node to create them in one pass
+        node_specs = {}
         for key, value in attributes_dict.iteritems():
             msg = "Unexpected formatting. Expected dictionary holding a 'type' and 'data_type' key"
             assert (isinstance(value, dict) and "type" in value), msg
             assert (isinstance(value, dict) and "data_type" in value), msg
 
-            _create_node_attr(key, value["type"], value["data_type"])
+            self.__assert_attribute(key)
+            node_name, attribute_name = key.split(".", 1)
+            plug_or_socket = value["type"]
+            if plug_or_socket not in ("plug", "socket", "slot"):
+                continue
+            node_specs.setdefault(node_name, []).append({"name": attribute_name,
+                                                         "plug": plug_or_socket in ("plug", "slot"),
+                                                         "socket": plug_or_socket in ("socket", "slot"),
+                                                         "data_type": value["data_type"]})
+
+        for node_name, specs in node_specs.iteritems():
+            node = self.get_node_by_name(node_name)
+            if node:
+                node.add_attributes(specs)
+            else:
+                LOG.info("Node '{0}' doesn't exist in graph yet.".format(node_name))
 
     def _create_connections(self, connections_dict):
         """ creates connections for available attributes in nodegraph
@@ -1407,9 +3246,8 @@ class Nodegraph(Basegraph):
         Returns: ConnectionItem instance
 
         """
-        plug = self.get_plug_by_name("{0}.{1}".format(source_node_name, plug_name))
-        socket = self.get_socket_by_name("{0}.{1}".format(destination_node_name, socket_name))
-        return self.graph.get_shared_connection(plug, socket)
+        return self.graph.get_shared_connection_by_names(source_node_name, plug_name,
+                                                         destination_node_name, socket_name)
 
     def register_events(self):
         """ sets up all events that will be needed to run CocoNodz without integration
@@ -1438,6 +3276,7 @@ class Nodegraph(Basegraph):
                                     "after_node_created",
                                     "selection_changed",
                                     "nodes_deleted",
+                                    "nodes_moved",
                                     "node_name_changed",
                                     "about_attribute_create",
                                     "socket_created",
@@ -1470,14 +3309,55 @@ class Nodegraph(Basegraph):
                                       remover_args=args
                                       )
 
+    def _on_layout_progress(self, progress):
+        if progress < 1.0:
+            self.window.statusBar().showMessage("Computing layout... {0:.0f}%".format(progress * 100))
+        else:
+            self.window.statusBar().clearMessage()
+
+    def _on_file_progress(self, progress):
+        if progress < 1.0:
+            self.window.statusBar().showMessage("Processing file... {0:.0f}%".format(progress * 100))
+        else:
+            self.window.statusBar().clearMessage()
+
+    def _on_file_failed(self, error):
+        self.window.statusBar().showMessage("File operation failed: {0}".format(error))
+
     def layout_selected_nodes(self):
         """ rearranges node positions of selected nodes
 
+        Selections above the configured layout_async_threshold will be laid out in a background thread
+
         Returns:
 
         """
         if self.selected_nodes:
-            self.graph.layout_nodes(self.selected_node_names)
+            node_names = self.selected_node_names
+            if len(node_names) > self.configuration.layout_async_threshold:
+                self.graph.layout_nodes_async(node_names)
+            else:
+                self.graph.layout_nodes(node_names)
+
+    def remove_overlaps(self, node_names=None):
+        """ nudges overlapping nodes apart while keeping their arrangement
+
+        Nodes will only be moved down as far as required and all moves are applied in a single batched update
+
+        Args:
+            node_names: expects a list of node names otherwise it will consider the selected nodes
+            or all nodes if nothing is selected
+
+        Returns: list of moved node names
+
+        """
+        if not node_names:
+            node_names = self.selected_node_names or list(self.graph.scene().nodes.keys())
+        positions = remove_overlaps(self.graph.layout_snapshot(node_names),
+                                    margin=self.configuration.node_placement_margin)
+        if positions:
+            self.graph.apply_layout(positions)
+        return list(positions.keys())
 
     def create_backdrop(self, use_selection=True):
         """ creates a backdrop
@@ -1504,7 +3384,9 @@ class Nodegraph(Basegraph):
                                 border_color=border_color,
                                 font=font,
                                 title_font_size=title_font_size,
-                                descriptipn_font_size=description_font_size
+                                descriptipn_font_size=description_font_size,
+                                styles=self.graph.styles,
+                                signals=self.graph.item_signals
                                 )
         else:
             selection_bounds = self.graph._getSelectionBoundingbox()
@@ -1518,10 +3400,11 @@ class Nodegraph(Basegraph):
                                 border_color=border_color,
                                 font=font,
                                 title_font_size=title_font_size,
-                                descriptipn_font_size=description_font_size
+                                descriptipn_font_size=description_font_size,
+                                styles=self.graph.styles,
+                                signals=self.graph.item_signals
                                 )
 
-        backdrop.signal_context_request.connect(self.on_context_request)
         self.graph.scene().addItem(backdrop)
         return backdrop
 
@@ -1671,6 +3554,8 @@ class Nodegraph(Basegraph):
 
         """
         self.nodes_dict[node.name] = node
+        if self.active_journal:
+            self.active_journal.node_created(node.name, node.node_type, (node.x(), node.y()))
         self.graph.signal_after_node_created.emit(node)
 
     def on_after_node_created(self, node):
@@ -1682,13 +3567,20 @@ class Nodegraph(Basegraph):
                                data_type=self.configuration.default_attribute_data_type)
 
     def on_node_name_changed(self, node, old_name, new_name):
-        pass
+        if self.active_journal:
+            self.active_journal.node_renamed(old_name, new_name)
 
     def on_selection_changed(self, selection):
         pass
 
     def on_nodes_deleted(self, nodeitems_list):
-        pass
+        if self.active_journal:
+            for node in nodeitems_list:
+                self.active_journal.node_deleted(node.name)
+
+    def on_nodes_moved(self, nodeitems_list):
+        if self.active_journal:
+            self.active_journal.nodes_moved(dict((_.name, (_.x(), _.y())) for _ in nodeitems_list))
 
     def on_about_attribute_create(self, node_name, attribute_name):
         node = self.get_node_by_name(node_name)
@@ -1696,18 +3588,28 @@ class Nodegraph(Basegraph):
             node.add_attribute(name=attribute_name)
 
     def on_plug_created(self, plug_item):
-        pass
+        if self.active_journal:
+            self.active_journal.attribute_added(plug_item.parentItem().name, plug_item.attribute,
+                                                plug=True, socket=False, data_type=plug_item.dataType)
 
     def on_socket_created(self, socket_item):
-        pass
+        if self.active_journal:
+            self.active_journal.attribute_added(socket_item.parentItem().name, socket_item.attribute,
+                                                plug=False, socket=True, data_type=socket_item.dataType)
 
     def on_connection_made(self, connection_item):
+        if self.active_journal:
+            self.active_journal.connected(connection_item.plugNode, connection_item.plugAttr,
+                                          connection_item.socketNode, connection_item.socketAttr)
         self.graph.apply_data_type_color_to_connection(connection_item)
 
         self.get_node_by_name(connection_item.plugNode).append_connection(connection_item)
         self.get_node_by_name(connection_item.socketNode).append_connection(connection_item)
 
     def on_disconnection_made(self, connection_item):
+        if self.active_journal:
+            self.active_journal.disconnected(connection_item.plugNode, connection_item.plugAttr,
+                                             connection_item.socketNode, connection_item.socketAttr)
         self.get_node_by_name(connection_item.plugNode).remove_connection(connection_item)
         self.get_node_by_name(connection_item.socketNode).remove_connection(connection_item)
 
@@ -1777,6 +3679,13 @@ class Nodegraph(Basegraph):
 
         _msg = "{0} '{1}' doesn't exist yet. Skipped connecting."
 
+        if not state:
+            connection = self.graph.get_shared_connection_by_names(*(plug_name.split(".", 1) +
+                                                                     socket_name.split(".", 1)))
+            if connection:
+                connection._remove()
+                return
+
         plug = self.get_plug_by_name(plug_name)
         socket = self.get_socket_by_name(socket_name)
         if plug and socket:
@@ -0,0 +1,657 @@
+import logging
+import mmap
+import os
+import struct
+import zlib
+
+from coconodz.model import (AttributeData,
+                            GraphModel
+                            )
+
+
+LOG = logging.getLogger(name="CocoNodz.serialization")
+
+MAGIC = b"CNZG"
+INDEX_MAGIC = b"CNZI"
+VERSION = 2
+FLAG_ZLIB = 1
+FLAG_INDEXED = 2
+
+_HEADER = struct.Struct("<4sHH")
+_FOOTER = struct.Struct("<Q4s")
+_POSITION = struct.Struct("<dd")
+_BOUNDS = struct.Struct("<dddd")
+_COLOR = struct.Struct("<BBBB")
+
+# record tags
+_STRING = 0x53
+_NODE = 0x4E
+_ATTRIBUTE = 0x41
+_EDGE = 0x45
+_BACKDROP = 0x42
+_END = 0x5A
+
+_CHUNK_SIZE = 1 << 16
+# number of records between progress reports and cancellation checks
+_PROGRESS_STEP = 4096
+
+
+class SerializationCancelled(Exception):
+    """ raised when reading or writing a graph file was cancelled
+
+    """
+
+
+class BackdropData(object):
+    """ lightweight description of a backdrop
+
+    """
+    __slots__ = ("name", "bounds", "color", "border_color", "description",
+                 "font", "title_font_size", "description_font_size")
+
+    def __init__(self, name, bounds, color=(255, 0, 0, 50), border_color=(255, 255, 255, 50), description="",
+                 font="Arial", title_font_size=12, description_font_size=12):
+        self.name = name
+        # x, y of the top left corner, width and height in scene coordinates
+        self.bounds = tuple(bounds)
+        self.color = tuple(color)
+        self.border_color = tuple(border_color)
+        self.description = description
+        self.font = font
+        self.title_font_size = title_font_size
+        self.description_font_size = description_font_size
+
+
+class GraphWriter(object):
+    """ writes graph records to a binary stream
+
+    The format starts with a header holding magic, version and flags followed by records.
+    Every record starts with a tag byte. Strings are interned, the first occurrence writes a string
+    record and all records refer to strings by their index. Integers are stored as varints.
+    Records are collected in chunks, so the document is never held in memory as a whole.
+    Without header the writer creates a self contained record stream as used by the chunks of a GraphContainer.
+    """
+
+    def __init__(self, stream, compress=True, level=6, header=True):
+        self._stream = stream
+        self._compressor = zlib.compressobj(level) if compress else None
+        self._buffer = bytearray()
+        self._strings = {}
+        self._closed = False
+        if header:
+            self._stream.write(_HEADER.pack(MAGIC, VERSION, FLAG_ZLIB if compress else 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.close()
+
+    def _write_string(self, value):
+        index = self._strings.get(value)
+        if index is None:
+            index = len(self._strings)
+            self._strings[value] = index
+            encoded = value.encode("utf-8")
+            self._buffer.append(_STRING)
+            _write_varint(self._buffer, len(encoded))
+            self._buffer.extend(encoded)
+        return index
+
+    def _flush(self, force=False):
+        if not self._buffer or (not force and len(self._buffer) < _CHUNK_SIZE):
+            return
+        data = bytes(self._buffer)
+        if self._compressor:
+            data = self._compressor.compress(data)
+        self._stream.write(data)
+        self._buffer = bytearray()
+
+    def write_node(self, name, node_type, position=None):
+        """ writes a node record
+
+        Args:
+            name: node name
+            node_type: node type
+            position: x, y tuple
+
+        Returns:
+
+        """
+        name_index = self._write_string(name)
+        type_index = self._write_string(node_type)
+        self._buffer.append(_NODE)
+        _write_varint(self._buffer, name_index)
+        _write_varint(self._buffer, type_index)
+        if position is None:
+            self._buffer.append(0)
+        else:
+            self._buffer.append(1)
+            self._buffer.extend(_POSITION.pack(*position))
+        self._flush()
+
+    def write_attribute(self, node_name, attribute):
+        """ writes an attribute record
+
+        Args:
+            node_name: node name
+            attribute: AttributeData instance
+
+        Returns:
+
+        """
+        indices = (self._write_string(node_name),
+                   self._write_string(attribute.name),
+                   self._write_string(attribute.data_type or ""))
+        self._buffer.append(_ATTRIBUTE)
+        for index in indices:
+            _write_varint(self._buffer, index)
+        self._buffer.append((1 if attribute.plug else 0) | (2 if attribute.socket else 0))
+        self._flush()
+
+    def write_edge(self, edge):
+        """ writes an edge record
+
+        Args:
+            edge: (plug node, plug attribute, socket node, socket attribute) tuple
+
+        Returns:
+
+        """
+        indices = [self._write_string(_) for _ in edge]
+        self._buffer.append(_EDGE)
+        for index in indices:
+            _write_varint(self._buffer, index)
+        self._flush()
+
+    def write_backdrop(self, backdrop):
+        """ writes a backdrop record
+
+        Args:
+            backdrop: BackdropData instance
+
+        Returns:
+
+        """
+        indices = (self._write_string(backdrop.name),
+                   self._write_string(backdrop.description),
+                   self._write_string(backdrop.font))
+        self._buffer.append(_BACKDROP)
+        for index in indices:
+            _write_varint(self._buffer, index)
+        self._buffer.extend(_BOUNDS.pack(*backdrop.bounds))
+        self._buffer.extend(_COLOR.pack(*backdrop.color))
+        self._buffer.extend(_COLOR.pack(*backdrop.border_color))
+        _write_varint(self._buffer, backdrop.title_font_size)
+        _write_varint(self._buffer, backdrop.description_font_size)
+        self._flush()
+
+    def close(self):
+        """ writes the end record and flushes all pending data
+
+        Returns:
+
+        """
+        if self._closed:
+            return
+        self._buffer.append(_END)
+        self._flush(force=True)
+        if self._compressor:
+            self._stream.write(self._compressor.flush())
+        self._closed = True
+
+
+class GraphReader(object):
+    """ reads graph records from a binary stream written by GraphWriter
+
+    Iterating the reader yields ("node", name, node_type, position), ("attribute", node_name, AttributeData),
+    ("edge", edge) and ("backdrop", BackdropData) tuples while the stream is read chunk by chunk.
+    If flags are given the stream is expected to start with the records instead of the header.
+    """
+
+    def __init__(self, stream, flags=None):
+        self._stream = stream
+        if flags is None:
+            flags = read_header(stream)
+        self.flags = flags
+        # number of bytes consumed from the stream
+        self.bytes_read = 0
+        self._decompressor = zlib.decompressobj() if flags & FLAG_ZLIB else None
+        self._buffer = bytearray()
+        self._position = 0
+        self._strings = []
+
+    def _fill(self, size):
+        """ makes sure the buffer holds at least size unread bytes
+
+        """
+        while len(self._buffer) - self._position < size:
+            chunk = self._stream.read(_CHUNK_SIZE)
+            self.bytes_read += len(chunk)
+            data = chunk
+            if self._decompressor:
+                data = self._decompressor.decompress(chunk) if chunk else self._decompressor.flush()
+            if not chunk and not data:
+                raise ValueError("Unexpected end of graph file.")
+            if self._position:
+                del self._buffer[:self._position]
+                self._position = 0
+            self._buffer.extend(data)
+
+    def _read(self, size):
+        self._fill(size)
+        data = self._buffer[self._position:self._position + size]
+        self._position += size
+        return bytes(data)
+
+    def _read_byte(self):
+        self._fill(1)
+        value = self._buffer[self._position]
+        self._position += 1
+        return value
+
+    def _read_varint(self):
+        result = 0
+        shift = 0
+        while True:
+            byte = self._read_byte()
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def _read_string(self):
+        return self._strings[self._read_varint()]
+
+    def __iter__(self):
+        while True:
+            tag = self._read_byte()
+            if tag == _STRING:
+                self._strings.append(self._read(self._read_varint()).decode("utf-8"))
+            elif tag == _NODE:
+                name = self._read_string()
+                node_type = self._read_string()
+                position = _POSITION.unpack(self._read(_POSITION.size)) if self._read_byte() else None
+                yield ("node", name, node_type, position)
+            elif tag == _ATTRIBUTE:
+                node_name = self._read_string()
+                name = self._read_string()
+                data_type = self._read_string()
+                flags = self._read_byte()
+                yield ("attribute", node_name, AttributeData(name, data_type, bool(flags & 1), bool(flags & 2)))
+            elif tag == _EDGE:
+                yield ("edge", tuple(self._read_string() for _ in range(4)))
+            elif tag == _BACKDROP:
+                name = self._read_string()
+                description = self._read_string()
+                font = self._read_string()
+                bounds = _BOUNDS.unpack(self._read(_BOUNDS.size))
+                color = _COLOR.unpack(self._read(_COLOR.size))
+                border_color = _COLOR.unpack(self._read(_COLOR.size))
+                title_font_size = self._read_varint()
+                description_font_size = self._read_varint()
+                yield ("backdrop", BackdropData(name, bounds, color, border_color, description,
+                                                font, title_font_size, description_font_size))
+            elif tag == _END:
+                return
+            else:
+                raise ValueError("Unknown record tag {0}.".format(tag))
+
+
+class GraphContainer(object):
+    """ random access to the networks of an indexed graph file
+
+    An indexed graph file holds the header, one self contained record chunk per network and an index
+    that maps network names to the byte range of their chunk. The file is memory mapped, so reading a network
+    only touches the bytes of its own chunk.
+    """
+
+    def __init__(self, filepath):
+        self._file = open(filepath, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError("Not a CocoNodz graph file.")
+        self._index = {}
+        self._backdrops = None
+        try:
+            self._read_index()
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _read_index(self):
+        self._map.seek(0)
+        self.flags = read_header(self._map)
+        if not self.flags & FLAG_INDEXED:
+            raise ValueError("Graph file has no network index.")
+        index_offset, magic = _FOOTER.unpack(self._map[len(self._map) - _FOOTER.size:])
+        if magic != INDEX_MAGIC:
+            raise ValueError("Graph file index is corrupt.")
+
+        self._map.seek(index_offset)
+        for _ in range(_read_varint(self._map)):
+            is_backdrops = _read_varint(self._map)
+            name = self._map.read(_read_varint(self._map)).decode("utf-8")
+            chunk = (_read_varint(self._map), _read_varint(self._map))
+            if is_backdrops:
+                self._backdrops = chunk
+            else:
+                self._index[name] = chunk
+
+    @property
+    def network_names(self):
+        return sorted(self._index.keys())
+
+    def _read_chunk(self, chunk, model, backdrops, cancelled=None):
+        offset, size = chunk
+        # slicing the map copies only the bytes of the requested chunk
+        stream = _ChunkStream(self._map[offset:offset + size])
+        _read_records(GraphReader(stream, flags=self.flags), model, backdrops, cancelled=cancelled)
+
+    def read(self, networks=None, progress=None, cancelled=None):
+        """ reads the given networks
+
+        Args:
+            networks: list of network names otherwise all networks and backdrops will be read
+            progress: callable that gets the progress between 0.0 and 1.0 passed
+            cancelled: callable that returns True if reading should stop, raises SerializationCancelled
+
+        Returns: GraphModel instance and list of BackdropData instances
+
+        """
+        model = GraphModel()
+        backdrops = []
+        if networks is None:
+            networks = self.network_names
+            if self._backdrops:
+                self._read_chunk(self._backdrops, model, backdrops, cancelled)
+        for network in networks:
+            if network not in self._index:
+                raise KeyError("Network '{0}' doesn't exist in graph file.".format(network))
+        for index, network in enumerate(networks):
+            self._read_chunk(self._index[network], model, backdrops, cancelled)
+            if progress:
+                progress(float(index + 1) / len(networks))
+        return model, backdrops
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class _ChunkStream(object):
+    """ minimal stream that hands out an already loaded chunk at once
+
+    """
+
+    def __init__(self, data):
+        self._data = data
+
+    def read(self, size=-1):
+        data = self._data
+        self._data = b""
+        return data
+
+
+def _write_varint(buffer, value):
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(stream):
+    result = 0
+    shift = 0
+    while True:
+        byte = ord(stream.read(1))
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result
+        shift += 7
+
+
+def read_header(stream):
+    """ reads and validates the header of a graph file
+
+    Args:
+        stream: file like object opened in binary mode
+
+    Returns: header flags
+
+    """
+    header = stream.read(_HEADER.size)
+    if len(header) != _HEADER.size:
+        raise ValueError("Not a CocoNodz graph file.")
+    magic, version, flags = _HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError("Not a CocoNodz graph file.")
+    if version > VERSION:
+        raise ValueError("Unsupported graph file version {0}.".format(version))
+    return flags
+
+
+def _check_cancelled(cancelled):
+    if cancelled and cancelled():
+        raise SerializationCancelled()
+
+
+def _write_records(writer, model, backdrops=(), progress=None, cancelled=None):
+    total = float(len(model) + len(model.edges) + len(backdrops)) or 1.0
+    count = 0
+    for node in model:
+        writer.write_node(node.name, node.node_type, node.position)
+        for attribute in node.attributes.values():
+            writer.write_attribute(node.name, attribute)
+        count += 1
+        if not count % _PROGRESS_STEP:
+            _check_cancelled(cancelled)
+            if progress:
+                progress(count / total)
+    for edge in model.edges:
+        writer.write_edge(edge)
+        count += 1
+        if not count % _PROGRESS_STEP:
+            _check_cancelled(cancelled)
+            if progress:
+                progress(count / total)
+    for backdrop in backdrops:
+        writer.write_backdrop(backdrop)
+
+
+def write_graph(stream, model, backdrops=(), compress=True, progress=None, cancelled=None):
+    """ writes a model and backdrops to a binary stream
+
+    Args:
+        stream: file like object opened in binary mode
+        model: GraphModel instance
+        backdrops: list of BackdropData instances
+        compress: if True the records will be zlib compressed
+        progress: callable that gets the progress between 0.0 and 1.0 passed
+        cancelled: callable that returns True if writing should stop, raises SerializationCancelled
+
+    Returns:
+
+    """
+    with GraphWriter(stream, compress=compress) as writer:
+        _write_records(writer, model, backdrops, progress, cancelled)
+    if progress:
+        progress(1.0)
+
+
+def write_indexed_graph(stream, model, backdrops=(), networks=None, compress=True, progress=None, cancelled=None):
+    """ writes a model and backdrops as indexed graph file
+
+    Every network gets written as a self contained chunk, so it can be read without decoding the others.
+    Args:
+        stream: file like object opened in binary mode, it has to support tell
+        model: GraphModel instance
+        backdrops: list of BackdropData instances
+        networks: dict holding the network name as key and a list of node names as value,
+        by default the networks of GraphModel.get_networks will be used
+        compress: if True the records will be zlib compressed
+        progress: callable that gets the progress between 0.0 and 1.0 passed
+        cancelled: callable that returns True if writing should stop, raises SerializationCancelled
+
+    Returns:
+
+    """
+    if networks is None:
+        networks = model.get_networks()
+
+    flags = FLAG_INDEXED | (FLAG_ZLIB if compress else 0)
+    stream.write(_HEADER.pack(MAGIC, VERSION, flags))
+    index = []
+    for count, name in enumerate(sorted(networks)):
+        offset = stream.tell()
+        with GraphWriter(stream, compress=compress, header=False) as writer:
+            _write_records(writer, model.subgraph(networks[name]), cancelled=cancelled)
+        index.append((0, name, offset, stream.tell() - offset))
+        _check_cancelled(cancelled)
+        if progress:
+            progress(float(count + 1) / (len(networks) + 1))
+    if backdrops:
+        offset = stream.tell()
+        with GraphWriter(stream, compress=compress, header=False) as writer:
+            _write_records(writer, GraphModel(), backdrops)
+        index.append((1, "", offset, stream.tell() - offset))
+
+    index_offset = stream.tell()
+    data = bytearray()
+    _write_varint(data, len(index))
+    for is_backdrops, name, offset, size in index:
+        encoded = name.encode("utf-8")
+        _write_varint(data, is_backdrops)
+        _write_varint(data, len(encoded))
+        data.extend(encoded)
+        _write_varint(data, offset)
+        _write_varint(data, size)
+    stream.write(bytes(data))
+    stream.write(_FOOTER.pack(index_offset, INDEX_MAGIC))
+    if progress:
+        progress(1.0)
+
+
+def _read_records(reader, model, backdrops, progress=None, cancelled=None, size=None):
+    count = 0
+    for record in reader:
+        count += 1
+        if not count % _PROGRESS_STEP:
+            _check_cancelled(cancelled)
+            if progress and size:
+                progress(min(float(reader.bytes_read) / size, 1.0))
+        kind = record[0]
+        if kind == "node":
+            model.add_node(record[1], record[2], record[3])
+        elif kind == "attribute":
+            attribute = record[2]
+            model.add_attribute(record[1], attribute.name, attribute.plug, attribute.socket, attribute.data_type)
+        elif kind == "edge":
+            edge = record[1]
+            if edge[0] in model and edge[2] in model:
+                model.connect(*edge)
+        elif kind == "backdrop":
+            backdrops.append(record[1])
+
+
+def read_graph(stream, flags=None, progress=None, cancelled=None, size=None):
+    """ reads a model and backdrops from a binary stream
+
+    Args:
+        stream: file like object opened in binary mode
+        flags: header flags if the header was read already
+        progress: callable that gets the progress between 0.0 and 1.0 passed
+        cancelled: callable that returns True if reading should stop, raises SerializationCancelled
+        size: number of bytes the stream holds, progress will only be reported if given
+
+    Returns: GraphModel instance and list of BackdropData instances
+
+    """
+    model = GraphModel()
+    backdrops = []
+    _read_records(GraphReader(stream, flags=flags), model, backdrops, progress, cancelled, size)
+    if progress:
+        progress(1.0)
+    return model, backdrops
+
+
+def load_graph(filepath, networks=None, progress=None, cancelled=None):
+    """ reads a graph file
+
+    Indexed graph files only decode the chunks of the requested networks. Plain graph files
+    have to be read completely before the networks can be extracted.
+    Args:
+        filepath: path of the graph file
+        networks: list of network names otherwise the whole graph will be read
+        progress: callable that gets the progress between 0.0 and 1.0 passed
+        cancelled: callable that returns True if reading should stop, raises SerializationCancelled
+
+    Returns: GraphModel instance and list of BackdropData instances
+
+    """
+    with open(filepath, "rb") as stream:
+        flags = read_header(stream)
+        if not flags & FLAG_INDEXED:
+            model, backdrops = read_graph(stream, flags, progress, cancelled, os.path.getsize(filepath))
+            if networks is None:
+                return model, backdrops
+            available_networks = model.get_networks()
+            node_names = set()
+            for network in networks:
+                if network not in available_networks:
+                    raise KeyError("Network '{0}' doesn't exist in graph file.".format(network))
+                node_names.update(available_networks[network])
+            return model.subgraph(node_names), []
+
+    with GraphContainer(filepath) as container:
+        return container.read(networks, progress, cancelled)
+
+
+def save_graph(filepath, model, backdrops=(), compress=True, indexed=False, progress=None, cancelled=None):
+    """ writes a graph file
+
+    The file is written next to the target and replaces it once it is complete, so a failed or
+    cancelled save keeps the previous file intact.
+    Args:
+        filepath: path of the graph file
+        model: GraphModel instance
+        backdrops: list of BackdropData instances
+        compress: if True the records will be zlib compressed
+        indexed: if True every network gets its own chunk, so networks can be loaded separately
+        progress: callable that gets the progress between 0.0 and 1.0 passed
+        cancelled: callable that returns True if writing should stop, raises SerializationCancelled
+
+    Returns:
+
+    """
+    tmp_filepath = filepath + ".tmp"
+    try:
+        with open(tmp_filepath, "wb") as stream:
+            if indexed:
+                write_indexed_graph(stream, model, backdrops, compress=compress, progress=progress,
+                                    cancelled=cancelled)
+            else:
+                write_graph(stream, model, backdrops, compress=compress, progress=progress, cancelled=cancelled)
+        _replace_file(tmp_filepath, filepath)
+    except BaseException:
+        if os.path.exists(tmp_filepath):
+            os.remove(tmp_filepath)
+        raise
+
+
+def _replace_file(source, destination):
+    if hasattr(os, "replace"):
+        os.replace(source, destination)
+    else:
+        if os.path.exists(destination):
+            os.remove(destination)
+        os.rename(source, destination)
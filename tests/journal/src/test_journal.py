@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from coconodz.journal import GraphJournal, JournalLocked
+from coconodz.model import GraphModel
+from coconodz.serialization import BackdropData
+
+
+def _as_dict(model):
+    data = model.as_dict()
+    data["connections"].sort()
+    return data
+
+
+class GraphJournalCase(unittest.TestCase):
+    """ test journaling and recovering graph edits
+
+    """
+
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        self.journal = GraphJournal(self._tmp_dir)
+
+    def tearDown(self):
+        self.journal.close()
+        shutil.rmtree(self._tmp_dir)
+
+    def _edit(self, model):
+        """ applies some edits to the model and the journal alike
+
+        """
+        for name, node_type in (("file1", "file"), ("lambert1", "lambert"), ("lambert1SG", "shadingEngine")):
+            model.add_node(name, node_type, (len(model) * 100.0, 0.0))
+            self.journal.node_created(name, node_type, model.get_node(name).position)
+        for node_name, attribute_name, plug, socket in (("file1", "outColor", True, False),
+                                                        ("lambert1", "color", False, True),
+                                                        ("lambert1", "outColor", True, False),
+                                                        ("lambert1SG", "surfaceShader", False, True)):
+            model.add_attribute(node_name, attribute_name, plug, socket, "float3")
+            self.journal.attribute_added(node_name, attribute_name, plug, socket, "float3")
+        for edge in (("file1", "outColor", "lambert1", "color"),
+                     ("lambert1", "outColor", "lambert1SG", "surfaceShader")):
+            model.connect(*edge)
+            self.journal.connected(*edge)
+
+        model.rename_node("file1", "file2")
+        self.journal.node_renamed("file1", "file2")
+        model.set_position("file2", -50, 20)
+        self.journal.nodes_moved({"file2": (-50, 20)})
+        model.disconnect("file2", "outColor", "lambert1", "color")
+        self.journal.disconnected("file2", "outColor", "lambert1", "color")
+
+    def test_recover(self):
+        self.assertFalse(self.journal.has_recovery_data)
+        model = GraphModel()
+        self._edit(model)
+        self.assertTrue(self.journal.has_recovery_data)
+        self.assertEqual(12, self.journal.record_count)
+
+        recovered, _ = GraphJournal(self._tmp_dir, lock=False).recover()
+        self.assertDictEqual(_as_dict(model), _as_dict(recovered))
+
+        model.remove_node("lambert1SG")
+        self.journal.node_deleted("lambert1SG")
+        recovered, _ = GraphJournal(self._tmp_dir, lock=False).recover()
+        self.assertDictEqual(_as_dict(model), _as_dict(recovered))
+
+        model.clear()
+        self.journal.cleared()
+        recovered, _ = GraphJournal(self._tmp_dir, lock=False).recover()
+        self.assertEqual(0, len(recovered))
+
+    def test_compact(self):
+        model = GraphModel()
+        self._edit(model)
+        self.journal.compact(model, [BackdropData("Backdrop", (0, 0, 300, 300))])
+
+        # edits after the compaction are journaled in the next generation
+        model.add_node("blinn1", "blinn")
+        self.journal.node_created("blinn1", "blinn")
+        self.journal.wait()
+        self.assertEqual(1, self.journal.record_count)
+        self.assertListEqual(["journal.1.log", "journal.lock", "snapshot.1.cnz"], sorted(os.listdir(self._tmp_dir)))
+
+        recovered, backdrops = GraphJournal(self._tmp_dir, lock=False).recover()
+        self.assertDictEqual(_as_dict(model), _as_dict(recovered))
+        self.assertEqual(1, len(backdrops))
+
+    def test_incomplete_record(self):
+        model = GraphModel()
+        self._edit(model)
+        self.journal.node_created("blinn1", "blinn")
+        self.journal.close()
+
+        # simulate a crash while the last record was written
+        journal_file = os.path.join(self._tmp_dir, "journal.0.log")
+        with open(journal_file, "rb+") as stream:
+            stream.truncate(os.path.getsize(journal_file) - 2)
+
+        recovered, _ = GraphJournal(self._tmp_dir, lock=False).recover()
+        self.assertDictEqual(_as_dict(model), _as_dict(recovered))
+
+    def test_clean_close(self):
+        model = GraphModel()
+        self._edit(model)
+        self.assertRaises(JournalLocked, GraphJournal, self._tmp_dir)
+
+        self.journal.close(clean=True)
+        self.journal = GraphJournal(self._tmp_dir)
+        self.assertFalse(self.journal.has_recovery_data)
+        self.assertEqual(0, len(self.journal.recover()[0]))
+
+        # edits after a clean start remove the marker again
+        self.journal.node_created("blinn1", "blinn")
+        self.assertTrue(GraphJournal(self._tmp_dir, lock=False).has_recovery_data)
+
+    def test_discard(self):
+        model = GraphModel()
+        self._edit(model)
+        self.journal.compact(model, wait=True)
+        self.journal.node_created("blinn1", "blinn")
+        self.journal.discard()
+        self.assertFalse(GraphJournal(self._tmp_dir, lock=False).has_recovery_data)
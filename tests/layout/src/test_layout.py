@@ -0,0 +1,197 @@
+import os
+import random
+import shutil
+import tempfile
+import time
+import unittest
+
+from coconodz import layout
+from coconodz.layout import (LayoutCache,
+                             LayoutSnapshot,
+                             OccupancyGrid,
+                             assign_ranks,
+                             force_directed_layout,
+                             incremental_layout,
+                             layered_layout,
+                             remove_overlaps
+                             )
+
+
+def _random_snapshot(node_count, edges_per_node=2, seed=0):
+    rand = random.Random(seed)
+    names = ["node{0}".format(_) for _ in range(node_count)]
+    edges = [(names[rand.randrange(index)], names[index])
+             for index in range(1, node_count) for _ in range(edges_per_node)]
+    return LayoutSnapshot(names, edges=edges)
+
+
+# benchmarks on large graphs are opt-in, they take too long for the unit suite
+_BENCHMARK = bool(os.environ.get("COCONODZ_BENCHMARK"))
+
+
+class LayeredLayoutCase(unittest.TestCase):
+    """ test the layered layout on plain snapshots
+
+    """
+
+    def test_ranks(self):
+        snapshot = LayoutSnapshot("abcd", edges=[("a", "b"), ("b", "c"), ("d", "c")])
+        ranks = assign_ranks(snapshot.node_names, *snapshot.adjacency())
+        self.assertDictEqual({"a": 2, "b": 1, "c": 0, "d": 1}, ranks)
+
+    def test_cycles(self):
+        snapshot = LayoutSnapshot("abc", edges=[("a", "b"), ("b", "c"), ("c", "a")])
+        positions = layered_layout(snapshot)
+        self.assertEqual(3, len(positions))
+        self.assertEqual(3, len(set(_[0] for _ in positions.values())))
+
+    def test_no_overlaps(self):
+        snapshot = _random_snapshot(200)
+        positions = layered_layout(snapshot, margin=10)
+        width, height = snapshot.get_size(None)
+        columns = {}
+        for x, y in positions.values():
+            columns.setdefault(x, []).append(y)
+        for ys in columns.values():
+            ys.sort()
+            for top, bottom in zip(ys, ys[1:]):
+                self.assertGreaterEqual(round(bottom - top, 6), height + 10)
+
+    def test_origin(self):
+        snapshot = LayoutSnapshot("ab", positions={"a": (50, 70), "b": (400, 20)}, edges=[("a", "b")])
+        positions = layered_layout(snapshot)
+        self.assertEqual(50, min(_[0] for _ in positions.values()))
+        self.assertEqual(20, min(_[1] for _ in positions.values()))
+
+    def test_incremental(self):
+        snapshot = LayoutSnapshot("abcd",
+                                  sizes=dict((_, (100, 20)) for _ in "abcd"),
+                                  positions={"a": (500, 0), "b": (500, 40)},
+                                  edges=[("c", "a"), ("d", "b"), ("c", "d")])
+        positions = incremental_layout(snapshot, ["c", "d"], margin=10)
+        self.assertSetEqual({"c", "d"}, set(positions))
+        # placed left of their downstream nodes
+        self.assertLess(positions["c"][0] + 100, 500)
+        self.assertLess(positions["d"][0] + 100, 500)
+        # without overlapping each other
+        self.assertNotEqual(positions["c"][1], positions["d"][1])
+
+    def test_incremental_is_free(self):
+        snapshot = LayoutSnapshot("ab", positions={"a": (500, 0)}, edges=[("b", "a")])
+        positions = incremental_layout(snapshot, ["b"], margin=10, is_free=lambda x, y, w, h: y > 100)
+        self.assertGreater(positions["b"][1], 100)
+
+    @unittest.skipUnless(_BENCHMARK, "set COCONODZ_BENCHMARK to run benchmarks")
+    def test_benchmark(self):
+        snapshot = _random_snapshot(20000)
+        start = time.time()
+        positions = layered_layout(snapshot)
+        self.assertEqual(20000, len(positions))
+        self.assertLess(time.time() - start, 30)
+
+
+class OccupancyGridCase(unittest.TestCase):
+    """ test finding free space
+
+    """
+
+    def test_find_free(self):
+        grid = OccupancyGrid(110, 40, margin=10)
+        rects = [grid.find_free(0, 0, 100, 30 + (_ % 3) * 30) + (100, 30 + (_ % 3) * 30) for _ in range(500)]
+        self.assertEqual((0, 0), rects[0][:2])
+        self.assertEqual(500, len(grid))
+        for index, (x, y, width, height) in enumerate(rects):
+            for other_x, other_y, other_width, other_height in rects[index + 1:]:
+                self.assertFalse(x < other_x + other_width and other_x < x + width and
+                                 y < other_y + other_height and other_y < y + height)
+
+    def test_is_free_callback(self):
+        grid = OccupancyGrid(100, 100)
+        x, y = grid.find_free(0, 0, 50, 50, is_free=lambda x, y, w, h: (x, y) != (0, 0))
+        self.assertNotEqual((0, 0), (x, y))
+
+class RemoveOverlapsCase(unittest.TestCase):
+    """ test the sweep line overlap removal
+
+    """
+
+    def test_no_overlaps(self):
+        rand = random.Random(0)
+        names = ["node{0}".format(_) for _ in range(1000)]
+        sizes = dict((_, (rand.randint(50, 200), rand.randint(20, 100))) for _ in names)
+        positions = dict((_, (rand.uniform(0, 3000), rand.uniform(0, 3000))) for _ in names)
+        snapshot = LayoutSnapshot(names, sizes=sizes, positions=positions)
+
+        positions.update(remove_overlaps(snapshot, margin=5))
+        rects = sorted((positions[_][0], positions[_][1]) + sizes[_] for _ in names)
+        for index, (x, y, width, height) in enumerate(rects):
+            for other_x, other_y, other_width, other_height in rects[index + 1:]:
+                if other_x >= x + width + 5:
+                    break
+                self.assertFalse(y < other_y + other_height + 5 and other_y < y + height + 5)
+
+    def test_untouched(self):
+        snapshot = LayoutSnapshot("abc",
+                                  sizes=dict((_, (100, 20)) for _ in "abc"),
+                                  positions={"a": (0, 0), "b": (200, 0), "c": (50, 10)})
+        self.assertDictEqual({"c": (50, 20)}, remove_overlaps(snapshot))
+
+class LayoutCacheCase(unittest.TestCase):
+    """ test the least recently used layout cache
+
+    """
+
+    def test_eviction(self):
+        cache = LayoutCache(max_size=2)
+        cache.put("a", {"node": (0, 0)})
+        cache.put("b", {"node": (1, 0)})
+        self.assertEqual({"node": (0, 0)}, cache.get("a"))
+        cache.put("c", {"node": (2, 0)})
+        self.assertNotIn("b", cache)
+        self.assertIn("a", cache)
+        self.assertIn("c", cache)
+
+    def test_persistence(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            LayoutCache(max_size=1, cache_dir=cache_dir).put("a", {"node": (5, 10)})
+            cache = LayoutCache(max_size=1, cache_dir=cache_dir)
+            self.assertEqual({"node": (5, 10)}, cache.get("a"))
+            cache.put("b", {"node": (0, 0)})
+            self.assertEqual(1, len(os.listdir(cache_dir)))
+        finally:
+            shutil.rmtree(cache_dir)
+
+class ForceDirectedLayoutCase(unittest.TestCase):
+    """ test the force directed layout on plain snapshots
+
+    """
+
+    def test_seeded_positions(self):
+        snapshot = LayoutSnapshot("ab", positions={"a": (0, 0), "b": (3000, 0)}, edges=[("a", "b")])
+        positions = force_directed_layout(snapshot, margin=10, iterations=30, use_numpy=False)
+        # connected nodes are pulled together
+        self.assertLess(abs(positions["a"][0] - positions["b"][0]), 3000)
+        self.assertEqual(0, min(_[0] for _ in positions.values()))
+
+    def test_separates_overlapping_nodes(self):
+        snapshot = LayoutSnapshot("abc", positions=dict((_, (0, 0)) for _ in "abc"))
+        positions = force_directed_layout(snapshot, iterations=30, use_numpy=False)
+        self.assertEqual(3, len(set(positions.values())))
+
+    @unittest.skipIf(layout.numpy is None, "numpy is not available")
+    def test_numpy_matches_python(self):
+        snapshot = _random_snapshot(300, edges_per_node=1)
+        vectorized = force_directed_layout(snapshot, iterations=5, use_numpy=True)
+        plain = force_directed_layout(snapshot, iterations=5, use_numpy=False)
+        for name in snapshot.node_names:
+            self.assertAlmostEqual(vectorized[name][0], plain[name][0], places=3)
+            self.assertAlmostEqual(vectorized[name][1], plain[name][1], places=3)
+
+    @unittest.skipUnless(_BENCHMARK, "set COCONODZ_BENCHMARK to run benchmarks")
+    def test_benchmark(self):
+        snapshot = _random_snapshot(5000, edges_per_node=1)
+        start = time.time()
+        positions = force_directed_layout(snapshot, iterations=10)
+        self.assertEqual(5000, len(positions))
+        self.assertLess(time.time() - start, 60)
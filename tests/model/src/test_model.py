@@ -0,0 +1,88 @@
+import json
+import os
+import unittest
+
+import coconodz
+from coconodz.model import GraphModel
+
+
+def _read_ref(filename):
+    with open(os.path.join(os.path.dirname(coconodz.__file__), "tests", "nodegraph", "ref", filename)) as f:
+        return json.load(f)
+
+
+class GraphModelCase(unittest.TestCase):
+    """ test the Qt independent graph model
+
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls._test_attrs_data = _read_ref("attrs.json")
+        cls._test_cons_data = _read_ref("cons.json")
+        cls._test_nodes_data = dict((attr.split(".")[0], data["node_type"])
+                                    for attr, data in cls._test_attrs_data.items())
+
+    def setUp(self):
+        self.model = GraphModel.from_display_data(self._test_nodes_data,
+                                                  self._test_attrs_data,
+                                                  self._test_cons_data)
+
+    def test_from_display_data(self):
+        self.assertListEqual(sorted(self._test_nodes_data), sorted(self.model.node_names))
+        for plug_name, socket_name in self.model.evaluate():
+            self.assertIn(plug_name, self._test_cons_data)
+            self.assertEqual(socket_name, self._test_cons_data[plug_name])
+
+    def test_from_display_data_with_displayed_nodes(self):
+        displayed = self.model.subgraph(["lambert2"])
+        nodes_data = dict(self._test_nodes_data)
+        del nodes_data["lambert2"]
+        model = GraphModel.from_display_data(nodes_data, self._test_attrs_data, self._test_cons_data)
+        self.assertNotIn(("lambert2.outColor", "lambert2SG.surfaceShader"), model.evaluate())
+
+        # connections to displayed nodes are kept
+        model = GraphModel.from_display_data(nodes_data, self._test_attrs_data, self._test_cons_data,
+                                             displayed=displayed)
+        self.assertIn(("lambert2.outColor", "lambert2SG.surfaceShader"), model.evaluate())
+        self.assertSetEqual(set(self.model.edges), set(model.edges))
+
+    def test_serialization(self):
+        restored = GraphModel.from_dict(json.loads(json.dumps(self.model.as_dict())))
+        self.assertEqual(self.model.edges, restored.edges)
+        self.assertEqual(set(self.model.node_names), set(restored.node_names))
+
+    def test_rename_node(self):
+        downstream = self.model.get_downstream_nodes("lambert2")
+        self.model.rename_node("lambert2", "renamed")
+        self.assertNotIn("lambert2", self.model)
+        self.assertEqual(downstream, self.model.get_downstream_nodes("renamed"))
+        for edge in self.model.edges:
+            self.assertNotIn("lambert2", (edge[0], edge[2]))
+
+    def test_remove_node(self):
+        self.model.remove_node("lambert2")
+        for edge in self.model.edges:
+            self.assertNotIn("lambert2", (edge[0], edge[2]))
+
+    def test_diff(self):
+        other = self.model.subgraph(["lambert2", "lambert2SG"])
+        diff = self.model.diff(other)
+        self.assertIn("blinn1", diff["removed_nodes"])
+        self.assertSetEqual(set(), diff["added_edges"])
+        self.assertListEqual([("lambert2.outColor", "lambert2SG.surfaceShader")], other.evaluate())
+
+    def test_topology_fingerprint(self):
+        fingerprint = self.model.topology_fingerprint()
+        restored = GraphModel.from_dict(json.loads(json.dumps(self.model.as_dict())))
+        self.assertEqual(fingerprint, restored.topology_fingerprint())
+        self.model.disconnect(*sorted(self.model.edges)[0])
+        self.assertNotEqual(fingerprint, self.model.topology_fingerprint())
+
+    def test_get_networks(self):
+        networks = self.model.get_networks()
+        self.assertSetEqual(set(self.model.nodes), set.union(*networks.values()))
+        for network, node_names in networks.items():
+            self.assertFalse(self.model.get_downstream_nodes(network))
+            for node_name in node_names - set([network]):
+                self.assertTrue(self.model.get_downstream_nodes(node_name))
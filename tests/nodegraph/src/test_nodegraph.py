@@ -1,3 +1,4 @@
+import functools
 import os
 import shutil
 import tempfile
@@ -6,10 +7,14 @@ import unittest
 from unittest.case import safe_repr
 
 import coconodz
-from coconodz import Nodzgraph, application
-from coconodz.lib import (DictDotLookup,
-                          read_json
+from coconodz import Nodzgraph, application, Qt
+from coconodz.lib import (CONFIGURATION_CACHE,
+                          Configuration,
+                          read_json,
+                          write_json
                           )
+from coconodz.journal import GraphJournal
+from coconodz.model import GraphModel
 
 
 class TestCase(unittest.TestCase):
@@ -37,7 +42,7 @@ class ConfigurationCase(TestCase):
         self.assertHasAttribute(Nodzgraph, "configuration")
 
     def test_is_expected_instance(self):
-        self.assertIsInstance(Nodzgraph.configuration, DictDotLookup)
+        self.assertIsInstance(Nodzgraph.configuration, Configuration)
 
     def test_parent_presets(self):
         self.assertHasAttribute(Nodzgraph.configuration, "output_verbosity")
@@ -64,6 +69,9 @@ class ConfigurationCase(TestCase):
         self.assertHasAttribute(Nodzgraph.configuration, "node_border")
         self.assertHasAttribute(Nodzgraph.configuration, "node_attr_height")
         self.assertHasAttribute(Nodzgraph.configuration, "connection_width")
+        self.assertHasAttribute(Nodzgraph.configuration, "connection_hit_width")
+        self.assertHasAttribute(Nodzgraph.configuration, "node_lod_threshold")
+        self.assertHasAttribute(Nodzgraph.configuration, "connection_lod_threshold")
         self.assertHasAttribute(Nodzgraph.configuration, "grid_color")
         self.assertHasAttribute(Nodzgraph.configuration, "slot_border")
         self.assertHasAttribute(Nodzgraph.configuration, "non_connectable_color")
@@ -75,7 +83,18 @@ class ConfigurationCase(TestCase):
         self.assertHasAttribute(Nodzgraph.configuration, "attr_default")
         self.assertHasAttribute(Nodzgraph.configuration, "datatype_default")
         self.assertHasAttribute(Nodzgraph.configuration, "layout_margin_size")
+        self.assertHasAttribute(Nodzgraph.configuration, "layout_crossing_sweeps")
+        self.assertHasAttribute(Nodzgraph.configuration, "layout_async_threshold")
+        self.assertHasAttribute(Nodzgraph.configuration, "layout_incremental")
+        self.assertHasAttribute(Nodzgraph.configuration, "layout_algorithm")
+        self.assertHasAttribute(Nodzgraph.configuration, "layout_force_iterations")
+        self.assertHasAttribute(Nodzgraph.configuration, "layout_cache_size")
+        self.assertHasAttribute(Nodzgraph.configuration, "layout_cache_dir")
         self.assertHasAttribute(Nodzgraph.configuration, "node_placement")
+        self.assertHasAttribute(Nodzgraph.configuration, "node_placement_margin")
+        self.assertHasAttribute(Nodzgraph.configuration, "journal_dir")
+        self.assertHasAttribute(Nodzgraph.configuration, "journal_compaction_interval")
+        self.assertHasAttribute(Nodzgraph.configuration, "configuration_live_reload")
         self.assertHasAttribute(Nodzgraph.configuration, "backdrop_color")
         self.assertHasAttribute(Nodzgraph.configuration, "backdrop_border_color")
         self.assertHasAttribute(Nodzgraph.configuration, "backdrop_bounds")
@@ -101,6 +120,86 @@ class ConfigurationCase(TestCase):
         except OSError:
             raise
 
+    def test_configuration_cache(self):
+        config_file = os.path.join(tempfile.gettempdir(), str(time.time()) + "_coconodz.config")
+        write_json(config_file, {"scene_width": 100, "nested": {"value": 1}})
+        try:
+            configuration = CONFIGURATION_CACHE.get(config_file)
+            self.assertIs(configuration, CONFIGURATION_CACHE.get(config_file))
+            self.assertRaises(AttributeError, setattr, configuration, "scene_width", 200)
+
+            # instances get changeable copies
+            Nodzgraph.graph.load_configuration(config_file)
+            Nodzgraph.configuration.scene_width = 200
+            self.assertEqual(100, CONFIGURATION_CACHE.get(config_file).scene_width)
+            Nodzgraph.configuration.nested.value = 2
+            Nodzgraph.graph.configuration_data["nested"]["value"] = 3
+            self.assertEqual(1, CONFIGURATION_CACHE.get(config_file).nested.value)
+            self.assertEqual(1, CONFIGURATION_CACHE.get_data(config_file)["nested"]["value"])
+
+            # so does nodz when it loads a config file
+            Nodzgraph.graph.loadConfig(config_file)
+            Nodzgraph.graph.config["nested"]["value"] = 2
+            self.assertEqual(1, CONFIGURATION_CACHE.get_data(config_file)["nested"]["value"])
+
+            # a changed file gets parsed again
+            write_json(config_file, {"scene_width": 1000, "nested": {"value": 1}})
+            self.assertEqual(1000, CONFIGURATION_CACHE.get(config_file).scene_width)
+        finally:
+            os.remove(config_file)
+            Nodzgraph.load_configuration(Nodzgraph.graph.BASE_CONFIG_PATH)
+
+    def test_compiled_configuration(self):
+        data = {"scene_width": 100, "grid_color": [50, 50, 50, 255],
+                "node_width": 200, "node_lambert": {"bg": [200, 0, 130, 255]},
+                "datatype_default": {"plug": [255, 155, 0, 255]}, "datatype_float3": {"plug": [200, 0, 0, 255]}}
+        configuration = Configuration.compile(data)
+        self.assertIs(type(configuration), type(Configuration.compile(dict(data))))
+        self.assertDictEqual({"lambert": "node_lambert"}, configuration.node_presets)
+        self.assertDictEqual({"default": "datatype_default", "float3": "datatype_float3"},
+                             configuration.datatype_presets)
+        self.assertEqual([200, 0, 130, 255], configuration.node_lambert.bg)
+
+        # changes write through to the serialized data
+        configuration.scene_width = 200
+        configuration.node_lambert = {"bg": [0, 0, 0, 255]}
+        self.assertEqual(200, data["scene_width"])
+        self.assertDictEqual({"bg": [0, 0, 0, 255]}, data["node_lambert"])
+        self.assertEqual([0, 0, 0, 255], configuration.node_lambert.bg)
+        copied = configuration.copy()
+        copied.grid_color.append(0)
+        self.assertEqual([50, 50, 50, 255, 0], copied.get_original()["grid_color"])
+        self.assertEqual([50, 50, 50, 255], data["grid_color"])
+        copied.node_lambert.bg = [255, 255, 255, 255]
+        self.assertEqual([0, 0, 0, 255], configuration.node_lambert.bg)
+        self.assertDictEqual({"bg": [0, 0, 0, 255]}, data["node_lambert"])
+
+        # the keys are fixed and validated
+        self.assertRaises(AttributeError, setattr, configuration, "scene_depth", 100)
+        self.assertRaises(ValueError, setattr, configuration, "datatype_float3", 1)
+        self.assertRaises(ValueError, Configuration.compile, {"datatype_color": [1, 2, 3]})
+        self.assertRaises(ValueError, Configuration.compile, {"Window:Active": "#000000"})
+        self.assertRaises(ValueError, Configuration.compile, {"copy": 1})
+
+    def test_reserved_node_types(self):
+        for node_type in Nodzgraph.RESERVED_NODETYPES:
+            self.assertIn(node_type, Nodzgraph.creation_field.available_items)
+            self.assertNotIn(node_type, Nodzgraph.graph.configuration_data["available_node_types"])
+
+    def test_save_and_load_configuration_async(self):
+        config_file = os.path.join(tempfile.gettempdir(), str(time.time()) + "_coconodz.config")
+        old_width = Nodzgraph.configuration.scene_width
+        try:
+            Nodzgraph.save_configuration_async(config_file).wait()
+            self.assertTrue(os.path.exists(config_file))
+
+            Nodzgraph.configuration.scene_width = old_width + 100
+            Nodzgraph.load_configuration_async(config_file).wait()
+            application.processEvents()
+            self.assertEqual(old_width, Nodzgraph.configuration.scene_width)
+        finally:
+            os.remove(config_file)
+
     def test_node_placement_value(self):
         _supported = ["cursor", "creation_field"]
         msg = "Unsupported  node_placement value '{0}'. Supported are {1}".format(Nodzgraph.configuration.node_placement,
@@ -113,6 +212,12 @@ class ConfigurationCase(TestCase):
                                                                                   ", ".join(_supported))
         self.assertIn(Nodzgraph.configuration.attribute_order, _supported, msg=msg)
 
+    def test_layout_algorithm_value(self):
+        _supported = ["layered", "force_directed"]
+        msg = "Unsupported layout_algorithm value '{0}'. Supported are {1}".format(Nodzgraph.configuration.layout_algorithm,
+                                                                                  ", ".join(_supported))
+        self.assertIn(Nodzgraph.configuration.layout_algorithm, _supported, msg=msg)
+
     def test_connection_display_type(self):
         _supported = ["line", "bezier"]
         msg = "Unsupported connection_interpolation value '{0}'. Supported are {1}".format(Nodzgraph.configuration.connection_interpolation,
@@ -152,6 +257,48 @@ class NodegraphCase(TestCase):
         _node.setSelected(True)
         self.assertListEqual([_node], Nodzgraph.selected_nodes)
 
+    def test_selection_updates(self):
+        nodes = [_create_test_node(name="node{0}".format(i)) for i in range(3)]
+        nodes[0].setSelected(True)
+        nodes[2].setSelected(True)
+        self.assertListEqual(["node0", "node2"], sorted(Nodzgraph.selected_node_names))
+
+        nodes[0].setSelected(False)
+        self.assertListEqual(["node2"], Nodzgraph.selected_node_names)
+
+        Nodzgraph.graph.deleteNode(nodes[2])
+        self.assertListEqual([], Nodzgraph.selected_nodes)
+
+    def test_item_signals_dispatch(self):
+        calls = []
+        _on_context_request = Nodzgraph.graph.on_context_request
+        Nodzgraph.graph.on_context_request = calls.append
+        try:
+            nodes = []
+            for i in range(10):
+                nodes.append(_create_test_node(name="node{0}".format(i)))
+                nodes[0].signals.signal_context_request.emit(nodes[0])
+                # every emission has to call the slot exactly once, no matter how many nodes exist
+                self.assertEqual(i + 1, len(calls))
+            self.assertListEqual([nodes[0]] * 10, calls)
+
+            # deleted nodes don't emit anymore
+            Nodzgraph.graph.deleteNode(nodes[-1])
+            nodes[-1]._emit("signal_context_request", nodes[-1])
+            self.assertEqual(10, len(calls))
+
+            # cleared graphs route new nodes through a fresh signals instance
+            old_signals = Nodzgraph.graph.item_signals
+            Nodzgraph.clear()
+            node = _create_test_node()
+            self.assertIsNot(old_signals, node.signals)
+            nodes[0]._emit("signal_context_request", nodes[0])
+            self.assertEqual(10, len(calls))
+            node._emit("signal_context_request", node)
+            self.assertEqual(11, len(calls))
+        finally:
+            Nodzgraph.graph.on_context_request = _on_context_request
+
     def test_get_node_by_name(self):
         name = "test_name"
         self.assertEqual(_create_test_node(name=name), Nodzgraph.get_node_by_name(name))
@@ -208,6 +355,23 @@ class NodegraphCase(TestCase):
                     self.assertIn(attr_name, node.sockets)
                     self.assertEqual(node.sockets[attr_name].dataType, attr_data["data_type"])
 
+    def test_add_attributes(self):
+        names = ["zeta", "alpha", "gamma", "beta"]
+        for add_mode in ["top", "bottom", "alphabetical"]:
+            single = _create_test_node(name="single_" + add_mode)
+            bulk = _create_test_node(name="bulk_" + add_mode)
+            for name in names:
+                single.add_attribute(name, add_mode=add_mode, socket=False, data_type="float3")
+            bulk.add_attributes([{"name": name, "socket": False, "data_type": "float3"} for name in names],
+                                add_mode=add_mode)
+
+            self.assertListEqual(single.attrs, bulk.attrs)
+            self.assertEqual(single.height, bulk.height)
+            for name in names:
+                self.assertIn(name, bulk.plugs)
+                self.assertNotIn(name, bulk.sockets)
+                self.assertEqual("float3", bulk.plugs[name].dataType)
+
     def test_create_connections(self):
         node_setup = _create_nodes_setup()
         Nodzgraph._create_attributes(self._test_attrs_data)
@@ -218,6 +382,441 @@ class NodegraphCase(TestCase):
 
         self.assertListEqual(sorted(expected_connections), sorted(Nodzgraph.graph.evaluateGraph()))
 
+    def test_model_sync(self):
+        _create_nodes_setup()
+        Nodzgraph._create_attributes(self._test_attrs_data)
+        Nodzgraph._create_connections(self._test_cons_data)
+
+        self.assertListEqual(sorted(Nodzgraph.all_node_names), sorted(Nodzgraph.model.node_names))
+        self.assertListEqual(sorted(Nodzgraph.graph.evaluateGraph()), sorted(Nodzgraph.model.evaluate()))
+
+        node = Nodzgraph.get_node_by_name("lambert2")
+        for attr in node.plugs:
+            self.assertTrue(Nodzgraph.model.get_attribute("lambert2", attr).plug)
+
+        Nodzgraph.graph.deleteNode(node)
+        self.assertNotIn("lambert2", Nodzgraph.model)
+        self.assertListEqual(sorted(Nodzgraph.graph.evaluateGraph()), sorted(Nodzgraph.model.evaluate()))
+
+    def test_display_model(self):
+        model = GraphModel.from_display_data(_nodes_setup(), self._test_attrs_data, self._test_cons_data)
+        Nodzgraph.display_model(model)
+        self.assertEqual({"added_nodes": set(), "removed_nodes": set(), "added_edges": set(), "removed_edges": set()},
+                         model.diff(Nodzgraph.model))
+
+    def test_batch(self):
+        scene = Nodzgraph.graph.scene()
+        index_method = scene.itemIndexMethod()
+        with Nodzgraph.batch():
+            with Nodzgraph.batch():
+                node_setup = _create_nodes_setup()
+                Nodzgraph._create_attributes(self._test_attrs_data)
+                Nodzgraph._create_connections(self._test_cons_data)
+            # nested batches don't apply anything
+            self.assertTrue(Nodzgraph.graph.is_batching)
+            self.assertEqual(Qt.QtWidgets.QGraphicsScene.NoIndex, scene.itemIndexMethod())
+            self.assertEqual(len(Nodzgraph.graph.connections_index), len(Nodzgraph.graph._dirty_connections))
+
+        self.assertFalse(Nodzgraph.graph.is_batching)
+        self.assertEqual(index_method, scene.itemIndexMethod())
+        self.assertEqual(0, len(Nodzgraph.graph._dirty_connections))
+        for node_name in node_setup:
+            for plug in Nodzgraph.get_node_by_name(node_name).plugs.values():
+                for connection in plug.connections:
+                    self.assertEqual(plug.center(), connection.source_point)
+                    self.assertFalse(connection.path().isEmpty())
+
+    def test_connection_path_cache(self):
+        source = _create_test_node(name="source")
+        target = _create_test_node(name="target")
+        name = Nodzgraph.configuration.default_attribute_name
+        connection = Nodzgraph.graph.connect_attributes(source.plugs[name], target.sockets[name])
+
+        rebuilds = []
+        _set_path = connection.setPath
+        connection.setPath = lambda path: (rebuilds.append(path), _set_path(path))
+
+        # unchanged end points don't rebuild the path
+        Nodzgraph.graph.update_connection_paths([connection])
+        connection.paint(Qt.QtGui.QPainter(), None, None)
+        self.assertEqual(0, len(rebuilds))
+
+        # moved nodes do
+        target.setPos(target.pos() + Qt.QtCore.QPointF(100, 100))
+        Nodzgraph.graph.update_connection_paths([connection])
+        self.assertEqual(1, len(rebuilds))
+
+        # so does a changed interpolation
+        interpolation = Nodzgraph.configuration.connection_interpolation
+        Nodzgraph.configuration.connection_interpolation = "line" if interpolation == "bezier" else "bezier"
+        try:
+            connection.updatePath()
+            self.assertEqual(2, len(rebuilds))
+        finally:
+            Nodzgraph.configuration.connection_interpolation = interpolation
+
+    def test_shared_styles(self):
+        _create_nodes_setup()
+        Nodzgraph._create_attributes(self._test_attrs_data)
+        Nodzgraph._create_connections(self._test_cons_data)
+
+        styles = Nodzgraph.graph.styles
+        connections = list(Nodzgraph.graph.connections_index)
+        self.assertLess(1, len(connections))
+        pens = set(id(_._pen) for _ in connections)
+        data_types = set((_.plugItem or _.socketItem).dataType for _ in connections)
+        self.assertLessEqual(len(pens), len(data_types) + 1)
+        self.assertEqual(1, len(set(id(_._selected_pen) for _ in connections)))
+        self.assertGreaterEqual(len(set(_.preset for _ in Nodzgraph.all_nodes)),
+                                len(set(id(_._brush) for _ in Nodzgraph.all_nodes)))
+
+        # a changed configuration invalidates all styles
+        self.assertLess(0, len(styles))
+        Nodzgraph.graph.configuration = Nodzgraph.configuration.copy()
+        self.assertEqual(0, len(styles))
+
+    def test_connection_title(self):
+        source = _create_test_node(name="source")
+        target = _create_test_node(name="target")
+        name = Nodzgraph.configuration.default_attribute_name
+        connection = Nodzgraph.graph.connect_attributes(source.plugs[name], target.sockets[name])
+        other = Nodzgraph.graph.connect_attributes(target.plugs[name], source.sockets[name])
+        self.assertListEqual([], connection.childItems())
+
+        # the title item is created on first hover and shared by all connections
+        self.assertIsNone(Nodzgraph.graph.connection_title)
+        Nodzgraph.graph.show_connection_title(connection)
+        title = Nodzgraph.graph.connection_title
+        self.assertTrue(title.isVisible())
+        self.assertEqual("source.{0} - target.{0}".format(name), title.toPlainText())
+
+        Nodzgraph.graph.show_connection_title(other)
+        self.assertIs(title, Nodzgraph.graph.connection_title)
+        self.assertEqual("target.{0} - source.{0}".format(name), title.toPlainText())
+
+        # only the connection the title belongs to hides it
+        Nodzgraph.graph.hide_connection_title(connection)
+        self.assertTrue(title.isVisible())
+        Nodzgraph.graph.hide_connection_title(other)
+        self.assertFalse(title.isVisible())
+
+        Nodzgraph.clear()
+        self.assertIsNone(Nodzgraph.graph.connection_title)
+
+    def test_reload_configuration(self):
+        _create_nodes_setup()
+        Nodzgraph._create_attributes(self._test_attrs_data)
+        Nodzgraph._create_connections(self._test_cons_data)
+
+        style_index = Nodzgraph.graph.style_index
+        config_file = os.path.join(tempfile.gettempdir(), str(time.time()) + "_coconodz.config")
+        data = read_json(Nodzgraph.graph.BASE_CONFIG_PATH)
+        write_json(config_file, data)
+        try:
+            Nodzgraph.load_configuration(config_file)
+
+            float3_connections = style_index.get_connections("float3")
+            other_connections = style_index.get_connections() - float3_connections
+            self.assertLess(0, len(float3_connections))
+            other_colors = dict((_, Qt.QtGui.QColor(_.pen().color())) for _ in other_connections)
+
+            # only items using the changed preset get restyled
+            data["datatype_float3"]["plug"] = [0, 255, 0, 255]
+            write_json(config_file, data)
+            self.assertSetEqual({"datatype_float3"}, Nodzgraph.reload_configuration())
+            self.assertEqual([0, 255, 0, 255], Nodzgraph.configuration.datatype_float3.plug)
+
+            green = Qt.QtGui.QColor(0, 255, 0, 255)
+            for connection in float3_connections:
+                self.assertEqual(green, connection.pen().color())
+            for connection, color in other_colors.items():
+                self.assertEqual(color, connection.pen().color())
+
+            slots = []
+            for node in style_index.get_nodes("datatype_float3"):
+                slots.extend(_ for _ in list(node.plugs.values()) + list(node.sockets.values())
+                             if _.dataType == "float3")
+            self.assertLess(0, len(slots))
+            for slot in slots:
+                self.assertEqual(green, slot.brush.color())
+                self.assertEqual(green, slot.pen.color())
+
+            # presets in use can't be removed
+            del data["datatype_float3"]
+            write_json(config_file, data)
+            self.assertSetEqual(set(), Nodzgraph.reload_configuration())
+            self.assertIn("datatype_float3", Nodzgraph.configuration)
+        finally:
+            os.remove(config_file)
+            Nodzgraph.load_configuration(Nodzgraph.graph.BASE_CONFIG_PATH)
+
+    def test_connections_index(self):
+        node_setup = _create_nodes_setup()
+        Nodzgraph._create_attributes(self._test_attrs_data)
+        Nodzgraph._create_connections(self._test_cons_data)
+
+        index = Nodzgraph.graph.connections_index
+        expected_connections = [(x, y) for x, y in self._test_cons_data.iteritems()
+                                if (x.split(".")[0] in node_setup and y.split(".")[0] in node_setup)]
+        self.assertEqual(len(expected_connections), len(index))
+
+        plug_name, socket_name = expected_connections[0]
+        plug = Nodzgraph.get_plug_by_name(plug_name)
+        socket = Nodzgraph.get_socket_by_name(socket_name)
+        connection = index.get_by_names(*(plug_name.split(".", 1) + socket_name.split(".", 1)))
+        self.assertIs(connection, index.get(plug, socket))
+        self.assertIs(connection, Nodzgraph.graph.get_shared_connection(plug, socket))
+
+        # renamed nodes update the name keys
+        node = Nodzgraph.get_node_by_name(plug_name.split(".")[0])
+        Nodzgraph.graph.rename_node(node, "renamed")
+        self.assertIs(connection, index.get_by_names("renamed", plug_name.split(".", 1)[1],
+                                                     *socket_name.split(".", 1)))
+
+        Nodzgraph.graph.disconnect_attributes(plug, socket)
+        self.assertNotIn(connection, index)
+        self.assertEqual(len(expected_connections) - 1, len(index))
+
+    def test_layout_nodes(self):
+        node_setup = _create_nodes_setup()
+        Nodzgraph._create_attributes(self._test_attrs_data)
+        Nodzgraph._create_connections(self._test_cons_data)
+        Nodzgraph.graph.layout_nodes()
+
+        # upstream nodes are placed left of the nodes they are connected to
+        for plug_name, socket_name in Nodzgraph.graph.evaluateGraph():
+            plug_node = Nodzgraph.get_node_by_name(plug_name.split(".")[0])
+            socket_node = Nodzgraph.get_node_by_name(socket_name.split(".")[0])
+            self.assertLess(plug_node.x(), socket_node.x())
+
+        for node_name in node_setup:
+            node = Nodzgraph.get_node_by_name(node_name)
+            self.assertEqual((node.x(), node.y()), Nodzgraph.model.get_node(node_name).position)
+
+    def test_display_placement(self):
+        incremental = Nodzgraph.configuration.layout_incremental
+        Nodzgraph.configuration.layout_incremental = False
+        try:
+            Nodzgraph.display_host_nodes(_nodes_setup(), self._test_attrs_data, self._test_cons_data)
+        finally:
+            Nodzgraph.configuration.layout_incremental = incremental
+
+        nodes = Nodzgraph.all_nodes
+        for index, node in enumerate(nodes):
+            for other in nodes[index + 1:]:
+                self.assertFalse(node.sceneBoundingRect().intersects(other.sceneBoundingRect()))
+
+    def test_remove_overlaps(self):
+        nodes = [_create_test_node(name="node{0}".format(_)) for _ in range(5)]
+        for node in nodes:
+            node.setPos(0, 0)
+        moved = Nodzgraph.remove_overlaps()
+        self.assertEqual(4, len(moved))
+        for index, node in enumerate(nodes):
+            for other in nodes[index + 1:]:
+                self.assertFalse(node.sceneBoundingRect().intersects(other.sceneBoundingRect()))
+
+    def test_save_and_load_graph(self):
+        _create_nodes_setup()
+        Nodzgraph._create_attributes(self._test_attrs_data)
+        Nodzgraph._create_connections(self._test_cons_data)
+        Nodzgraph.create_backdrop(use_selection=False)
+        Nodzgraph.graph.sync_model_positions()
+        expected = Nodzgraph.model.as_dict()
+
+        graph_file = os.path.join(tempfile.mkdtemp(), "graph.cnz")
+        try:
+            Nodzgraph.save_active_graph(graph_file)
+            Nodzgraph.clear()
+            Nodzgraph.load_into_graph(graph_file)
+        finally:
+            shutil.rmtree(os.path.dirname(graph_file))
+
+        self.assertDictEqual(expected, Nodzgraph.model.as_dict())
+        self.assertEqual(1, len(Nodzgraph.get_backdrop_data()))
+
+    def test_save_and_load_graph_async(self):
+        _create_nodes_setup()
+        Nodzgraph._create_attributes(self._test_attrs_data)
+        Nodzgraph._create_connections(self._test_cons_data)
+        Nodzgraph.graph.sync_model_positions()
+        expected = Nodzgraph.model.as_dict()
+
+        graph_file = os.path.join(tempfile.mkdtemp(), "graph.cnz")
+        try:
+            Nodzgraph.save_active_graph_async(graph_file).wait()
+            application.processEvents()
+            Nodzgraph.clear()
+
+            worker = Nodzgraph.load_into_graph_async(graph_file)
+            worker.wait()
+            self.assertListEqual([], Nodzgraph.all_nodes)
+            # the loaded graph gets displayed in the main thread
+            application.processEvents()
+        finally:
+            shutil.rmtree(os.path.dirname(graph_file))
+
+        self.assertDictEqual(expected, Nodzgraph.model.as_dict())
+
+    def test_file_task_failed(self):
+        def task(progress, cancelled):
+            progress(0.5)
+            raise IOError("not writable")
+
+        errors = []
+        progress = []
+        on_failed = errors.append
+        on_progress = progress.append
+        Nodzgraph.graph.signal_file_failed.connect(on_failed)
+        Nodzgraph.graph.signal_file_progress.connect(on_progress)
+        try:
+            Nodzgraph.graph.run_file_task(task, callback=self.fail, errback=errors.append).wait()
+            application.processEvents()
+        finally:
+            Nodzgraph.graph.signal_file_failed.disconnect(on_failed)
+            Nodzgraph.graph.signal_file_progress.disconnect(on_progress)
+
+        # the errback and the signal report the error, the progress gets finished
+        self.assertEqual(2, len(errors))
+        self.assertIsInstance(errors[0], IOError)
+        self.assertEqual(1.0, progress[-1])
+
+    def test_journal(self):
+        journal_dir = tempfile.mkdtemp()
+        Nodzgraph.configuration.journal_dir = journal_dir
+        try:
+            Nodzgraph.setup_journal()
+            _create_nodes_setup()
+            Nodzgraph._create_attributes(self._test_attrs_data)
+            Nodzgraph._create_connections(self._test_cons_data)
+            Nodzgraph.remove_overlaps()
+            Nodzgraph.graph.sync_model_positions()
+            expected = Nodzgraph.model.as_dict()
+            self.assertTrue(Nodzgraph.journal.has_recovery_data)
+
+            Nodzgraph.compact_journal(wait=True)
+            Nodzgraph.graph.rename_node(Nodzgraph.all_nodes[0], "renamed1")
+            expected = Nodzgraph.model.as_dict()
+            Nodzgraph.recover_graph()
+            self.assertDictEqual(expected, Nodzgraph.model.as_dict())
+
+            # simulate a crash, the next session offers to recover the edits
+            Nodzgraph.journal.close()
+            Nodzgraph._journal = None
+            Nodzgraph.clear()
+            Nodzgraph.confirm_recovery = lambda: True
+            Nodzgraph.setup_journal()
+            self.assertDictEqual(expected, Nodzgraph.model.as_dict())
+
+            # the saved graph is the base edits after saving are recovered on
+            graph_file = os.path.join(journal_dir, "graph.cnz")
+            Nodzgraph.save_active_graph(graph_file)
+            Nodzgraph.graph.rename_node(Nodzgraph.all_nodes[0], "renamed2")
+            Nodzgraph.journal.wait()
+            expected = Nodzgraph.model.as_dict()
+            recovered = GraphJournal(journal_dir, lock=False).recover()[0].as_dict()
+            self.assertItemsEqual(expected.pop("connections"), recovered.pop("connections"))
+            self.assertDictEqual(expected, recovered)
+
+            # closing cleanly leaves nothing to recover
+            Nodzgraph.close_journal()
+            self.assertFalse(GraphJournal(journal_dir, lock=False).has_recovery_data)
+        finally:
+            Nodzgraph.__dict__.pop("confirm_recovery", None)
+            Nodzgraph.configuration.journal_dir = ""
+            Nodzgraph.setup_journal()
+            shutil.rmtree(journal_dir)
+
+    def test_load_networks(self):
+        _create_nodes_setup()
+        Nodzgraph._create_attributes(self._test_attrs_data)
+        Nodzgraph._create_connections(self._test_cons_data)
+        networks = Nodzgraph.model.get_networks()
+        network = sorted(networks)[0]
+
+        graph_file = os.path.join(tempfile.mkdtemp(), "graph.cnz")
+        try:
+            Nodzgraph.save_active_graph(graph_file, indexed=True)
+            Nodzgraph.clear()
+            Nodzgraph.load_into_graph(graph_file, networks=[network])
+        finally:
+            shutil.rmtree(os.path.dirname(graph_file))
+
+        self.assertSetEqual(networks[network], set(Nodzgraph.all_node_names))
+
+    def test_layout_new_nodes(self):
+        node_setup = _nodes_setup()
+        shading_engines = dict((k, v) for k, v in node_setup.items() if v == "shadingEngine")
+        Nodzgraph.display_host_nodes(shading_engines, self._test_attrs_data, self._test_cons_data)
+        positions = dict((_, Nodzgraph.get_node_by_name(_).pos()) for _ in shading_engines)
+
+        Nodzgraph.display_host_nodes(node_setup, self._test_attrs_data, self._test_cons_data)
+        for node_name, position in positions.items():
+            self.assertEqual(position, Nodzgraph.get_node_by_name(node_name).pos())
+
+        # new nodes are placed left of the displayed nodes they are connected to
+        for plug_node, _, socket_node, _ in Nodzgraph.model.edges:
+            if socket_node in shading_engines and plug_node not in shading_engines:
+                self.assertLess(Nodzgraph.get_node_by_name(plug_node).x(), positions[socket_node].x())
+
+    def test_layout_cache(self):
+        _create_nodes_setup()
+        Nodzgraph._create_attributes(self._test_attrs_data)
+        Nodzgraph._create_connections(self._test_cons_data)
+        Nodzgraph.graph.layout_cache.clear()
+        Nodzgraph.graph.layout_nodes()
+        self.assertEqual(1, len(Nodzgraph.graph.layout_cache))
+        positions = dict((_.name, _.pos()) for _ in Nodzgraph.all_nodes)
+
+        # an unchanged topology restores the cached layout
+        layout = Nodzgraph.graph.get_layout_function
+        Nodzgraph.graph.get_layout_function = lambda: functools.partial(_fail_layout, **layout().keywords)
+        try:
+            Nodzgraph.graph.layout_nodes()
+        finally:
+            del Nodzgraph.graph.get_layout_function
+        for node in Nodzgraph.all_nodes:
+            self.assertEqual(positions[node.name], node.pos())
+
+    def test_layout_cache_on_display(self):
+        Nodzgraph.display_host_nodes(_nodes_setup(), self._test_attrs_data, self._test_cons_data)
+        Nodzgraph.graph.layout_cache.clear()
+        Nodzgraph.graph.layout_nodes()
+        positions = dict((_.name, _.pos()) for _ in Nodzgraph.all_nodes)
+
+        # reopening the network restores its cached layout instead of placing it incrementally
+        Nodzgraph.clear()
+        Nodzgraph.display_host_nodes(_nodes_setup(), self._test_attrs_data, self._test_cons_data)
+        offset = Nodzgraph.get_node_by_name("lambert1").pos() - positions["lambert1"]
+        for node in Nodzgraph.all_nodes:
+            self.assertEqual(positions[node.name] + offset, node.pos())
+
+    def test_layout_nodes_async(self):
+        _create_nodes_setup()
+        Nodzgraph._create_attributes(self._test_attrs_data)
+        Nodzgraph._create_connections(self._test_cons_data)
+
+        expected = Nodzgraph.graph.get_layout_function()(Nodzgraph.graph.layout_snapshot())
+        Nodzgraph.graph.layout_cache.clear()
+        worker = Nodzgraph.graph.layout_nodes_async()
+        worker.wait()
+        application.processEvents()
+        for node_name, position in expected.items():
+            node = Nodzgraph.get_node_by_name(node_name)
+            self.assertEqual(position, (node.x(), node.y()))
+
+        # results of cancelled computations are discarded
+        node = Nodzgraph.get_node_by_name(list(expected.keys())[0])
+        node.setPos(node.pos() + Qt.QtCore.QPointF(500, 500))
+        moved_position = node.pos()
+        Nodzgraph.graph.layout_cache.clear()
+        worker = Nodzgraph.graph.layout_nodes_async()
+        Nodzgraph.graph.cancel_layout()
+        worker.wait()
+        application.processEvents()
+        self.assertTrue(worker.cancelled)
+        self.assertEqual(moved_position, node.pos())
+
     @unittest.SkipTest
     def test_display_host_nodes(self):
         """ visual testing
@@ -233,6 +832,10 @@ class NodegraphCase(TestCase):
         application.exec_()
 
 
+def _fail_layout(snapshot, **kwargs):
+    raise AssertionError("Layout was computed instead of restored from cache.")
+
+
 def _create_test_node(name="some", node_type="some"):
     return Nodzgraph.graph.create_node(name=name, node_type=node_type)
 
@@ -0,0 +1,206 @@
+import io
+import os
+import random
+import shutil
+import tempfile
+import time
+import unittest
+
+from coconodz.model import GraphModel
+from coconodz.serialization import (BackdropData,
+                                    GraphContainer,
+                                    GraphReader,
+                                    SerializationCancelled,
+                                    load_graph,
+                                    read_graph,
+                                    save_graph,
+                                    write_graph,
+                                    write_indexed_graph
+                                    )
+
+
+def _shading_network(node_count, edge_count, seed=0):
+    rand = random.Random(seed)
+    model = GraphModel()
+    for index in range(node_count):
+        node_name = "node{0}".format(index)
+        model.add_node(node_name, "lambert", (index * 1.5, index * 2.0))
+        model.add_attribute(node_name, "outColor", plug=True, socket=False, data_type="float3")
+        for attribute_name in ("color", "diffuse", "incandescence"):
+            model.add_attribute(node_name, attribute_name, plug=False, socket=True, data_type="float3")
+    while len(model.edges) < edge_count:
+        model.connect("node{0}".format(rand.randrange(node_count)), "outColor",
+                      "node{0}".format(rand.randrange(node_count)), rand.choice(["color", "diffuse", "incandescence"]))
+    return model
+
+
+def _material_library(material_count, seed=0):
+    rand = random.Random(seed)
+    model = GraphModel()
+    for index in range(material_count):
+        shader, engine = "shader{0}".format(index), "shader{0}SG".format(index)
+        model.add_node(shader, "blinn", (0, index * 100.0))
+        model.add_node(engine, "shadingEngine", (300, index * 100.0))
+        model.add_attribute(shader, "outColor", plug=True, socket=False, data_type="float3")
+        model.add_attribute(engine, "surfaceShader", plug=False, socket=True, data_type="float3")
+        model.connect(shader, "outColor", engine, "surfaceShader")
+        for texture_index in range(rand.randint(1, 5)):
+            texture = "file{0}_{1}".format(index, texture_index)
+            model.add_node(texture, "file", (-300, index * 100.0))
+            model.add_attribute(texture, "outColor", plug=True, socket=False, data_type="float3")
+            model.add_attribute(shader, "input{0}".format(texture_index), plug=False, socket=True, data_type="float3")
+            model.connect(texture, "outColor", shader, "input{0}".format(texture_index))
+    return model
+
+
+def _as_dict(model):
+    data = model.as_dict()
+    data["connections"].sort()
+    return data
+
+
+def _roundtrip(model, backdrops=(), compress=True):
+    stream = io.BytesIO()
+    write_graph(stream, model, backdrops, compress=compress)
+    stream.seek(0)
+    return read_graph(stream)
+
+
+class SerializationCase(unittest.TestCase):
+    """ test writing and reading graph files
+
+    """
+
+    def test_roundtrip(self):
+        model = GraphModel()
+        model.add_node("lambert1", "lambert", (10, 20))
+        model.add_node("lambert1SG", "shadingEngine")
+        model.add_attribute("lambert1", "outColor", plug=True, socket=False, data_type="float3")
+        model.add_attribute("lambert1SG", "surfaceShader", plug=False, socket=True, data_type="float3")
+        model.connect("lambert1", "outColor", "lambert1SG", "surfaceShader")
+        backdrop = BackdropData(u"Backdrop \u00e4", (1.5, 2, 300, 400), (1, 2, 3, 4), description="shaders")
+
+        for compress in (True, False):
+            loaded, backdrops = _roundtrip(model, [backdrop], compress=compress)
+            self.assertDictEqual(_as_dict(model), _as_dict(loaded))
+            self.assertEqual((10, 20), loaded.get_node("lambert1").position)
+            self.assertIsNone(loaded.get_node("lambert1SG").position)
+            self.assertEqual(1, len(backdrops))
+            self.assertEqual(backdrop.name, backdrops[0].name)
+            self.assertEqual(backdrop.bounds, backdrops[0].bounds)
+            self.assertEqual(backdrop.color, backdrops[0].color)
+            self.assertEqual("shaders", backdrops[0].description)
+
+    def test_interned_strings(self):
+        model = _shading_network(200, 400)
+        stream = io.BytesIO()
+        write_graph(stream, model, compress=False)
+        # the length prefixed name is stored only once although nodes, attributes and edges refer to it
+        self.assertEqual(1, stream.getvalue().count(b"\x05node7"))
+
+    def test_invalid_file(self):
+        self.assertRaises(ValueError, GraphReader, io.BytesIO(b"{\"nodes\": []}"))
+
+        stream = io.BytesIO()
+        write_graph(stream, _shading_network(10, 10))
+        self.assertRaises(ValueError, read_graph, io.BytesIO(stream.getvalue()[:len(stream.getvalue()) // 2]))
+
+    def test_progress(self):
+        model = _shading_network(5000, 10000)
+        stream = io.BytesIO()
+        written = []
+        write_graph(stream, model, progress=written.append)
+        self.assertListEqual(sorted(written), written)
+        self.assertEqual(1.0, written[-1])
+
+        read = []
+        stream.seek(0)
+        read_graph(stream, progress=read.append, size=len(stream.getvalue()))
+        self.assertLess(1, len(read))
+        self.assertListEqual(sorted(read), read)
+        self.assertEqual(1.0, read[-1])
+
+    def test_cancel(self):
+        model = _shading_network(5000, 10000)
+        self.assertRaises(SerializationCancelled, write_graph, io.BytesIO(), model, cancelled=lambda: True)
+
+        stream = io.BytesIO()
+        write_graph(stream, model)
+        stream.seek(0)
+        self.assertRaises(SerializationCancelled, read_graph, stream, cancelled=lambda: True)
+
+    def test_large_network(self):
+        model = _shading_network(20000, 50000)
+
+        start = time.time()
+        loaded, _ = _roundtrip(model)
+        self.assertLess(time.time() - start, 10)
+        self.assertEqual(model.edges, loaded.edges)
+        self.assertEqual(model.topology_fingerprint(), loaded.topology_fingerprint())
+
+
+class GraphContainerCase(unittest.TestCase):
+    """ test indexed graph files
+
+    """
+
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def _write(self, model, backdrops=(), indexed=True):
+        graph_file = os.path.join(self._tmp_dir, "library.cnz")
+        with open(graph_file, "wb") as stream:
+            if indexed:
+                write_indexed_graph(stream, model, backdrops)
+            else:
+                write_graph(stream, model, backdrops)
+        return graph_file
+
+    def test_networks(self):
+        model = _material_library(20)
+        graph_file = self._write(model, [BackdropData("Backdrop", (0, 0, 300, 300))])
+
+        with GraphContainer(graph_file) as container:
+            self.assertListEqual(sorted("shader{0}SG".format(_) for _ in range(20)), container.network_names)
+            loaded, backdrops = container.read(["shader3SG", "shader7SG"])
+            self.assertListEqual([], backdrops)
+            networks = model.get_networks()
+            self.assertDictEqual(_as_dict(model.subgraph(networks["shader3SG"] | networks["shader7SG"])),
+                                 _as_dict(loaded))
+            self.assertRaises(KeyError, container.read, ["shader3"])
+
+        loaded, backdrops = load_graph(graph_file)
+        self.assertDictEqual(_as_dict(model), _as_dict(loaded))
+        self.assertEqual(1, len(backdrops))
+
+    def test_plain_file_networks(self):
+        model = _material_library(5)
+        loaded, _ = load_graph(self._write(model, indexed=False), ["shader2SG"])
+        self.assertDictEqual(_as_dict(model.subgraph(model.get_networks()["shader2SG"])), _as_dict(loaded))
+        self.assertRaises(ValueError, GraphContainer, self._write(model, indexed=False))
+
+    def test_save_graph(self):
+        model = _material_library(5)
+        graph_file = os.path.join(self._tmp_dir, "library.cnz")
+        save_graph(graph_file, model)
+
+        # a cancelled save keeps the previous file
+        self.assertRaises(SerializationCancelled, save_graph, graph_file, _material_library(5000),
+                          indexed=True, cancelled=lambda: True)
+        self.assertListEqual(["library.cnz"], os.listdir(self._tmp_dir))
+        self.assertDictEqual(_as_dict(model), _as_dict(load_graph(graph_file)[0]))
+
+    def test_single_network_of_large_library(self):
+        graph_file = self._write(_material_library(5000))
+
+        start = time.time()
+        loaded, _ = load_graph(graph_file, ["shader2500SG"])
+        single_duration = time.time() - start
+        self.assertIn("shader2500", loaded)
+
+        start = time.time()
+        load_graph(graph_file)
+        self.assertLess(single_duration * 20, time.time() - start)